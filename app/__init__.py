@@ -1,7 +1,11 @@
-from flask import Flask, session
+from flask import Flask, session, request, g
 from flask_session import Session
 from config import Config
+import logging
+import math
 import os
+import time
+import uuid
 
 def create_app():
     """Create and configure the Flask application"""
@@ -10,6 +14,20 @@ def create_app():
     # Load configuration
     app.config.from_object(Config)
     
+    # Take the client address, scheme and host from trusted reverse proxies
+    if app.config['PROXY_FIX_HOPS']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        hops = app.config['PROXY_FIX_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+    
+    # Queue-based structured logging
+    from app.utils.logging_setup import setup_logging
+    setup_logging(Config)
+    
+    # Serialize dates and decimals the same way whichever jsonify a route uses
+    from app.utils.json_encoder import FlaskJSONEncoder
+    app.json_encoder = FlaskJSONEncoder
+    
     # Initialize session
     Session(app)
     
@@ -20,6 +38,37 @@ def create_app():
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(chat_bp, url_prefix='/api/chat')
     
+    # Keep this worker's knowledge caches and indexes in step with edits made anywhere
+    if app.config['KNOWLEDGE_CHANGE_FEED_ENABLED']:
+        from app.utils.change_feed import change_feed
+        change_feed.start()
+    
+    # Answer 503 instead of an empty result while the database is unreachable
+    register_database_errors(app)
+    
+    # Let sessions read their own writes when reads go to replicas
+    if app.config['DB_REPLICAS']:
+        register_read_your_writes(app)
+    
+    # Request instrumentation
+    register_request_logging(app)
+    if app.config['METRICS_ENABLED']:
+        register_metrics(app)
+    if app.config['QUERY_LOG_ENDPOINT_ENABLED']:
+        register_query_log(app)
+    
+    # Per-client rate limits and load shedding
+    if app.config['RATE_LIMIT_ENABLED']:
+        register_rate_limits(app)
+    
+    # Compress large text responses
+    if app.config['COMPRESSION_ENABLED']:
+        register_compression(app)
+    
+    # Persistent chat connections over WebSockets (needs flask-sock)
+    if app.config['WEBSOCKET_ENABLED']:
+        register_chat_socket(app)
+    
     # Add main routes
     @app.route('/')
     def index():
@@ -32,7 +81,201 @@ def create_app():
         db_status = db_manager.test_connection()
         return {
             'status': 'healthy' if db_status else 'unhealthy',
-            'database': 'connected' if db_status else 'disconnected'
+            'database': 'connected' if db_status else 'disconnected',
+            'circuit_breaker': 'open' if db_manager.breaker.opened_at is not None else 'closed'
         }
     
     return app
+
+def register_request_logging(app):
+    """Tag log records with the request's id, user and route, and log one line per request"""
+    from app.utils.logging_setup import request_context
+    access_logger = logging.getLogger('app.access')
+    
+    @app.before_request
+    def bind_request_context():
+        g.request_id = request.headers.get('X-Request-ID', '')[:64] or uuid.uuid4().hex
+        g.log_started = time.perf_counter()
+        g.log_context = request_context.set({
+            'request_id': g.request_id,
+            'user_id': session.get('user_id'),
+            'route': request.endpoint,
+            'method': request.method
+        })
+    
+    @app.after_request
+    def log_request(response):
+        started = g.pop('log_started', None)
+        if started is not None:
+            response.headers['X-Request-ID'] = g.request_id
+            access_logger.info("%s %s %s", request.method, request.path, response.status_code, extra={
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+            })
+        return response
+    
+    @app.teardown_request
+    def clear_request_context(exception):
+        token = g.pop('log_context', None)
+        if token is not None:
+            request_context.reset(token)
+
+def register_database_errors(app):
+    """Turn DatabaseUnavailableError into 503 Service Unavailable with Retry-After"""
+    from app.utils.db import DatabaseUnavailableError
+    from app.utils.json_encoder import jsonify
+    
+    @app.errorhandler(DatabaseUnavailableError)
+    def database_unavailable(error):
+        response = jsonify({'error': 'The database is temporarily unavailable, please try again shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(max(1, math.ceil(error.retry_after or 1)))
+        return response
+
+def register_read_your_writes(app):
+    """Carry a session's primary-read window from one request to the next"""
+    from app.utils.db import primary_until
+    
+    @app.before_request
+    def restore_primary_window():
+        g.primary_until = session.get('db_primary_until', 0.0)
+        g.primary_token = primary_until.set(g.primary_until)
+    
+    @app.after_request
+    def save_primary_window(response):
+        pinned = primary_until.get()
+        if pinned > g.get('primary_until', 0.0):
+            session['db_primary_until'] = pinned
+        return response
+    
+    @app.teardown_request
+    def reset_primary_window(exception):
+        token = g.pop('primary_token', None)
+        if token is not None:
+            primary_until.reset(token)
+
+def register_rate_limits(app):
+    """Reject clients over their token bucket with 429 and shed load with 503 when workers are saturated"""
+    from app.utils.json_encoder import jsonify
+    from app.utils.rate_limit import (rate_limiter, concurrency_limiter, client_keys,
+                                      rate_limited_total, EXEMPT_ENDPOINTS)
+    
+    def rejection(message, status, retry_after):
+        response = jsonify({'error': message})
+        response.status_code = status
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+    
+    @app.before_request
+    def limit_request():
+        if request.endpoint in EXEMPT_ENDPOINTS:
+            return None
+        
+        wait = rate_limiter.check(request.endpoint, client_keys())
+        if wait:
+            rate_limited_total.inc(endpoint=request.endpoint)
+            return rejection('Too many requests, please slow down', 429, wait)
+        
+        if not concurrency_limiter.acquire():
+            return rejection('Server is busy, please try again shortly', 503,
+                             concurrency_limiter.max_wait)
+        g.concurrency_slot = True
+    
+    @app.teardown_request
+    def release_slot(exception):
+        if g.pop('concurrency_slot', False):
+            concurrency_limiter.release()
+
+def register_compression(app):
+    """Send text responses above COMPRESSION_MIN_BYTES brotli- or gzip-encoded"""
+    from app.utils.compression import compress_response
+    
+    @app.after_request
+    def compress(response):
+        return compress_response(response)
+
+def register_chat_socket(app):
+    """Serve chat at /ws/chat and push due reminders to the sockets open in this worker"""
+    from app.routes.chat_socket import Sock, chat_socket, origin_allowed
+    from app.services.push_service import push_service
+    from app.utils.json_encoder import jsonify
+    
+    if Sock is None:
+        logging.getLogger(__name__).warning("flask-sock is not installed; chat stays on HTTP")
+        return
+    
+    app.config.setdefault('SOCK_SERVER_OPTIONS', {
+        'ping_interval': app.config['WEBSOCKET_PING_SECONDS'],
+        'max_message_size': app.config['WEBSOCKET_MAX_MESSAGE_BYTES']
+    })
+    Sock(app).route('/ws/chat')(chat_socket)
+    
+    # Refuse cross-site handshakes before the connection is upgraded
+    @app.before_request
+    def check_socket_origin():
+        if request.endpoint == 'chat_socket' and not origin_allowed():
+            response = jsonify({'error': 'Origin not allowed'})
+            response.status_code = 403
+            return response
+    
+    push_service.start()
+
+def register_metrics(app):
+    """Record per-route latency and expose metrics at /metrics"""
+    from app.utils.metrics import metrics, CONTENT_TYPE
+    
+    request_duration = metrics.histogram(
+        'http_request_duration_seconds', 'HTTP request latency by route',
+        ('endpoint', 'method'), sample_rate=app.config['METRICS_SAMPLE_RATE']
+    )
+    requests_total = metrics.counter(
+        'http_requests_total', 'HTTP requests by route and status',
+        ('endpoint', 'method', 'status')
+    )
+    
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+    
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        endpoint = request.endpoint or 'unknown'
+        if started is not None and endpoint != 'metrics_endpoint':
+            request_duration.observe(time.perf_counter() - started,
+                                     endpoint=endpoint, method=request.method)
+        requests_total.inc(endpoint=endpoint, method=request.method,
+                           status=response.status_code)
+        return response
+    
+    def metrics_endpoint():
+        return app.response_class(metrics.render(), mimetype=None,
+                                  content_type=CONTENT_TYPE)
+    
+    # Open to anything that can reach the port unless scrapes must present ADMIN_TOKEN
+    if app.config['METRICS_REQUIRE_ADMIN']:
+        from app.routes.auth import admin_required
+        metrics_endpoint = admin_required(metrics_endpoint)
+    app.add_url_rule('/metrics', 'metrics_endpoint', metrics_endpoint)
+
+def register_query_log(app):
+    """Expose the slowest statement fingerprints and their plans at /debug/queries"""
+    from app.routes.auth import admin_required
+    from app.utils.json_encoder import jsonify
+    from app.utils.query_log import query_log, ORDERS
+    
+    @app.route('/debug/queries', methods=['GET', 'DELETE'])
+    @admin_required
+    def query_stats():
+        if request.method == 'DELETE':
+            query_log.reset()
+            return jsonify({'message': 'Query statistics reset'}), 200
+        
+        order = request.args.get('order', 'total')
+        if order not in ORDERS:
+            return jsonify({'error': f"order must be one of {', '.join(ORDERS)}"}), 400
+        limit = request.args.get('limit', 20, type=int)
+        return jsonify({
+            'slow_query_ms': query_log.threshold * 1000,
+            'queries': query_log.top(limit, order)
+        }), 200
@@ -1,5 +1,8 @@
 from datetime import datetime
+from app.utils.chat_archive import chat_archive
 from app.utils.db import db_manager
+from app.utils.schedule_index import schedule_index, schedule_bounds
+from config import Config
 
 class ChatSession:
     def __init__(self, id=None, user_id=None, session_start=None, 
@@ -61,8 +64,22 @@ class ChatSession:
         """Increment total message count"""
         self.total_messages += 1
         self.save()
+    
+    def add_messages(self, count):
+        """Add several messages to the total in one atomic update"""
+        query = """
+            UPDATE chat_sessions 
+            SET total_messages = total_messages + %s 
+            WHERE id = %s
+        """
+        if db_manager.execute_update(query, (count, self.id)):
+            self.total_messages += count
 
 class ChatHistory:
+    # Columns returned by the API, in response order
+    FIELDS = ('id', 'session_id', 'user_id', 'message', 'response',
+              'message_type', 'confidence_score', 'timestamp')
+    
     def __init__(self, id=None, session_id=None, user_id=None, message=None, 
                  response=None, message_type='general', confidence_score=0.0, 
                  timestamp=None):
@@ -88,7 +105,20 @@ class ChatHistory:
         return self.id
     
     @staticmethod
-    def get_session_history(session_id, limit=50):
+    def save_many(histories):
+        """Insert several chat history rows with one executemany"""
+        query = """
+            INSERT INTO chat_history (session_id, user_id, message, response, 
+                                    message_type, confidence_score, timestamp)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        params_list = [(chat.session_id, chat.user_id, chat.message, chat.response,
+                        chat.message_type, chat.confidence_score, chat.timestamp)
+                       for chat in histories]
+        return db_manager.execute_many(query, params_list)
+    
+    @staticmethod
+    def get_session_history(session_id, limit=50, serialized=False):
         """Get chat history for a session"""
         query = """
             SELECT * FROM chat_history 
@@ -97,22 +127,69 @@ class ChatHistory:
             LIMIT %s
         """
         results = db_manager.execute_query(query, (session_id, limit))
+        
+        # Older turns of the session may have moved to the archive
+        if Config.CHAT_ARCHIVE_ENABLED:
+            archived = chat_archive.session_history(session_id, limit)
+            if archived:
+                results = ChatHistory.merge_rows(archived, results or [])[:limit]
+        
+        if serialized:
+            return ChatHistory.serialize_rows(results)
         return [ChatHistory(**result) for result in results] if results else []
     
     @staticmethod
-    def get_user_history(user_id, limit=100):
-        """Get user's chat history"""
-        query = """
+    def get_user_history(user_id, limit=100, serialized=False, before=None, before_id=None):
+        """Get user's chat history, newest first, optionally only turns before a (timestamp, id) cursor.
+        
+        Without before_id, turns at the before timestamp itself are skipped.
+        """
+        if before and before_id is not None:
+            condition, params = "AND (timestamp, id) < (%s, %s)", (user_id, before, before_id, limit)
+        elif before:
+            condition, params = "AND timestamp < %s", (user_id, before, limit)
+        else:
+            condition, params = "", (user_id, limit)
+        query = f"""
             SELECT * FROM chat_history 
-            WHERE user_id = %s 
-            ORDER BY timestamp DESC 
+            WHERE user_id = %s {condition} 
+            ORDER BY timestamp DESC, id DESC 
             LIMIT %s
         """
-        results = db_manager.execute_query(query, (user_id, limit))
+        results = db_manager.execute_query(query, params)
+        
+        # Paging past the hot rows continues into the archive
+        if Config.CHAT_ARCHIVE_ENABLED and results is not None and len(results) < limit:
+            if results:
+                before, before_id = results[-1]['timestamp'], results[-1]['id']
+            archived = chat_archive.user_history(user_id, before, limit - len(results), before_id)
+            results = ChatHistory.merge_rows(results, archived)
+        
+        if serialized:
+            return ChatHistory.serialize_rows(results)
         return [ChatHistory(**result) for result in results] if results else []
     
     @staticmethod
-    def search_user_history(user_id, search_term, limit=20):
+    def get_version(user_id, session_id=None):
+        """(last id, last timestamp, archived segments) for a user's or session's history, or None if the database is unavailable.
+        
+        Rows only leave chat_history when the archive takes them, which adds
+        a segment, so this changes whenever the history does. Each part is
+        an index lookup rather than a scan of the history.
+        """
+        column, value = ('session_id', session_id) if session_id else ('user_id', user_id)
+        query = f"""
+            SELECT (SELECT MAX(id) FROM chat_history WHERE {column} = %s) AS last_id,
+                   (SELECT MAX(timestamp) FROM chat_history WHERE {column} = %s) AS last_message,
+                   (SELECT COUNT(*) FROM chat_archive_segments WHERE user_id = %s) AS segments
+        """
+        result = db_manager.execute_single_query(query, (value, value, user_id))
+        if result is None:
+            return None
+        return result['last_id'], result['last_message'], result['segments']
+    
+    @staticmethod
+    def search_user_history(user_id, search_term, limit=20, serialized=False):
         """Search user's chat history"""
         query = """
             SELECT * FROM chat_history 
@@ -122,8 +199,21 @@ class ChatHistory:
         """
         search_pattern = f"%{search_term}%"
         results = db_manager.execute_query(query, (user_id, search_pattern, search_pattern, limit))
+        if serialized:
+            return ChatHistory.serialize_rows(results)
         return [ChatHistory(**result) for result in results] if results else []
     
+    @staticmethod
+    def merge_rows(first, second):
+        """first followed by second, dropping turns of second already in first"""
+        seen = {row['id'] for row in first}
+        return list(first) + [row for row in second if row['id'] not in seen]
+    
+    @staticmethod
+    def serialize_rows(rows):
+        """Response dicts straight from query rows; the response encoder handles dates and decimals"""
+        return [{field: row[field] for field in ChatHistory.FIELDS} for row in rows or []]
+    
     def to_dict(self):
         """Convert chat history to dictionary"""
         return {
@@ -175,8 +265,16 @@ class StudySchedule:
             params = (self.user_id, self.subject, self.topic, self.scheduled_date,
                      self.scheduled_time, self.duration_minutes, self.status, self.notes)
             self.id = db_manager.execute_insert(query, params)
+        
+        # Keep the in-memory conflict index consistent with the table
+        if self.id:
+            schedule_index.update(self)
         return self.id
     
+    def get_bounds(self):
+        """Get the start and end datetimes of this session"""
+        return schedule_bounds(self.scheduled_date, self.scheduled_time, self.duration_minutes)
+    
     @staticmethod
     def get_user_schedules(user_id, limit=20):
         """Get user's study schedules"""
@@ -262,3 +360,25 @@ class Reminder:
         """
         results = db_manager.execute_query(query, (user_id, limit))
         return [Reminder(**result) for result in results] if results else []
+    
+    def due_at(self):
+        """Get the datetime this reminder falls due"""
+        return schedule_bounds(self.reminder_date, self.reminder_time, 0)[0]
+    
+    @staticmethod
+    def get_due_reminders(user_ids, since, until, chunk_size=500):
+        """Get the open reminders of several users that fall due after since and no later than until"""
+        due = []
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            query = f"""
+                SELECT * FROM reminders 
+                WHERE user_id IN ({', '.join(['%s'] * len(chunk))}) AND is_completed = FALSE
+                  AND reminder_date BETWEEN %s AND %s
+                ORDER BY reminder_date ASC, reminder_time ASC
+            """
+            results = db_manager.execute_query(query, (*chunk, since.date(), until.date()))
+            due.extend(reminder for reminder in (Reminder(**result) for result in results or [])
+                       if since < reminder.due_at() <= until)
+        return due
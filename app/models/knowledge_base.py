@@ -1,10 +1,19 @@
+import re
 from datetime import datetime
+from app.utils.change_feed import change_feed
 from app.utils.db import db_manager
+from app.utils.notes_index import notes_index
+from app.utils.semantic_index import semantic_index
+from config import Config
+
+def fts_tokens(text):
+    """Split text into tokens that are safe to quote in an FTS5 query"""
+    return re.findall(r'\w+', text.lower())
 
 class KnowledgeBase:
     def __init__(self, id=None, subject=None, topic=None, subtopic=None,
                  content=None, keywords=None, difficulty_level='beginner',
-                 grade_level=None, created_at=None, updated_at=None, is_active=True):
+                 grade_level=None, created_at=None, updated_at=None, is_active=True, revision=0):
         self.id = id
         self.subject = subject
         self.topic = topic
@@ -16,6 +25,7 @@ class KnowledgeBase:
         self.created_at = created_at or datetime.now()
         self.updated_at = updated_at or datetime.now()
         self.is_active = is_active
+        self.revision = revision
     
     def save(self):
         """Save knowledge base entry to database"""
@@ -40,6 +50,10 @@ class KnowledgeBase:
             params = (self.subject, self.topic, self.subtopic, self.content, self.keywords,
                      self.difficulty_level, self.grade_level, self.is_active)
             self.id = db_manager.execute_insert(query, params)
+        
+        # Let every worker's caches and indexes know the entry changed
+        if self.id:
+            self.revision = change_feed.publish(self.id) or self.revision
         return self.id
     
     @staticmethod
@@ -54,6 +68,17 @@ class KnowledgeBase:
     @staticmethod
     def search_by_keywords(keywords, limit=10):
         """Search knowledge base by keywords"""
+        if db_manager.backend.supports_fulltext:
+            return KnowledgeBase.search_fulltext(
+                ' OR '.join(f'"{token}"*' for token in fts_tokens(keywords)),
+                limit, columns='topic content keywords'
+            )
+        
+        # Use the memory-mapped snapshot's postings when one is deployed
+        if semantic_index.has_snapshot():
+            matches = semantic_index.keyword_search(keywords, limit)
+            return KnowledgeBase.find_by_ids([entry_id for entry_id, _ in matches])
+        
         search_terms = keywords.lower().split()
         conditions = []
         params = []
@@ -77,6 +102,67 @@ class KnowledgeBase:
         results = db_manager.execute_query(query, params)
         return [KnowledgeBase(**result) for result in results] if results else []
     
+    @staticmethod
+    def search_by_keywords_batch(keyword_strings, limit=10):
+        """Run search_by_keywords for several queries with one combined lookup.
+        
+        Entries matching any query are fetched together and split per query in
+        Python, keeping search_by_keywords' matching rules and ordering. A query
+        whose matches may have been cut off by the combined limit is re-run alone.
+        """
+        if semantic_index.has_snapshot() and not db_manager.backend.supports_fulltext:
+            # Probe the in-process index per query, then fetch all entries at once
+            id_lists = [[entry_id for entry_id, _ in semantic_index.keyword_search(keywords, limit)]
+                        for keywords in keyword_strings]
+            entries = {entry.id: entry for entry in KnowledgeBase.find_by_ids(
+                list(dict.fromkeys(entry_id for ids in id_lists for entry_id in ids)))}
+            return [[entries[entry_id] for entry_id in ids if entry_id in entries] for ids in id_lists]
+        
+        if db_manager.backend.supports_fulltext:
+            term_lists = [fts_tokens(keywords) for keywords in keyword_strings]
+        else:
+            term_lists = [keywords.lower().split() for keywords in keyword_strings]
+        all_terms = list(dict.fromkeys(term for terms in term_lists for term in terms))
+        if not all_terms:
+            return [[] for _ in keyword_strings]
+        
+        combined_limit = limit * len(keyword_strings)
+        candidates = KnowledgeBase.search_by_keywords(' '.join(all_terms), combined_limit)
+        
+        results = []
+        for keywords, terms in zip(keyword_strings, term_lists):
+            matches = [entry for entry in candidates if entry.matches_terms(terms)][:limit]
+            if len(matches) < limit and len(candidates) >= combined_limit:
+                matches = KnowledgeBase.search_by_keywords(keywords, limit)
+            results.append(matches)
+        return results
+    
+    def matches_terms(self, terms):
+        """Whether this entry matches any term the way search_by_keywords does"""
+        fields = [(self.keywords or '').lower(), (self.content or '').lower(), (self.topic or '').lower()]
+        if db_manager.backend.supports_fulltext:
+            tokens = [token for field in fields for token in fts_tokens(field)]
+            return any(token.startswith(term) for term in terms for token in tokens)
+        return any(term in field for term in terms for field in fields)
+    
+    @staticmethod
+    def search_fulltext(match_expression, limit=10, columns=None):
+        """Search knowledge base through the FTS5 index (SQLite backend)"""
+        if not match_expression:
+            return []
+        if columns:
+            match_expression = f"{{{columns}}} : ({match_expression})"
+        
+        query = """
+            SELECT kb.* FROM knowledge_base_fts
+            JOIN knowledge_base kb ON kb.id = knowledge_base_fts.rowid
+            WHERE knowledge_base_fts MATCH %s AND kb.is_active = TRUE
+            ORDER BY kb.subject, kb.topic
+            LIMIT %s
+        """
+        results = db_manager.execute_query(query, (match_expression, limit))
+        return [KnowledgeBase(**result) for result in results] if results else []
+    
     @staticmethod
     def get_by_subject(subject, limit=20):
         """Get knowledge base entries by subject"""
@@ -89,6 +175,46 @@ class KnowledgeBase:
         results = db_manager.execute_query(query, (subject, limit))
         return [KnowledgeBase(**result) for result in results] if results else []
     
+    @staticmethod
+    def find_by_ids(kb_ids):
+        """Find several knowledge base entries, keeping the order of kb_ids"""
+        if not kb_ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(kb_ids))
+        query = f"SELECT * FROM knowledge_base WHERE id IN ({placeholders}) AND is_active = TRUE"
+        results = db_manager.execute_query(query, tuple(kb_ids))
+        entries = {result['id']: KnowledgeBase(**result) for result in results or []}
+        return [entries[kb_id] for kb_id in kb_ids if kb_id in entries]
+    
+    @staticmethod
+    def get_by_subjects(subjects, per_subject=3):
+        """Get up to per_subject entries for each of several subjects in one query"""
+        if not subjects:
+            return {}
+        
+        placeholders = ', '.join(['%s'] * len(subjects))
+        query = f"""
+            SELECT * FROM (
+                SELECT kb.*, ROW_NUMBER() OVER (
+                    PARTITION BY kb.subject ORDER BY kb.topic, kb.subtopic
+                ) AS subject_rank
+                FROM knowledge_base kb
+                WHERE kb.subject IN ({placeholders}) AND kb.is_active = TRUE
+            ) ranked
+            WHERE subject_rank <= %s
+            ORDER BY subject, subject_rank
+        """
+        results = db_manager.execute_query(query, tuple(subjects) + (per_subject,))
+        
+        # Key results by the requested spelling; subject matching is case-insensitive
+        requested = {subject.lower(): subject for subject in subjects}
+        grouped = {}
+        for result in results or []:
+            result.pop('subject_rank', None)
+            subject = requested.get(result['subject'].lower(), result['subject'])
+            grouped.setdefault(subject, []).append(KnowledgeBase(**result))
+        return grouped
+    
     @staticmethod
     def get_by_topic(subject, topic, limit=10):
         """Get knowledge base entries by subject and topic"""
@@ -112,6 +238,21 @@ class KnowledgeBase:
         results = db_manager.execute_query(query)
         return [result['subject'] for result in results] if results else []
     
+    @staticmethod
+    def get_catalog_version():
+        """(revision, changed_at) of the latest knowledge base change, or None if the database is unavailable"""
+        query = """
+            SELECT revision, changed_at FROM knowledge_changes 
+            ORDER BY revision DESC 
+            LIMIT 1
+        """
+        results = db_manager.execute_query(query)
+        if results is None:
+            return None
+        if not results:
+            return 0, None
+        return results[0]['revision'], results[0]['changed_at']
+    
     @staticmethod
     def get_topics_by_subject(subject):
         """Get all topics for a subject"""
@@ -126,6 +267,11 @@ class KnowledgeBase:
     @staticmethod
     def search_content(search_term, limit=15):
         """Search knowledge base content"""
+        if db_manager.backend.supports_fulltext:
+            tokens = fts_tokens(search_term)
+            phrase = f'"{" ".join(tokens)}"*' if tokens else ''
+            return KnowledgeBase.search_fulltext(phrase, limit)
+        
         query = """
             SELECT * FROM knowledge_base 
             WHERE is_active = TRUE AND (
@@ -156,10 +302,14 @@ class KnowledgeBase:
             'grade_level': self.grade_level,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'is_active': self.is_active
+            'is_active': self.is_active,
+            'revision': self.revision
         }
 
 class UserNote:
+    # Columns returned by the API, in response order
+    FIELDS = ('id', 'user_id', 'subject', 'topic', 'note_content', 'created_at', 'updated_at')
+    
     def __init__(self, id=None, user_id=None, subject=None, topic=None,
                  note_content=None, created_at=None, updated_at=None):
         self.id = id
@@ -189,10 +339,13 @@ class UserNote:
             """
             params = (self.user_id, self.subject, self.topic, self.note_content)
             self.id = db_manager.execute_insert(query, params)
+        
+        if self.id and Config.NOTES_INDEX_ENABLED:
+            notes_index.note_saved(self)
         return self.id
     
     @staticmethod
-    def get_user_notes(user_id, limit=50):
+    def get_user_notes(user_id, limit=50, serialized=False):
         """Get user's notes"""
         query = """
             SELECT * FROM user_notes 
@@ -201,10 +354,25 @@ class UserNote:
             LIMIT %s
         """
         results = db_manager.execute_query(query, (user_id, limit))
+        if serialized:
+            return UserNote.serialize_rows(results)
         return [UserNote(**result) for result in results] if results else []
     
     @staticmethod
-    def get_notes_by_subject(user_id, subject, limit=20):
+    def get_version(user_id):
+        """(note count, latest updated_at) for a user's notes, or None if the database is unavailable"""
+        query = """
+            SELECT COUNT(*) AS total, MAX(updated_at) AS updated_at 
+            FROM user_notes 
+            WHERE user_id = %s
+        """
+        result = db_manager.execute_single_query(query, (user_id,))
+        if result is None:
+            return None
+        return result['total'], result['updated_at']
+    
+    @staticmethod
+    def get_notes_by_subject(user_id, subject, limit=20, serialized=False):
         """Get user's notes by subject"""
         query = """
             SELECT * FROM user_notes 
@@ -213,11 +381,38 @@ class UserNote:
             LIMIT %s
         """
         results = db_manager.execute_query(query, (user_id, subject, limit))
+        if serialized:
+            return UserNote.serialize_rows(results)
         return [UserNote(**result) for result in results] if results else []
     
     @staticmethod
-    def search_user_notes(user_id, search_term, limit=20):
+    def search_user_notes(user_id, search_term, limit=20, serialized=False):
         """Search user's notes"""
+        if Config.NOTES_INDEX_ENABLED:
+            note_ids = notes_index.search(user_id, search_term, limit)
+            if note_ids is not None:
+                results = UserNote.find_rows_by_ids(user_id, note_ids)
+                if serialized:
+                    return UserNote.serialize_rows(results)
+                return [UserNote(**result) for result in results]
+        
+        if db_manager.backend.supports_fulltext:
+            tokens = fts_tokens(search_term)
+            if not tokens:
+                return []
+            query = """
+                SELECT n.* FROM user_notes_fts
+                JOIN user_notes n ON n.id = user_notes_fts.rowid
+                WHERE user_notes_fts MATCH %s AND n.user_id = %s
+                ORDER BY n.updated_at DESC
+                LIMIT %s
+            """
+            params = (f'"{" ".join(tokens)}"*', user_id, limit)
+            results = db_manager.execute_query(query, params)
+            if serialized:
+                return UserNote.serialize_rows(results)
+            return [UserNote(**result) for result in results] if results else []
+        
         query = """
             SELECT * FROM user_notes 
             WHERE user_id = %s AND (
@@ -232,8 +427,26 @@ class UserNote:
         params = [user_id] + [search_pattern] * 3 + [limit]
         
         results = db_manager.execute_query(query, params)
+        if serialized:
+            return UserNote.serialize_rows(results)
         return [UserNote(**result) for result in results] if results else []
     
+    @staticmethod
+    def find_rows_by_ids(user_id, note_ids):
+        """Rows for a user's notes, keeping the order of note_ids"""
+        if not note_ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(note_ids))
+        query = f"SELECT * FROM user_notes WHERE user_id = %s AND id IN ({placeholders})"
+        results = db_manager.execute_query(query, [user_id] + list(note_ids))
+        by_id = {result['id']: result for result in results or []}
+        return [by_id[note_id] for note_id in note_ids if note_id in by_id]
+    
+    @staticmethod
+    def serialize_rows(rows):
+        """Response dicts straight from query rows; the response encoder handles dates"""
+        return [{field: row[field] for field in UserNote.FIELDS} for row in rows or []]
+    
     def to_dict(self):
         """Convert user note to dictionary"""
         return {
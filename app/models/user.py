@@ -1,6 +1,8 @@
 import bcrypt
+import json
 from datetime import datetime
 from app.utils.db import db_manager
+from config import Config
 
 class User:
     def __init__(self, id=None, username=None, email=None, password_hash=None, 
@@ -125,3 +127,135 @@ class User:
     
     def get_id(self):
         return str(self.id)
+
+class UserProfile:
+    """Incrementally maintained summary of a user's interests.
+    
+    Subject scores decay exponentially with SUBJECT_HALF_LIFE_DAYS so recent
+    activity dominates. All scores share one reference time, so decay is
+    applied lazily in a single pass whenever the profile changes.
+    """
+    
+    SUBJECT_HALF_LIFE_DAYS = Config.PROFILE_HALF_LIFE_DAYS
+    MAX_RECENT_KEYWORDS = 20
+    
+    def __init__(self, user_id=None, subject_scores=None, recent_keywords=None,
+                 difficulty_level='beginner', message_count=0, scores_updated_at=None,
+                 updated_at=None, version=None):
+        self.user_id = user_id
+        self.subject_scores = subject_scores or {}
+        self.recent_keywords = recent_keywords or []
+        self.difficulty_level = difficulty_level
+        self.message_count = message_count
+        self.scores_updated_at = scores_updated_at or datetime.now()
+        self.updated_at = updated_at
+        # Row version this profile was read at; None until it's stored
+        self.version = version
+    
+    def copy(self):
+        """An independent copy, to update without touching this one"""
+        return UserProfile(self.user_id, dict(self.subject_scores), list(self.recent_keywords),
+                           self.difficulty_level, self.message_count, self.scores_updated_at,
+                           self.updated_at, self.version)
+    
+    def decay(self, now=None):
+        """Bring all subject scores forward to now"""
+        now = now or datetime.now()
+        elapsed_days = (now - self.scores_updated_at).total_seconds() / 86400
+        if elapsed_days > 0:
+            factor = 0.5 ** (elapsed_days / self.SUBJECT_HALF_LIFE_DAYS)
+            self.subject_scores = {subject: score * factor
+                                   for subject, score in self.subject_scores.items()
+                                   if score * factor >= 0.01}
+        self.scores_updated_at = now
+    
+    def record_analysis(self, analysis, now=None):
+        """Fold one NLPService analysis into the profile"""
+        self.decay(now)
+        self.message_count += 1
+        
+        subject = analysis.get('subject')
+        if subject:
+            self.subject_scores[subject] = self.subject_scores.get(subject, 0.0) + 1.0
+        
+        # Most recent keywords first, without duplicates
+        keywords = list(dict.fromkeys(analysis.get('keywords', [])))
+        merged = keywords + [k for k in self.recent_keywords if k not in keywords]
+        self.recent_keywords = merged[:self.MAX_RECENT_KEYWORDS]
+        
+        self.difficulty_level = self.estimate_difficulty()
+    
+    def estimate_difficulty(self):
+        """Estimate the user's level from sustained activity in their top subject"""
+        top_score = max(self.subject_scores.values(), default=0.0)
+        if top_score >= 30:
+            return 'advanced'
+        if top_score >= 10:
+            return 'intermediate'
+        return 'beginner'
+    
+    def top_subjects(self, limit=3):
+        """Get the user's strongest current subjects"""
+        ranked = sorted(self.subject_scores.items(), key=lambda item: item[1], reverse=True)
+        return [subject for subject, _ in ranked[:limit]]
+    
+    def to_json(self):
+        """Serialize the profile compactly for storage"""
+        return json.dumps({
+            's': {subject: round(score, 3) for subject, score in self.subject_scores.items()},
+            'k': self.recent_keywords,
+            'd': self.difficulty_level,
+            'n': self.message_count,
+            't': self.scores_updated_at.isoformat(timespec='seconds')
+        }, separators=(',', ':'))
+    
+    @staticmethod
+    def from_json(user_id, data, updated_at=None, version=None):
+        """Rebuild a profile from its stored form"""
+        values = json.loads(data) if data else {}
+        return UserProfile(
+            user_id=user_id,
+            subject_scores=values.get('s'),
+            recent_keywords=values.get('k'),
+            difficulty_level=values.get('d', 'beginner'),
+            message_count=values.get('n', 0),
+            scores_updated_at=datetime.fromisoformat(values['t']) if 't' in values else None,
+            updated_at=updated_at,
+            version=version
+        )
+    
+    def save(self):
+        """Save the profile if the stored row is still the version it was read at.
+        
+        Returns False, leaving the row alone, when another worker saved the
+        profile first; reload it with find_by_user and apply the change again.
+        """
+        updated_at = datetime.now()
+        if self.version is None:
+            query = """
+                INSERT IGNORE INTO user_profiles (user_id, profile_data, updated_at, version)
+                VALUES (%s, %s, %s, 1)
+            """
+            params = (self.user_id, self.to_json(), updated_at)
+        else:
+            query = """
+                UPDATE user_profiles 
+                SET profile_data = %s, updated_at = %s, version = version + 1 
+                WHERE user_id = %s AND version = %s
+            """
+            params = (self.to_json(), updated_at, self.user_id, self.version)
+        if db_manager.execute_update(query, params) == 0:
+            return False
+        self.updated_at = updated_at
+        self.version = (self.version or 0) + 1
+        return True
+    
+    @staticmethod
+    def find_by_user(user_id, primary=False):
+        """Find a user's profile"""
+        query = "SELECT * FROM user_profiles WHERE user_id = %s"
+        result = db_manager.execute_single_query(query, (user_id,), primary=primary)
+        if result:
+            return UserProfile.from_json(user_id, result['profile_data'], result['updated_at'],
+                                         result.get('version', 0))
+        return None
@@ -1,15 +1,20 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, session
 from app.models.user import User
+from app.services.push_service import push_service
+from app.utils.db import DatabaseUnavailableError
+from app.utils.json_encoder import jsonify
+from config import Config
 from functools import wraps
+import hmac
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Create blueprint
 auth_bp = Blueprint('auth', __name__)
 
+ADMIN_USERNAMES = {name.strip() for name in Config.ADMIN_USERNAMES.split(',') if name.strip()}
+
 def login_required(f):
     """Decorator to require login for routes"""
     @wraps(f)
@@ -19,6 +24,23 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def is_admin():
+    """Whether the request comes from an operator: a user in ADMIN_USERNAMES or a client presenting ADMIN_TOKEN"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if Config.ADMIN_TOKEN and scheme.lower() == 'bearer' and hmac.compare_digest(
+            token.strip().encode(), Config.ADMIN_TOKEN.encode()):
+        return True
+    return 'user_id' in session and session.get('username') in ADMIN_USERNAMES
+
+def admin_required(f):
+    """Decorator to limit operator routes to admins"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not is_admin():
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Register a new user"""
@@ -64,8 +86,10 @@ def register():
             }
         }), 201
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Registration error: {e}")
+        logger.error("Registration error: %s", e)
         return jsonify({'error': 'Registration failed'}), 500
 
 @auth_bp.route('/login', methods=['POST'])
@@ -101,8 +125,10 @@ def login():
             }
         }), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Login error: {e}")
+        logger.error("Login error: %s", e)
         return jsonify({'error': 'Login failed'}), 500
 
 @auth_bp.route('/logout', methods=['POST'])
@@ -110,12 +136,15 @@ def login():
 def logout():
     """Logout user"""
     try:
-        # Clear session
+        # Close this worker's chat sockets for the user, then clear session
+        push_service.close_user(session['user_id'])
         session.clear()
         return jsonify({'message': 'Logout successful'}), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Logout error: {e}")
+        logger.error("Logout error: %s", e)
         return jsonify({'error': 'Logout failed'}), 500
 
 @auth_bp.route('/profile', methods=['GET'])
@@ -131,8 +160,10 @@ def get_profile():
             'user': user.to_dict()
         }), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Profile retrieval error: {e}")
+        logger.error("Profile retrieval error: %s", e)
         return jsonify({'error': 'Failed to retrieve profile'}), 500
 
 @auth_bp.route('/profile', methods=['PUT'])
@@ -160,8 +191,10 @@ def update_profile():
         else:
             return jsonify({'error': 'Failed to update profile'}), 500
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Profile update error: {e}")
+        logger.error("Profile update error: %s", e)
         return jsonify({'error': 'Failed to update profile'}), 500
 
 @auth_bp.route('/change-password', methods=['POST'])
@@ -190,8 +223,10 @@ def change_password():
         else:
             return jsonify({'error': 'Failed to change password'}), 500
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Password change error: {e}")
+        logger.error("Password change error: %s", e)
         return jsonify({'error': 'Failed to change password'}), 500
 
 @auth_bp.route('/check-auth', methods=['GET'])
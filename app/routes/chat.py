@@ -1,19 +1,43 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, session
 from app.routes.auth import login_required
 from app.services.chat_service import chat_service
-from app.services.knowledge_service import knowledge_service
+from app.services.export_service import export_service, ImportTooLargeError, FORMATS, SECTIONS
+from app.services.knowledge_service import knowledge_service, ScheduleConflictError
 from app.models.chat import ChatHistory, ChatSession, StudySchedule, Reminder
 from app.models.knowledge_base import KnowledgeBase, UserNote
-from datetime import datetime, date, time
+from app.utils.db import db_manager, DatabaseUnavailableError
+from app.utils.http_cache import conditional_get
+from app.utils.json_encoder import jsonify
+from config import Config
+from datetime import datetime, date, time, timedelta
+from werkzeug.exceptions import RequestEntityTooLarge
+import csv
 import logging
+import zlib
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Create blueprint
 chat_bp = Blueprint('chat', __name__)
 
+def catalog_version(**kwargs):
+    """Catalog responses only change with the knowledge base revision"""
+    return KnowledgeBase.get_catalog_version()
+
+def history_version(**kwargs):
+    """History changes whenever a message is added to the user's (or requested session's) history"""
+    version = ChatHistory.get_version(session['user_id'], request.args.get('session_id'))
+    if version is None:
+        return None
+    return version, version[1]
+
+def notes_version(**kwargs):
+    """Notes change when one is added or edited"""
+    version = UserNote.get_version(session['user_id'])
+    if version is None:
+        return None
+    return version, version[1]
+
 @chat_bp.route('/message', methods=['POST'])
 @login_required
 def send_message():
@@ -40,33 +64,87 @@ def send_message():
             'intent': result['intent'],
             'subject': result['subject'],
             'confidence': result['confidence'],
+            'degraded': result.get('degraded', False),
             'timestamp': datetime.now().isoformat()
         }), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Message processing error: {e}")
+        logger.error("Message processing error: %s", e)
         return jsonify({'error': 'Failed to process message'}), 500
 
+@chat_bp.route('/messages:batch', methods=['POST'])
+@login_required
+def send_messages_batch():
+    """Send several messages to the chatbot in one request"""
+    try:
+        data = request.get_json()
+        messages = data.get('messages') if data else None
+        
+        if not isinstance(messages, list) or not messages:
+            return jsonify({'error': 'A non-empty list of messages is required'}), 400
+        
+        if len(messages) > Config.MAX_BATCH_MESSAGES:
+            return jsonify({'error': f'At most {Config.MAX_BATCH_MESSAGES} messages per batch'}), 400
+        
+        if not all(isinstance(message, str) and message.strip() for message in messages):
+            return jsonify({'error': 'Messages must be non-empty strings'}), 400
+        
+        user_id = session['user_id']
+        messages = [message.strip() for message in messages]
+        
+        # Process all messages together; results are in request order
+        results = chat_service.process_messages(user_id, messages, data.get('session_id'))
+        timestamp = datetime.now().isoformat()
+        
+        return jsonify({
+            'results': [dict(result, timestamp=timestamp) for result in results],
+            'session_id': results[0]['session_id'],
+            'count': len(results)
+        }), 200
+    
+    except DatabaseUnavailableError:
+        raise
+    except Exception as e:
+        logger.error("Batch message processing error: %s", e)
+        return jsonify({'error': 'Failed to process messages'}), 500
+
 @chat_bp.route('/history', methods=['GET'])
 @login_required
+@conditional_get(history_version)
 def get_chat_history():
     """Get user's chat history"""
     try:
         user_id = session['user_id']
         session_id = request.args.get('session_id')
         limit = int(request.args.get('limit', 50))
+        before = request.args.get('before')
+        if before:
+            try:
+                before = datetime.fromisoformat(before)
+            except ValueError:
+                return jsonify({'error': 'before must be an ISO 8601 timestamp'}), 400
+        before_id = request.args.get('before_id', type=int)
         
         if session_id:
-            history = ChatHistory.get_session_history(session_id, limit)
+            history = ChatHistory.get_session_history(session_id, limit, serialized=True)
         else:
-            history = ChatHistory.get_user_history(user_id, limit)
+            history = ChatHistory.get_user_history(user_id, limit, serialized=True,
+                                                   before=before, before_id=before_id)
         
+        # Pass next_before and next_before_id as ?before= and ?before_id= to fetch the next, older page
+        last = history[-1] if history and len(history) == limit and not session_id else None
         return jsonify({
-            'history': [chat.to_dict() for chat in history]
+            'history': history,
+            'next_before': last['timestamp'] if last else None,
+            'next_before_id': last['id'] if last else None
         }), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Chat history retrieval error: {e}")
+        logger.error("Chat history retrieval error: %s", e)
         return jsonify({'error': 'Failed to retrieve chat history'}), 500
 
 @chat_bp.route('/sessions', methods=['GET'])
@@ -88,8 +166,10 @@ def get_chat_sessions():
             } for s in sessions]
         }), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Chat sessions retrieval error: {e}")
+        logger.error("Chat sessions retrieval error: %s", e)
         return jsonify({'error': 'Failed to retrieve chat sessions'}), 500
 
 @chat_bp.route('/search', methods=['GET'])
@@ -104,15 +184,17 @@ def search_chat_history():
         if not search_term:
             return jsonify({'error': 'Search term is required'}), 400
         
-        history = ChatHistory.search_user_history(user_id, search_term, limit)
+        history = ChatHistory.search_user_history(user_id, search_term, limit, serialized=True)
         
         return jsonify({
-            'results': [chat.to_dict() for chat in history],
+            'results': history,
             'search_term': search_term
         }), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Chat history search error: {e}")
+        logger.error("Chat history search error: %s", e)
         return jsonify({'error': 'Failed to search chat history'}), 500
 
 @chat_bp.route('/knowledge/search', methods=['GET'])
@@ -123,36 +205,52 @@ def search_knowledge():
         query = request.args.get('q', '').strip()
         subject = request.args.get('subject')
         limit = int(request.args.get('limit', 10))
+        mode = request.args.get('mode', 'keyword')
         
         if not query:
             return jsonify({'error': 'Search query is required'}), 400
         
-        entries = knowledge_service.search_knowledge_base(query, subject, limit)
+        if mode not in ('keyword', 'semantic'):
+            return jsonify({'error': 'mode must be keyword or semantic'}), 400
+        
+        corrections = []
+        if mode == 'semantic':
+            entries = knowledge_service.semantic_search(query, subject, limit)
+        else:
+            entries, corrections = knowledge_service.search_with_corrections(query, subject, limit)
         
         return jsonify({
             'results': [entry.to_dict() for entry in entries],
             'query': query,
-            'subject': subject
+            'subject': subject,
+            'mode': mode,
+            'corrections': corrections
         }), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Knowledge search error: {e}")
+        logger.error("Knowledge search error: %s", e)
         return jsonify({'error': 'Failed to search knowledge base'}), 500
 
 @chat_bp.route('/subjects', methods=['GET'])
 @login_required
+@conditional_get(catalog_version, max_age=Config.CATALOG_CACHE_SECONDS)
 def get_subjects():
     """Get all available subjects"""
     try:
         subjects = KnowledgeBase.get_all_subjects()
         return jsonify({'subjects': subjects}), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Subjects retrieval error: {e}")
+        logger.error("Subjects retrieval error: %s", e)
         return jsonify({'error': 'Failed to retrieve subjects'}), 500
 
 @chat_bp.route('/subjects/<subject>/topics', methods=['GET'])
 @login_required
+@conditional_get(catalog_version, max_age=Config.CATALOG_CACHE_SECONDS)
 def get_subject_topics(subject):
     """Get topics for a subject"""
     try:
@@ -162,12 +260,15 @@ def get_subject_topics(subject):
             'topics': topics
         }), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Topics retrieval error: {e}")
+        logger.error("Topics retrieval error: %s", e)
         return jsonify({'error': 'Failed to retrieve topics'}), 500
 
 @chat_bp.route('/subjects/<subject>/overview', methods=['GET'])
 @login_required
+@conditional_get(catalog_version, max_age=Config.CATALOG_CACHE_SECONDS)
 def get_subject_overview(subject):
     """Get overview of a subject"""
     try:
@@ -177,27 +278,32 @@ def get_subject_overview(subject):
         
         return jsonify(overview), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Subject overview error: {e}")
+        logger.error("Subject overview error: %s", e)
         return jsonify({'error': 'Failed to retrieve subject overview'}), 500
 
 @chat_bp.route('/notes', methods=['GET'])
 @login_required
+@conditional_get(notes_version)
 def get_notes():
     """Get user's notes"""
     try:
         user_id = session['user_id']
         subject = request.args.get('subject')
         
-        notes = knowledge_service.get_user_notes(user_id, subject)
+        notes = knowledge_service.get_user_notes(user_id, subject, serialized=True)
         
         return jsonify({
-            'notes': [note.to_dict() for note in notes],
+            'notes': notes,
             'subject': subject
         }), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Notes retrieval error: {e}")
+        logger.error("Notes retrieval error: %s", e)
         return jsonify({'error': 'Failed to retrieve notes'}), 500
 
 @chat_bp.route('/notes', methods=['POST'])
@@ -225,8 +331,10 @@ def create_note():
         else:
             return jsonify({'error': 'Failed to create note'}), 500
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Note creation error: {e}")
+        logger.error("Note creation error: %s", e)
         return jsonify({'error': 'Failed to create note'}), 500
 
 @chat_bp.route('/notes/search', methods=['GET'])
@@ -240,15 +348,17 @@ def search_notes():
         if not search_term:
             return jsonify({'error': 'Search term is required'}), 400
         
-        notes = knowledge_service.search_user_notes(user_id, search_term)
+        notes = knowledge_service.search_user_notes(user_id, search_term, serialized=True)
         
         return jsonify({
-            'results': [note.to_dict() for note in notes],
+            'results': notes,
             'search_term': search_term
         }), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Notes search error: {e}")
+        logger.error("Notes search error: %s", e)
         return jsonify({'error': 'Failed to search notes'}), 500
 
 @chat_bp.route('/schedule', methods=['GET'])
@@ -274,8 +384,10 @@ def get_schedule():
             } for s in schedules]
         }), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Schedule retrieval error: {e}")
+        logger.error("Schedule retrieval error: %s", e)
         return jsonify({'error': 'Failed to retrieve schedule'}), 500
 
 @chat_bp.route('/schedule', methods=['POST'])
@@ -294,6 +406,7 @@ def create_schedule():
         # Parse date and time
         scheduled_date = datetime.strptime(data['scheduled_date'], '%Y-%m-%d').date()
         scheduled_time = datetime.strptime(data['scheduled_time'], '%H:%M').time()
+        duration_minutes = int(data.get('duration_minutes', 60))
         
         success = knowledge_service.create_study_schedule(
             user_id=user_id,
@@ -301,7 +414,7 @@ def create_schedule():
             topic=data['topic'],
             scheduled_date=scheduled_date,
             scheduled_time=scheduled_time,
-            duration_minutes=data.get('duration_minutes', 60),
+            duration_minutes=duration_minutes,
             notes=data.get('notes')
         )
         
@@ -310,12 +423,52 @@ def create_schedule():
         else:
             return jsonify({'error': 'Failed to create study schedule'}), 500
         
+    except ScheduleConflictError as e:
+        # Reject sessions that overlap an existing pending session
+        return jsonify({
+            'error': 'This session overlaps another scheduled study session',
+            'conflicts': e.conflicts
+        }), 409
     except ValueError as e:
         return jsonify({'error': 'Invalid date or time format'}), 400
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Schedule creation error: {e}")
+        logger.error("Schedule creation error: %s", e)
         return jsonify({'error': 'Failed to create study schedule'}), 500
 
+@chat_bp.route('/schedule/free-slots', methods=['GET'])
+@login_required
+def get_free_slots():
+    """Find free study slots for the user"""
+    try:
+        user_id = session['user_id']
+        duration_minutes = int(request.args.get('duration', 60))
+        days = int(request.args.get('days', 7))
+        limit = int(request.args.get('limit', 5))
+        
+        window_start = datetime.now().replace(second=0, microsecond=0)
+        slots = knowledge_service.find_free_slots(
+            user_id, duration_minutes, window_start,
+            window_start + timedelta(days=days), limit
+        )
+        
+        return jsonify({
+            'slots': [{
+                'start': start.isoformat(),
+                'end': end.isoformat()
+            } for start, end in slots],
+            'duration_minutes': duration_minutes
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({'error': 'Invalid duration, days or limit'}), 400
+    except DatabaseUnavailableError:
+        raise
+    except Exception as e:
+        logger.error("Free slot search error: %s", e)
+        return jsonify({'error': 'Failed to find free slots'}), 500
+
 @chat_bp.route('/reminders', methods=['GET'])
 @login_required
 def get_reminders():
@@ -337,8 +490,10 @@ def get_reminders():
             } for r in reminders]
         }), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Reminders retrieval error: {e}")
+        logger.error("Reminders retrieval error: %s", e)
         return jsonify({'error': 'Failed to retrieve reminders'}), 500
 
 @chat_bp.route('/reminders', methods=['POST'])
@@ -373,10 +528,74 @@ def create_reminder():
         
     except ValueError as e:
         return jsonify({'error': 'Invalid date or time format'}), 400
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Reminder creation error: {e}")
+        logger.error("Reminder creation error: %s", e)
         return jsonify({'error': 'Failed to create reminder'}), 500
 
+@chat_bp.route('/export', methods=['GET'])
+@login_required
+def export_data():
+    """Download the user's history, notes, schedules and reminders, streamed as it's read"""
+    fmt = request.args.get('format', 'jsonl')
+    if fmt not in FORMATS:
+        return jsonify({'error': f"Format must be one of: {', '.join(FORMATS)}"}), 400
+    
+    sections = request.args.get('sections')
+    sections = [name.strip() for name in sections.split(',')] if sections else list(SECTIONS)
+    unknown = [name for name in sections if name not in SECTIONS]
+    if unknown:
+        return jsonify({'error': f"Unknown sections: {', '.join(unknown)}"}), 400
+    
+    # Headers go out before the first row is read, so fail now rather than mid-download
+    if db_manager.breaker.is_open():
+        raise DatabaseUnavailableError("Database circuit breaker is open", Config.DB_BREAKER_RESET_SECONDS)
+    
+    user_id = session['user_id']
+    compress = request.args.get('gzip', 'false').lower() in ('1', 'true')
+    response = Response(export_service.export(user_id, fmt, sections, compress),
+                        mimetype=export_service.content_type(fmt, compress))
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename="{export_service.filename(user_id, fmt, compress)}"'
+    )
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@chat_bp.route('/import', methods=['POST'])
+@login_required
+def import_data():
+    """Add the records of an export (JSONL or CSV, optionally gzipped) to the user's account"""
+    try:
+        # Werkzeug enforces MAX_CONTENT_LENGTH on multipart uploads but not on a raw body
+        if Config.MAX_CONTENT_LENGTH and (request.content_length or 0) > Config.MAX_CONTENT_LENGTH:
+            return jsonify({'error': f'Upload is over the {Config.MAX_CONTENT_LENGTH} byte limit'}), 413
+        
+        # Either a multipart upload (spooled to disk by Werkzeug) or the raw request body
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        
+        counts = export_service.import_data(session['user_id'], stream)
+        if not any(counts.values()):
+            return jsonify({'error': 'No records found in the upload'}), 400
+        
+        return jsonify({'imported': counts}), 200
+    
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'Upload is over the {Config.MAX_CONTENT_LENGTH} byte limit'}), 413
+    except ImportTooLargeError as e:
+        return jsonify({'error': f'{e}; records before the limit were imported', 'imported': e.counts}), 413
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Upload is not UTF-8 text or gzip'}), 400
+    except (OSError, EOFError, zlib.error, csv.Error):
+        # Truncated or corrupt gzip, or malformed CSV
+        return jsonify({'error': 'Upload is not a readable export'}), 400
+    except DatabaseUnavailableError:
+        raise
+    except Exception as e:
+        logger.error("Import error: %s", e)
+        return jsonify({'error': 'Failed to import data'}), 500
+
 @chat_bp.route('/suggestions', methods=['GET'])
 @login_required
 def get_suggestions():
@@ -387,12 +606,15 @@ def get_suggestions():
         
         return jsonify({'suggestions': suggestions}), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Suggestions retrieval error: {e}")
+        logger.error("Suggestions retrieval error: %s", e)
         return jsonify({'error': 'Failed to retrieve suggestions'}), 500
 
 @chat_bp.route('/learning-path/<subject>', methods=['GET'])
 @login_required
+@conditional_get(catalog_version, max_age=Config.CATALOG_CACHE_SECONDS)
 def get_learning_path(subject):
     """Get learning path for a subject"""
     try:
@@ -404,6 +626,8 @@ def get_learning_path(subject):
         
         return jsonify(path), 200
         
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Learning path error: {e}")
+        logger.error("Learning path error: %s", e)
         return jsonify({'error': 'Failed to retrieve learning path'}), 500
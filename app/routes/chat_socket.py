@@ -0,0 +1,158 @@
+import json
+import math
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+from flask import current_app, request, session
+from app.models.chat import ChatSession
+from app.services.chat_service import chat_service
+from app.services.push_service import push_service
+from app.utils.json_encoder import response_encoder
+from app.utils.metrics import metrics
+from app.utils.rate_limit import rate_limiter, rate_limited_total, client_keys
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+# Chat socket metrics
+socket_messages = metrics.counter(
+    'websocket_messages_total', 'Frames received on chat sockets', ('outcome',)
+)
+socket_message_duration = metrics.histogram(
+    'websocket_message_duration_seconds', 'Time from receiving a chat socket frame to sending its reply'
+)
+
+# Origins besides the app's own host that may open chat sockets
+ALLOWED_ORIGINS = {origin.strip().rstrip('/') for origin in Config.WEBSOCKET_ALLOWED_ORIGINS.split(',')
+                   if origin.strip()}
+
+def origin_allowed():
+    """Whether a handshake comes from the app's own pages or an allowed origin.
+    
+    Browsers send the session cookie with a WebSocket handshake from any
+    site and don't preflight it, so Origin is the only cross-site check.
+    Clients that send no Origin aren't browsers and can't borrow a
+    visitor's cookie.
+    """
+    origin = request.headers.get('Origin')
+    if origin is None:
+        return True
+    return origin.rstrip('/') in ALLOWED_ORIGINS or urlsplit(origin).netloc == request.host
+
+def session_user():
+    """The user the socket's session cookie belongs to now, re-read from the session store"""
+    stored = current_app.session_interface.open_session(current_app, request)
+    return stored.get('user_id') if stored is not None else None
+
+def send(ws, message):
+    # Text frames, so browsers get strings rather than Blobs
+    ws.send(response_encoder.dumps(message).decode('utf-8'))
+
+def reply_to(user_id, clients, connection, text):
+    """The reply frame for one frame from the client"""
+    try:
+        frame = json.loads(text)
+    except ValueError:
+        frame = None
+    if not isinstance(frame, dict):
+        socket_messages.inc(outcome='invalid')
+        return {'type': 'error', 'error': 'Frames must be JSON objects'}
+    
+    frame_id = frame.get('id')
+    kind = frame.get('type', 'message')
+    if kind == 'ping':
+        return {'type': 'pong', 'id': frame_id}
+    if kind != 'message':
+        socket_messages.inc(outcome='invalid')
+        return {'type': 'error', 'id': frame_id, 'error': f'Unknown frame type: {kind}'}
+    
+    message = frame.get('message')
+    if not isinstance(message, str) or not message.strip():
+        socket_messages.inc(outcome='invalid')
+        return {'type': 'error', 'id': frame_id, 'error': 'Message cannot be empty'}
+    
+    # Messages share the HTTP endpoint's bucket, so switching transports doesn't double the limit
+    if Config.RATE_LIMIT_ENABLED:
+        wait = rate_limiter.check('chat.send_message', clients)
+        if wait:
+            rate_limited_total.inc(endpoint='chat.send_message')
+            socket_messages.inc(outcome='rate_limited')
+            return {'type': 'error', 'id': frame_id, 'error': 'Too many requests, please slow down',
+                    'retry_after': max(1, math.ceil(wait))}
+    
+    session_id = frame.get('session_id')
+    if session_id and connection.chat_session is not None and session_id != connection.chat_session.id:
+        connection.chat_session = None
+    if connection.chat_session is not None:
+        result = chat_service.process_message(user_id, message.strip(), chat_session=connection.chat_session)
+    else:
+        result = chat_service.process_message(user_id, message.strip(), session_id)
+        if result['session_id']:
+            connection.chat_session = ChatSession(id=result['session_id'], user_id=user_id)
+    
+    socket_messages.inc(outcome='ok')
+    return {
+        'type': 'response',
+        'id': frame_id,
+        'response': result['response'],
+        'session_id': result['session_id'],
+        'intent': result['intent'],
+        'subject': result['subject'],
+        'confidence': result['confidence'],
+        'degraded': result.get('degraded', False),
+        'timestamp': datetime.now().isoformat()
+    }
+
+def chat_socket(ws):
+    """Chat over a WebSocket: authenticated once at the handshake, then a reply frame per message frame.
+    
+    The user and their chat session stay in memory for the life of the
+    connection, so a turn skips the session cookie, Flask-Session's file
+    and the session lookup. Frames are JSON: {"type": "message", "id": ...,
+    "message": ..., "session_id": ...} is answered by a "response" frame
+    with the same id, and due reminders arrive unprompted as "reminder"
+    frames within WEBSOCKET_PUSH_SECONDS of being queued. The session is
+    re-read every WEBSOCKET_SESSION_CHECK_SECONDS, so the socket closes
+    once it expires or the user logs out in another worker.
+    """
+    user_id = session.get('user_id')
+    if not user_id:
+        send(ws, {'type': 'error', 'error': 'Authentication required'})
+        ws.close(1008, 'Authentication required')
+        return
+    
+    clients = client_keys()
+    connection = push_service.connect(user_id)
+    checked = time.monotonic()
+    try:
+        send(ws, {'type': 'ready', 'user_id': user_id})
+        while not connection.closed:
+            if time.monotonic() - checked >= Config.WEBSOCKET_SESSION_CHECK_SECONDS:
+                checked = time.monotonic()
+                if session_user() != user_id:
+                    break
+            for message in connection.drain():
+                send(ws, message)
+            text = ws.receive(timeout=Config.WEBSOCKET_PUSH_SECONDS)
+            if text is None:
+                continue
+            
+            started = time.perf_counter()
+            try:
+                reply = reply_to(user_id, clients, connection, text)
+            except Exception as e:
+                logger.error("Chat socket message error: %s", e)
+                socket_messages.inc(outcome='error')
+                reply = {'type': 'error', 'error': 'Failed to process message'}
+            send(ws, reply)
+            socket_message_duration.observe(time.perf_counter() - started)
+        # Signed out or expired while connected
+        ws.close(1008, 'Signed out')
+    finally:
+        push_service.disconnect(connection)
@@ -1,13 +1,15 @@
 import random
-from datetime import datetime, timedelta
+import re
+from datetime import datetime, time, timedelta
 from app.models.knowledge_base import KnowledgeBase
 from app.models.chat import ChatHistory, ChatSession, StudySchedule, Reminder
 from app.services.nlp_service import nlp_service
+from app.services.knowledge_service import knowledge_service, ScheduleConflictError
+from app.services.profile_service import profile_service
+from app.utils.db import DatabaseUnavailableError
 from config import Config
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class ChatService:
@@ -43,15 +45,50 @@ class ChatService:
             "Review material within 24 hours to improve retention.",
             "Get enough sleep - your brain consolidates memories during rest!"
         ]
+        
+        # Intents answered without the database, so they still work while it's unavailable
+        self.offline_intents = {'greeting', 'goodbye', 'study_tip'}
+        
+        # Request phrasing cut from a message (after its dates and times) to leave what
+        # a reminder or study session is about
+        self.reminder_prefix = re.compile(
+            r"^(?:(?:please|can you|could you|would you)\s+)*"
+            r"(?:remind me|(?:set|add|create|make)\s+(?:me\s+)?(?:an?\s+)?reminder|reminder"
+            r"|don'?t let me forget|alert me|ping me)(?:\s+(?:to|about|of|for|that))?\b[\s:,-]*",
+            re.IGNORECASE
+        )
+        self.schedule_prefix = re.compile(
+            r"^(?:(?:please|can you|could you|would you)\s+)*"
+            r"(?:schedule|plan|book|add|put|set up|block out)(?:\s+(?:me|in))?(?:\s+(?:an?|my|some))?"
+            r"(?:\s+study)?(?:\s+(?:session|block|time|slot))?(?:\s+(?:for|on|to study|of|about))?\b[\s:,-]*",
+            re.IGNORECASE
+        )
+        self.dangling_words = {'at', 'on', 'in', 'for', 'by', 'the', 'this', 'next', 'of', 'to',
+                               'about', 'and', 'please', 'from', 'until'}
+        # Openings of questions about what's already there ("when is my exam on Friday?")
+        self.question_lead = re.compile(
+            r"^(?:what|when|where|which|who|whose|why|how|do|does|did|is|are|am|was|were|have|has"
+            r"|had|will(?! you)|shall|should|(?:can|could|may) i|any)\b",
+            re.IGNORECASE
+        )
+        self.polite_lead = re.compile(r"^(?:please\s+)?(?:can|could|would|will) you\b", re.IGNORECASE)
     
-    def process_message(self, user_id, message, session_id=None):
-        """Process user message and generate response"""
+    def process_message(self, user_id, message, session_id=None, chat_session=None):
+        """Process user message and generate response.
+        
+        Callers that keep the ChatSession between messages (the chat
+        socket) pass it as chat_session to skip looking it up each turn.
+        """
+        analysis = None
         try:
             # Analyze the message using NLP
             analysis = nlp_service.process_message(message)
             
             # Create or get chat session
-            if not session_id:
+            if chat_session is not None:
+                session = chat_session
+                session_id = session.id
+            elif not session_id:
                 session = ChatSession(user_id=user_id)
                 session_id = session.save()
             else:
@@ -74,8 +111,11 @@ class ChatService:
             )
             chat_history.save()
             
-            # Update session message count
-            session.increment_message_count()
+            # Update session message count (atomically, as a held session's count may be stale)
+            session.add_messages(1)
+            
+            # Update the user's interest profile from this analysis
+            profile_service.record(user_id, analysis)
             
             return {
                 'response': response,
@@ -85,8 +125,11 @@ class ChatService:
                 'confidence': analysis['confidence']
             }
             
+        except DatabaseUnavailableError as e:
+            logger.warning("Answering without the database: %s", e)
+            return self.degraded_result(analysis, session_id)
         except Exception as e:
-            logger.error(f"Error processing message: {e}")
+            logger.error("Error processing message: %s", e)
             return {
                 'response': "I'm sorry, I encountered an error. Please try again.",
                 'session_id': session_id,
@@ -95,7 +138,107 @@ class ChatService:
                 'confidence': 0.0
             }
     
-    def generate_response(self, analysis, user_id):
+    def process_messages(self, user_id, messages, session_id=None):
+        """Process several messages in one pass; results come back in order.
+        
+        If the database becomes unavailable partway through, the messages
+        already answered keep their replies (and any reminders or sessions
+        they created) and their history is saved; only the rest come back
+        degraded, so a client retrying those doesn't repeat the others.
+        """
+        analyses = None
+        try:
+            # Analyze all messages with batched NLP
+            analyses = nlp_service.process_messages(messages)
+            
+            # Resolve the session once for the whole batch
+            session = ChatSession.find_by_id(session_id) if session_id else None
+            if not session:
+                session = ChatSession(user_id=user_id)
+                session_id = session.save()
+            
+            # Look up knowledge for every question with one combined query
+            questions = [i for i, analysis in enumerate(analyses)
+                         if analysis['intent'] == 'question' and analysis['keywords']]
+            for i in questions:
+                keywords, corrections = knowledge_service.correct_keywords(analyses[i]['keywords'])
+                analyses[i].update(keywords=keywords, corrections=corrections)
+            prefetched = dict(zip(questions, KnowledgeBase.search_by_keywords_batch(
+                [' '.join(analyses[i]['keywords']) for i in questions]
+            ))) if questions else {}
+            
+            # Messages with side effects (reminders, schedules, notes) run in order
+            histories = []
+            results = []
+            unavailable = None
+            for i, (message, analysis) in enumerate(zip(messages, analyses)):
+                try:
+                    response = self.generate_response(analysis, user_id, prefetched.get(i))
+                except DatabaseUnavailableError as e:
+                    unavailable = e
+                    break
+                histories.append(ChatHistory(
+                    session_id=session_id,
+                    user_id=user_id,
+                    message=message,
+                    response=response,
+                    message_type=analysis['intent'],
+                    confidence_score=analysis['confidence']
+                ))
+                results.append({
+                    'response': response,
+                    'session_id': session_id,
+                    'intent': analysis['intent'],
+                    'subject': analysis['subject'],
+                    'confidence': analysis['confidence']
+                })
+            
+            # One executemany for the history rows and one counter update
+            if histories:
+                try:
+                    ChatHistory.save_many(histories)
+                    session.add_messages(len(histories))
+                    profile_service.record_many(user_id, analyses[:len(histories)])
+                except DatabaseUnavailableError as e:
+                    # The replies stand: what they did is saved, so retrying them would repeat it
+                    logger.warning("Could not save history for %s answered messages: %s", len(histories), e)
+            
+            if unavailable is not None:
+                logger.warning("Database unavailable after %s of %s messages in a batch: %s",
+                               len(results), len(messages), unavailable)
+                results += [self.degraded_result(analysis, session_id) for analysis in analyses[len(results):]]
+            return results
+        
+        except DatabaseUnavailableError as e:
+            logger.warning("Answering message batch without the database: %s", e)
+            return [self.degraded_result(analysis, session_id) for analysis in analyses or [None] * len(messages)]
+        except Exception as e:
+            logger.error("Error processing message batch: %s", e)
+            return [{
+                'response': "I'm sorry, I encountered an error. Please try again.",
+                'session_id': session_id,
+                'intent': 'error',
+                'subject': None,
+                'confidence': 0.0
+            } for _ in messages]
+    
+    def degraded_result(self, analysis, session_id):
+        """Reply while the database is unavailable: offline intents still get an answer, nothing is saved"""
+        if analysis and analysis['intent'] in self.offline_intents:
+            response = self.generate_response(analysis, None)
+        else:
+            response = ("I can't reach my study materials right now, so I couldn't answer that. "
+                        "Please try again in a minute.")
+        return {
+            'response': response,
+            'session_id': session_id,
+            'intent': analysis['intent'] if analysis else 'error',
+            'subject': analysis['subject'] if analysis else None,
+            'confidence': analysis['confidence'] if analysis else 0.0,
+            'degraded': True
+        }
+    
+    def generate_response(self, analysis, user_id, knowledge_entries=None):
         """Generate response based on message analysis"""
         intent = analysis['intent']
         subject = analysis['subject']
@@ -108,7 +251,8 @@ class ChatService:
             return random.choice(self.goodbye_responses)
         
         elif intent == 'question':
-            return self.handle_question(keywords, subject, user_id)
+            return self.handle_question(keywords, subject, user_id, knowledge_entries,
+                                        analysis.get('corrections'))
         
         elif intent == 'study_tip':
             return self.handle_study_tip_request(subject, keywords)
@@ -125,19 +269,31 @@ class ChatService:
         else:
             return self.handle_general_query(keywords, subject, user_id)
     
-    def handle_question(self, keywords, subject, user_id):
+    def handle_question(self, keywords, subject, user_id, knowledge_entries=None, corrections=None):
         """Handle educational questions"""
         if not keywords:
             return "What would you like to know? Please ask me a specific question about any subject!"
         
-        # Search knowledge base
-        knowledge_entries = KnowledgeBase.search_by_keywords(' '.join(keywords))
+        # Correct typos and search knowledge base unless the caller already did
+        if knowledge_entries is None:
+            keywords, corrections = knowledge_service.correct_keywords(keywords)
+            knowledge_entries = KnowledgeBase.search_by_keywords(' '.join(keywords))
+        corrections = corrections or []
+        
+        # Fall back to semantic search when no keyword matches
+        if not knowledge_entries:
+            knowledge_entries = knowledge_service.semantic_search(' '.join(keywords), subject, 5)
         
         if knowledge_entries:
             # Find the best match
             best_match = knowledge_entries[0]
             response = f"**{best_match.topic}**\n\n{best_match.content}"
             
+            if corrections:
+                replaced = ', '.join(f'"{correction["corrected"]}" instead of "{correction["original"]}"'
+                                     for correction in corrections)
+                response = f"_Showing results for {replaced}_\n\n{response}"
+            
             if len(knowledge_entries) > 1:
                 response += f"\n\nI found {len(knowledge_entries)} related topics. Would you like to know more about any specific aspect?"
             
@@ -194,13 +350,27 @@ class ChatService:
         return f"Here's a helpful study tip:\n\n{tip}\n\nWould you like tips for a specific subject?"
     
     def handle_reminder_request(self, analysis, user_id):
-        """Handle reminder creation requests"""
+        """Create a reminder from the message, or ask for what's missing"""
         message = analysis['original_message']
+        now = datetime.now().replace(second=0, microsecond=0)
         
-        # Extract date/time information
-        datetime_info = nlp_service.extract_date_time(message)
+        # Resolve "tomorrow at 2 PM" and the like to a concrete date and time
+        expression = nlp_service.parse_date_time(message, now)
+        if self.is_request(message, expression, self.reminder_prefix):
+            when = expression.at(now)
+            title = self.describe(message, expression, self.reminder_prefix)
+            if when is not None and title:
+                if when < now:
+                    return f"That time has already passed. When should I remind you about \"{title}\"?"
+                if not knowledge_service.create_reminder(user_id, title[:100], message,
+                                                         when.date(), when.time()):
+                    return "Sorry, I couldn't save that reminder. Please try again in a moment."
+                return (f"✅ Reminder set: **{title}**\n"
+                        f"📅 {when.strftime('%A, %B %d')} at {when.strftime('%H:%M')}")
+        elif self.is_question(message):
+            return self.list_reminders(user_id)
         
-        if datetime_info['dates'] or datetime_info['times']:
+        if expression:
             return ("I can help you set up reminders! To create a reminder, please provide:\n"
                    "1. What you want to be reminded about\n"
                    "2. The date (e.g., 'tomorrow', '12/25/2024')\n"
@@ -211,12 +381,73 @@ class ChatService:
                "Please tell me what you want to be reminded about and when. "
                "For example: 'Remind me to review math notes tomorrow at 3 PM'")
     
+    def list_reminders(self, user_id):
+        """Describe the user's upcoming reminders"""
+        reminders = Reminder.get_pending_reminders(user_id, 5)
+        if not reminders:
+            return ("You don't have any upcoming reminders. "
+                   "To add one, try: 'Remind me to review math notes tomorrow at 3 PM'")
+        
+        response = "Here are your upcoming reminders:\n\n"
+        for reminder in reminders:
+            response += f"• **{reminder.title}**\n"
+            response += f"  📅 {reminder.reminder_date} at {reminder.reminder_time}\n\n"
+        return response + "Would you like to set another one?"
+    
+    def is_question(self, message):
+        """Whether a message asks about something rather than asking for something.
+        
+        Polite requests ("Can you remind me to ...?") aren't questions, and a
+        wh-word inside a request ("Remind me how to factor ...") doesn't make
+        one either, so this is stricter than nlp_service.is_question.
+        """
+        message = message.strip()
+        if self.question_lead.match(message):
+            return True
+        return message.endswith('?') and not self.polite_lead.match(message)
+    
+    def is_request(self, message, expression, prefix):
+        """Whether a message asks for a reminder or study session to be created.
+        
+        Questions ("What do I have scheduled tomorrow?") and other requests
+        ("Cancel my session tomorrow at 4pm") mention dates and times too, so
+        only a message that opens with the request phrasing, once its dates
+        and times are cut out, is taken as one.
+        """
+        if self.is_question(message):
+            return False
+        words = expression.strip(message).split()
+        while words and words[0].lower().strip('.,!?;:-') in self.dangling_words | {''}:
+            words.pop(0)
+        return prefix.match(' '.join(words)) is not None
+    
+    def describe(self, message, expression, prefix):
+        """What a request is about: the message without its dates, times and request phrasing"""
+        words = prefix.sub('', expression.strip(message)).strip(' .,!?;:-').split()
+        while words and words[-1].lower().strip('.,!?;:') in self.dangling_words:
+            words.pop()
+        while words and words[0].lower() in self.dangling_words:
+            words.pop(0)
+        return ' '.join(words).strip(' .,!?;:-')
+    
     def handle_schedule_request(self, analysis, user_id):
         """Handle study schedule requests"""
         message = analysis['original_message']
         subject = analysis['subject']
+        message_lower = message.lower()
+        
+        # "Find me 2 hours this week" style requests
+        if any(word in message_lower for word in ('free', 'find', 'available', 'slot')):
+            return self.handle_free_slot_request(message_lower, user_id)
         
-        if 'create' in message.lower() or 'make' in message.lower():
+        # "Schedule physics on Saturday at 10am for 90 minutes" books the session directly
+        now = datetime.now().replace(second=0, microsecond=0)
+        expression = nlp_service.parse_date_time(message, now)
+        if (expression.date or expression.time) and self.is_request(message, expression,
+                                                                    self.schedule_prefix):
+            return self.create_session_from_message(message, subject, expression, user_id, now)
+        
+        if 'create' in message_lower or 'make' in message_lower:
             return ("I can help you create a study schedule! Please provide:\n"
                    "1. Subject you want to study\n"
                    "2. Topics you need to cover\n"
@@ -241,6 +472,84 @@ class ChatService:
         
         return response
     
+    def create_session_from_message(self, message, subject, expression, user_id, now):
+        """Book the study session a message describes, checking it against the user's schedule"""
+        duration = expression.duration_minutes or 60
+        subject_name = subject.title() if subject else 'General'
+        topic = self.describe(message, expression, self.schedule_prefix) or subject_name
+        
+        if expression.time is None:
+            # A day without a time: take the first free slot that day
+            slots = self.free_slots_on(user_id, expression.date, duration, now, limit=1)
+            if not slots:
+                return (f"I couldn't find a free {duration}-minute slot on "
+                        f"{expression.date.strftime('%A, %B %d')}. Try another day or a shorter session!")
+            start = slots[0][0]
+        else:
+            start = expression.at(now)
+        
+        if start < now:
+            return "That time has already passed. When would you like to study?"
+        
+        try:
+            created = knowledge_service.create_study_schedule(user_id, subject_name[:50], topic[:100],
+                                                              start.date(), start.time(), duration,
+                                                              notes=message)
+        except ScheduleConflictError:
+            slots = self.free_slots_on(user_id, start.date(), duration, now, limit=3)
+            response = (f"That overlaps another study session on {start.strftime('%A, %B %d')} "
+                        f"at {start.strftime('%H:%M')}.")
+            if slots:
+                response += f" Free {duration}-minute slots that day:\n\n"
+                for slot_start, slot_end in slots:
+                    response += f"• {slot_start.strftime('%H:%M')} to {slot_end.strftime('%H:%M')}\n"
+            return response
+        
+        if not created:
+            return "Sorry, I couldn't save that study session. Please try again in a moment."
+        return (f"✅ Study session scheduled: **{subject_name}** - {topic}\n"
+                f"📅 {start.strftime('%A, %B %d')} at {start.strftime('%H:%M')}\n"
+                f"⏱️ {duration} minutes")
+    
+    def free_slots_on(self, user_id, day, duration, now, limit):
+        """Free study slots of duration minutes on day, starting no earlier than now"""
+        day_start = datetime.combine(day, time())
+        return knowledge_service.find_free_slots(user_id, duration, max(now, day_start),
+                                                 day_start + timedelta(days=1), limit=limit)
+    
+    def handle_free_slot_request(self, message, user_id):
+        """Find free study slots in the user's schedule"""
+        duration = nlp_service.extract_study_duration(message)
+        now = datetime.now().replace(second=0, microsecond=0)
+        
+        if 'today' in message:
+            window_end = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        elif 'tomorrow' in message:
+            now = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            window_end = now + timedelta(days=1)
+        elif 'this week' in message:
+            # Until the end of Sunday
+            window_end = datetime.combine(now.date() + timedelta(days=7 - now.weekday()),
+                                          datetime.min.time())
+        elif 'next week' in message:
+            now = datetime.combine(now.date() + timedelta(days=7 - now.weekday()),
+                                   datetime.min.time())
+            window_end = now + timedelta(days=7)
+        else:
+            window_end = now + timedelta(days=7)
+        
+        slots = knowledge_service.find_free_slots(user_id, duration, now, window_end, limit=3)
+        
+        if not slots:
+            return (f"I couldn't find a free {duration}-minute slot in that time frame. "
+                    "Try a shorter session or a different week!")
+        
+        response = f"Here are some free {duration}-minute slots for studying:\n\n"
+        for start, end in slots:
+            response += f"• 📅 {start.strftime('%A %Y-%m-%d')} from {start.strftime('%H:%M')} to {end.strftime('%H:%M')}\n"
+        response += "\nWould you like me to schedule one of these sessions for you?"
+        return response
+    
     def handle_note_request(self, analysis, user_id):
         """Handle note-related requests"""
         return ("I can help you with note-taking strategies! Here are some effective methods:\n\n"
@@ -274,22 +583,17 @@ class ChatService:
     
     def get_personalized_suggestions(self, user_id):
         """Get personalized study suggestions for user"""
-        # Get user's recent chat history
-        recent_chats = ChatHistory.get_user_history(user_id, 10)
+        profile = profile_service.get_profile(user_id)
         
-        if not recent_chats:
+        if not profile.message_count:
             return "Start by asking me questions about any subject you're studying!"
         
-        # Analyze user's interests
-        subjects_mentioned = []
-        for chat in recent_chats:
-            analysis = nlp_service.process_message(chat.message)
-            if analysis['subject']:
-                subjects_mentioned.append(analysis['subject'])
-        
-        if subjects_mentioned:
-            most_common_subject = max(set(subjects_mentioned), key=subjects_mentioned.count)
-            return f"Based on our conversations, you seem interested in {most_common_subject}. Would you like some advanced topics or practice problems in this area?"
+        # Interests are tracked incrementally as messages arrive
+        top_subjects = profile.top_subjects(1)
+        if top_subjects:
+            if profile.difficulty_level == 'beginner':
+                return f"Based on our conversations, you seem interested in {top_subjects[0]}. Would you like to go over the fundamentals or try some practice problems?"
+            return f"Based on our conversations, you seem interested in {top_subjects[0]}. Would you like some advanced topics or practice problems in this area?"
         
         return "Feel free to ask me about any subject - I'm here to help with your studies!"
 
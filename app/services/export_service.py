@@ -0,0 +1,393 @@
+import csv
+import gzip
+import io
+import itertools
+import json
+import zlib
+from datetime import date, datetime, time
+from app.models.chat import ChatSession
+from app.utils.chat_archive import chat_archive
+from app.utils.db import db_manager, DatabaseUnavailableError
+from app.utils.json_encoder import encode_value, response_encoder
+from app.utils.metrics import metrics
+from app.utils.schedule_index import schedule_index
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Exported tables and columns per section, in file order; ids are left out as an import assigns new ones
+SECTIONS = {
+    'history': ('chat_history', ('session_id', 'message', 'response', 'message_type',
+                                 'confidence_score', 'timestamp')),
+    'notes': ('user_notes', ('subject', 'topic', 'note_content', 'created_at', 'updated_at')),
+    'schedules': ('study_schedules', ('subject', 'topic', 'scheduled_date', 'scheduled_time',
+                                      'duration_minutes', 'status', 'notes', 'created_at')),
+    'reminders': ('reminders', ('title', 'description', 'reminder_date', 'reminder_time',
+                                'is_completed', 'created_at'))
+}
+
+# Fields an imported record can't do without
+REQUIRED_FIELDS = {
+    'history': ('session_id', 'message', 'response'),
+    'notes': ('subject', 'topic', 'note_content'),
+    'schedules': ('subject', 'topic', 'scheduled_date', 'scheduled_time'),
+    'reminders': ('title', 'reminder_date', 'reminder_time')
+}
+
+# Values for optional fields an imported record leaves out (timestamps default to the import time)
+DEFAULTS = {
+    'message_type': 'general',
+    'confidence_score': 0.0,
+    'duration_minutes': 60,
+    'status': 'pending',
+    'is_completed': False
+}
+TIMESTAMP_FIELDS = ('timestamp', 'created_at', 'updated_at')
+
+# ENUM columns outside chat history (whose types follow the intent classifier)
+CHOICES = {'status': ('pending', 'completed', 'missed')}
+
+def parse_bool(value):
+    return value if isinstance(value, bool) else str(value).lower() in ('1', 'true', 'yes')
+
+# Turn exported text back into column values
+PARSERS = {
+    'session_id': int,
+    'confidence_score': float,
+    'duration_minutes': int,
+    'is_completed': parse_bool,
+    'timestamp': datetime.fromisoformat,
+    'created_at': datetime.fromisoformat,
+    'updated_at': datetime.fromisoformat,
+    'scheduled_date': date.fromisoformat,
+    'reminder_date': date.fromisoformat,
+    'scheduled_time': time.fromisoformat,
+    'reminder_time': time.fromisoformat
+}
+
+FORMATS = {
+    'jsonl': ('.jsonl', 'application/x-ndjson'),
+    'csv': ('.csv', 'text/csv')
+}
+
+# Output is handed on (and compressed) in chunks of about this size
+CHUNK_BYTES = 64 * 1024
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Export and import metrics
+records_exported = metrics.counter(
+    'export_records_total', 'Records written to user data exports', ('section',)
+)
+records_imported = metrics.counter(
+    'import_records_total', 'Records read from user data imports', ('outcome',)
+)
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (str, int, float)):
+        return value
+    return encode_value(value)
+
+class ImportTooLargeError(Exception):
+    """An upload decompressed to more than IMPORT_MAX_BYTES; counts holds what was imported before it"""
+    
+    def __init__(self, limit, counts=None):
+        super().__init__(f"Import is over {limit} bytes once decompressed")
+        self.limit = limit
+        self.counts = counts
+
+class CappedStream(io.RawIOBase):
+    """A binary stream that raises ImportTooLargeError once more than limit bytes are read from it"""
+    
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.limit = limit
+        self.remaining = limit
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        size = self.stream.readinto(buffer)
+        self.remaining -= size
+        if self.remaining < 0:
+            raise ImportTooLargeError(self.limit)
+        return size
+
+class ReplayStream(io.RawIOBase):
+    """A binary stream with bytes already read from it put back in front"""
+    
+    def __init__(self, head, stream):
+        self.head = head
+        self.stream = stream
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        if self.head:
+            data, self.head = self.head[:len(buffer)], self.head[len(buffer):]
+        else:
+            data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+class ExportService:
+    """Streams a user's history, notes, schedules and reminders out as JSONL or CSV, and back in.
+    
+    Rows come from server-side cursors (DatabaseManager.stream_query) and
+    are written out in CHUNK_BYTES pieces, optionally gzipped on the fly,
+    so memory stays flat however large the account is. Imports read the
+    same files a line at a time and insert them batch_size rows at a time.
+    """
+    
+    def __init__(self, batch_size=1000, max_import_bytes=None):
+        self.batch_size = batch_size
+        self.max_import_bytes = max_import_bytes or Config.IMPORT_MAX_BYTES
+    
+    def filename(self, user_id, fmt='jsonl', compress=False):
+        extension = FORMATS[fmt][0] + ('.gz' if compress else '')
+        return f"user-{user_id}-export-{date.today().isoformat()}{extension}"
+    
+    def content_type(self, fmt='jsonl', compress=False):
+        return 'application/gzip' if compress else FORMATS[fmt][1]
+    
+    def archived_history(self, user_id, fields):
+        """The user's archived turns, oldest first, one segment in memory at a time"""
+        newest = None
+        for path in chat_archive.segments(user_id, newest_first=False):
+            for row in chat_archive.read_segment(path, cache=False):
+                # A segment archived twice (after a crash mid-archive) repeats turns already sent
+                key = (row['timestamp'] or datetime.min, row['id'])
+                if newest is not None and key <= newest:
+                    continue
+                newest = key
+                yield {field: row[field] for field in fields}
+    
+    def records(self, user_id, sections):
+        """(section, row) for every exported record, section by section, each in insertion order"""
+        for section in sections:
+            table, fields = SECTIONS[section]
+            query = f"SELECT {', '.join(fields)} FROM {table} WHERE user_id = %s"
+            if section == 'history' and Config.CHAT_ARCHIVE_ENABLED:
+                for row in self.archived_history(user_id, fields):
+                    yield section, row
+                # Skip turns left behind by an archive run that stopped before deleting them
+                query += """ AND NOT EXISTS (
+                    SELECT 1 FROM chat_archive_segments s
+                    WHERE s.user_id = chat_history.user_id
+                      AND chat_history.id BETWEEN s.first_id AND s.last_id
+                      AND chat_history.timestamp BETWEEN s.first_timestamp AND s.last_timestamp
+                )"""
+            for row in db_manager.stream_query(query + " ORDER BY id", (user_id,), self.batch_size):
+                yield section, row
+    
+    def jsonl_lines(self, user_id, sections):
+        yield response_encoder.dumps({
+            'type': 'export',
+            'version': 1,
+            'user_id': user_id,
+            'exported_at': datetime.now(),
+            'sections': sections
+        }) + b'\n'
+        for section, row in self.records(user_id, sections):
+            records_exported.inc(section=section)
+            yield response_encoder.dumps({'type': section, **row}) + b'\n'
+    
+    def csv_lines(self, user_id, sections):
+        """A block per section: a record_type header row, its rows, then a blank line"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        current = None
+        for section, row in self.records(user_id, sections):
+            if section != current:
+                if current is not None:
+                    writer.writerow([])
+                writer.writerow(('record_type',) + SECTIONS[section][1])
+                current = section
+            records_exported.inc(section=section)
+            writer.writerow([section] + [csv_value(value) for value in row.values()])
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    
+    def export(self, user_id, fmt='jsonl', sections=None, compress=False):
+        """Generate the export as byte chunks of about CHUNK_BYTES"""
+        sections = list(sections or SECTIONS)
+        lines = self.jsonl_lines(user_id, sections) if fmt == 'jsonl' else self.csv_lines(user_id, sections)
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        
+        pending, size = [], 0
+        for line in lines:
+            pending.append(line)
+            size += len(line)
+            if size >= CHUNK_BYTES:
+                chunk = b''.join(pending)
+                pending, size = [], 0
+                if compressor is not None:
+                    chunk = compressor.compress(chunk)
+                if chunk:
+                    yield chunk
+        
+        chunk = b''.join(pending)
+        if compressor is not None:
+            chunk = compressor.compress(chunk) + compressor.flush()
+        if chunk:
+            yield chunk
+    
+    def read_text(self, stream):
+        """Text lines of an uploaded export, gunzipped first if it's compressed.
+        
+        Reading past max_import_bytes of (decompressed) text raises
+        ImportTooLargeError, so a small gzip bomb can't expand without end.
+        """
+        head = stream.read(len(GZIP_MAGIC))
+        raw = io.BufferedReader(ReplayStream(head, stream), CHUNK_BYTES)
+        if head == GZIP_MAGIC:
+            raw = gzip.GzipFile(fileobj=raw, mode='rb')
+        raw = io.BufferedReader(CappedStream(raw, self.max_import_bytes), CHUNK_BYTES)
+        # newline='' leaves line endings inside quoted CSV fields to the csv module
+        return io.TextIOWrapper(raw, encoding='utf-8', newline='')
+    
+    def jsonl_records(self, lines):
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield None, None
+                continue
+            if isinstance(record, dict):
+                yield record.pop('type', None), record
+            else:
+                yield None, None
+    
+    def csv_records(self, lines):
+        fields = None
+        for row in csv.reader(lines):
+            if not row:
+                fields = None
+            elif row[0] == 'record_type':
+                fields = row[1:]
+            elif fields is None:
+                yield None, None
+            else:
+                yield row[0], dict(zip(fields, row[1:]))
+    
+    def import_values(self, section, record):
+        """Column values for an imported record in SECTIONS order, or None if it's unusable"""
+        values = {}
+        now = datetime.now()
+        for field in SECTIONS[section][1]:
+            value = record.get(field)
+            if value is None or value == '':
+                if field in REQUIRED_FIELDS[section]:
+                    return None
+                value = now if field in TIMESTAMP_FIELDS else DEFAULTS.get(field)
+            elif field in PARSERS:
+                try:
+                    value = PARSERS[field](value)
+                except (TypeError, ValueError):
+                    return None
+            if field in CHOICES and value not in CHOICES[field]:
+                return None
+            values[field] = value
+        return values
+    
+    def import_data(self, user_id, stream):
+        """Add the records of an export to a user's account; returns the count per section plus 'skipped'.
+        
+        The format and compression are detected from the content. Chat
+        sessions are recreated, so imported turns keep their grouping
+        under new session ids. Records are appended, not merged: importing
+        the same file twice adds everything twice. An upload over
+        max_import_bytes raises ImportTooLargeError with the counts of the
+        records imported before the limit.
+        """
+        text = self.read_text(stream)
+        first = text.readline()
+        lines = itertools.chain([first], text)
+        records = self.jsonl_records(lines) if first.lstrip().startswith('{') else self.csv_records(lines)
+        
+        counts = dict.fromkeys(SECTIONS, 0)
+        counts['skipped'] = 0
+        batches = {section: [] for section in SECTIONS}
+        sessions = {}
+        
+        try:
+            for section, record in records:
+                if section == 'export':
+                    continue
+                values = self.import_values(section, record) if section in SECTIONS else None
+                if values is not None and section == 'history':
+                    values['session_id'] = self.import_session(user_id, sessions, values)
+                    if values['session_id'] is None:
+                        values = None
+                if values is None:
+                    counts['skipped'] += 1
+                    continue
+                
+                batch = batches[section]
+                batch.append((user_id,) + tuple(values.values()))
+                if len(batch) >= self.batch_size:
+                    counts[section] += self.insert(section, batch)
+                    batch.clear()
+        except ImportTooLargeError as e:
+            # Finish off what was already inserted, but nothing past the limit
+            e.counts = counts
+            self.finish(user_id, counts, sessions)
+            raise
+        
+        for section, batch in batches.items():
+            counts[section] += self.insert(section, batch)
+        self.finish(user_id, counts, sessions)
+        return counts
+    
+    def finish(self, user_id, counts, sessions):
+        """Bring imported sessions' totals up to date and count the import"""
+        for session in sessions.values():
+            # Sessions were created empty; record the turns imported into them
+            if session is not None:
+                session.save()
+        if counts['schedules']:
+            schedule_index.invalidate(user_id)
+        
+        records_imported.inc(sum(counts[section] for section in SECTIONS), outcome='imported')
+        records_imported.inc(counts['skipped'], outcome='skipped')
+    
+    def import_session(self, user_id, sessions, values):
+        """The new id for a turn's exported session id, creating the session on its first turn"""
+        if values['session_id'] not in sessions:
+            session = ChatSession(user_id=user_id, session_start=values['timestamp'])
+            # None remembers a session that couldn't be created, so its turns don't each retry
+            sessions[values['session_id']] = session if session.save() else None
+        session = sessions[values['session_id']]
+        if session is None:
+            return None
+        session.total_messages += 1
+        session.session_end = values['timestamp']
+        return session.id
+    
+    def insert(self, section, batch):
+        if not batch:
+            return 0
+        table, fields = SECTIONS[section]
+        query = f"""
+            INSERT INTO {table} (user_id, {', '.join(fields)})
+            VALUES ({', '.join(['%s'] * (len(fields) + 1))})
+        """
+        try:
+            return db_manager.execute_many(query, batch)
+        except DatabaseUnavailableError:
+            raise
+        except Exception as e:
+            logger.error("Error importing %s %s records: %s", len(batch), section, e)
+            return 0
+
+# Global export service instance
+export_service = ExportService()
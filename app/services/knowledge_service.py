@@ -1,38 +1,86 @@
 from app.models.knowledge_base import KnowledgeBase, UserNote
 from app.models.chat import StudySchedule, Reminder
 from app.services.nlp_service import nlp_service
-from datetime import datetime, timedelta
+from app.services.profile_service import profile_service
+from app.utils.db import DatabaseUnavailableError
+from app.utils.schedule_index import schedule_index, schedule_bounds
+from app.utils.semantic_index import semantic_index
+from app.utils.fuzzy_index import term_corrector
+from datetime import datetime, timedelta, time
+from config import Config
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ScheduleConflictError(Exception):
+    """A proposed study session overlaps pending sessions; conflicts holds their ids"""
+    
+    def __init__(self, conflicts):
+        super().__init__("Study session overlaps another scheduled session")
+        self.conflicts = conflicts
+
 class KnowledgeService:
     def __init__(self):
         self.min_confidence_score = 0.7
     
     def search_knowledge_base(self, query, subject=None, limit=10):
         """Search knowledge base for relevant content"""
+        entries, _ = self.search_with_corrections(query, subject, limit)
+        return entries
+    
+    def search_with_corrections(self, query, subject=None, limit=10):
+        """Search knowledge base, correcting misspelled keywords first; returns (entries, corrections)"""
         try:
-            # Analyze query using NLP
-            analysis = nlp_service.process_message(query)
+            # Analyze query using NLP; a search query always needs the full parse
+            analysis = nlp_service.process_message(query, full=True)
             keywords = analysis['keywords']
             
             if not keywords:
-                return []
+                return [], []
             
             # Search by keywords
+            keywords, corrections = self.correct_keywords(keywords)
             entries = KnowledgeBase.search_by_keywords(' '.join(keywords), limit)
             
             # If subject is specified, filter results
             if subject and entries:
                 entries = [entry for entry in entries if entry.subject.lower() == subject.lower()]
             
-            return entries
+            return entries, corrections
+            
+        except DatabaseUnavailableError:
+            raise
+        except Exception as e:
+            logger.error("Error searching knowledge base: %s", e)
+            return [], []
+    
+    def correct_keywords(self, keywords):
+        """Replace misspelled keywords with the closest knowledge base terms"""
+        try:
+            if not Config.TYPO_CORRECTION_ENABLED:
+                return list(keywords), []
+            
+            return term_corrector.correct_terms(keywords)
+        
+        except DatabaseUnavailableError:
+            raise
+        except Exception as e:
+            logger.error("Error correcting keywords: %s", e)
+            return list(keywords), []
+    
+    def semantic_search(self, query, subject=None, limit=10):
+        """Search knowledge base by embedding similarity rather than exact keywords"""
+        try:
+            if not Config.SEMANTIC_SEARCH_ENABLED:
+                return []
             
+            matches = semantic_index.search(query, limit, subject=subject)
+            return KnowledgeBase.find_by_ids([entry_id for entry_id, _ in matches])
+        
+        except DatabaseUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Error searching knowledge base: {e}")
+            logger.error("Error in semantic search: %s", e)
             return []
     
     def get_study_materials(self, subject, topic=None, difficulty_level=None):
@@ -48,8 +96,10 @@ class KnowledgeService:
             
             return entries
             
+        except DatabaseUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Error getting study materials: {e}")
+            logger.error("Error getting study materials: %s", e)
             return []
     
     def save_user_note(self, user_id, subject, topic, content):
@@ -64,33 +114,45 @@ class KnowledgeService:
             note_id = note.save()
             return note_id is not None
             
+        except DatabaseUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Error saving user note: {e}")
+            logger.error("Error saving user note: %s", e)
             return False
     
-    def get_user_notes(self, user_id, subject=None):
+    def get_user_notes(self, user_id, subject=None, serialized=False):
         """Get user's notes"""
         try:
             if subject:
-                return UserNote.get_notes_by_subject(user_id, subject)
-            return UserNote.get_user_notes(user_id)
+                return UserNote.get_notes_by_subject(user_id, subject, serialized=serialized)
+            return UserNote.get_user_notes(user_id, serialized=serialized)
             
+        except DatabaseUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Error getting user notes: {e}")
+            logger.error("Error getting user notes: %s", e)
             return []
     
-    def search_user_notes(self, user_id, search_term):
+    def search_user_notes(self, user_id, search_term, serialized=False):
         """Search user's notes"""
         try:
-            return UserNote.search_user_notes(user_id, search_term)
+            return UserNote.search_user_notes(user_id, search_term, serialized=serialized)
+        except DatabaseUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Error searching user notes: {e}")
+            logger.error("Error searching user notes: %s", e)
             return []
     
     def create_study_schedule(self, user_id, subject, topic, scheduled_date,
                             scheduled_time, duration_minutes=60, notes=None):
-        """Create a study schedule"""
+        """Create a study schedule; raises ScheduleConflictError if it overlaps a pending one"""
         try:
+            # Refuse sessions that overlap an existing pending session
+            conflicts = self.find_schedule_conflicts(user_id, scheduled_date, scheduled_time,
+                                                     duration_minutes)
+            if conflicts:
+                raise ScheduleConflictError(conflicts)
+            
             schedule = StudySchedule(
                 user_id=user_id,
                 subject=subject,
@@ -103,10 +165,37 @@ class KnowledgeService:
             schedule_id = schedule.save()
             return schedule_id is not None
             
+        except (ScheduleConflictError, DatabaseUnavailableError):
+            raise
         except Exception as e:
-            logger.error(f"Error creating study schedule: {e}")
+            logger.error("Error creating study schedule: %s", e)
             return False
     
+    def find_schedule_conflicts(self, user_id, scheduled_date, scheduled_time,
+                                duration_minutes=60, exclude_id=None):
+        """Get ids of pending sessions overlapping the proposed session"""
+        start, end = schedule_bounds(scheduled_date, scheduled_time, duration_minutes)
+        return schedule_index.find_conflicts(user_id, start, end, exclude_id)
+    
+    def find_free_slots(self, user_id, duration_minutes=60, window_start=None,
+                        window_end=None, limit=5):
+        """Find free study slots for a user, defaulting to the next 7 days"""
+        try:
+            window_start = window_start or datetime.now().replace(second=0, microsecond=0)
+            window_end = window_end or window_start + timedelta(days=7)
+            return schedule_index.find_free_slots(
+                user_id, duration_minutes, window_start, window_end,
+                day_start=time(Config.STUDY_DAY_START_HOUR),
+                day_end=time(Config.STUDY_DAY_END_HOUR),
+                limit=limit
+            )
+        
+        except DatabaseUnavailableError:
+            raise
+        except Exception as e:
+            logger.error("Error finding free slots: %s", e)
+            return []
+    
     def get_study_schedules(self, user_id, upcoming_only=True):
         """Get user's study schedules"""
         try:
@@ -114,8 +203,10 @@ class KnowledgeService:
                 return StudySchedule.get_upcoming_schedules(user_id)
             return StudySchedule.get_user_schedules(user_id)
             
+        except DatabaseUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Error getting study schedules: {e}")
+            logger.error("Error getting study schedules: %s", e)
             return []
     
     def create_reminder(self, user_id, title, description, reminder_date, reminder_time):
@@ -131,8 +222,10 @@ class KnowledgeService:
             reminder_id = reminder.save()
             return reminder_id is not None
             
+        except DatabaseUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Error creating reminder: {e}")
+            logger.error("Error creating reminder: %s", e)
             return False
     
     def get_reminders(self, user_id, pending_only=True):
@@ -142,8 +235,10 @@ class KnowledgeService:
                 return Reminder.get_pending_reminders(user_id)
             return Reminder.get_user_reminders(user_id)
             
+        except DatabaseUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Error getting reminders: {e}")
+            logger.error("Error getting reminders: %s", e)
             return []
     
     def get_subject_overview(self, subject):
@@ -166,21 +261,28 @@ class KnowledgeService:
                 'total_entries': len(entries)
             }
             
+        except DatabaseUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Error getting subject overview: {e}")
+            logger.error("Error getting subject overview: %s", e)
             return None
     
     def get_study_suggestions(self, user_id):
         """Get personalized study suggestions"""
         try:
-            # Get user's recent schedules
-            schedules = StudySchedule.get_user_schedules(user_id, 5)
-            subjects_studied = {schedule.subject for schedule in schedules}
+            # Subjects come from the precomputed interest profile; fall back to
+            # recent schedules for users who haven't chatted yet
+            subjects_studied = profile_service.top_subjects(user_id)
+            if not subjects_studied:
+                schedules = StudySchedule.get_user_schedules(user_id, 5)
+                subjects_studied = list(dict.fromkeys(schedule.subject for schedule in schedules))
+            
+            # Related topics and study tips in a single query
+            entries_by_subject = KnowledgeBase.get_by_subjects(subjects_studied + ['Study Tips'], 3)
             
             suggestions = []
             for subject in subjects_studied:
-                # Get related topics
-                entries = KnowledgeBase.get_by_subject(subject, 3)
+                entries = entries_by_subject.get(subject)
                 if entries:
                     suggestions.append({
                         'subject': subject,
@@ -189,7 +291,7 @@ class KnowledgeService:
                     })
             
             # Add study tips
-            entries = KnowledgeBase.search_by_keywords('study tips', 2)
+            entries = entries_by_subject.get('Study Tips', [])[:2]
             if entries:
                 suggestions.append({
                     'subject': 'Study Tips',
@@ -199,8 +301,10 @@ class KnowledgeService:
             
             return suggestions
             
+        except DatabaseUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Error getting study suggestions: {e}")
+            logger.error("Error getting study suggestions: %s", e)
             return []
     
     def get_learning_path(self, subject, current_level='beginner'):
@@ -243,8 +347,10 @@ class KnowledgeService:
                 'path': path
             }
             
+        except DatabaseUnavailableError:
+            raise
         except Exception as e:
-            logger.error(f"Error getting learning path: {e}")
+            logger.error("Error getting learning path: %s", e)
             return None
 
 # Global knowledge service instance
@@ -1,50 +1,67 @@
 import spacy
 import re
+import time
 from datetime import datetime, timedelta
 from config import Config
+from app.utils.date_grammar import parse_datetime
+from app.utils.intent_model import load_intent_model
+from app.utils.metrics import metrics
+from app.utils.nlp_server import NLPClient, NLPServerError
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# NLP pipeline metrics
+stage_duration = metrics.histogram(
+    'nlp_stage_duration_seconds', 'Time spent in each NLP analysis stage', ('stage',),
+    sample_rate=Config.METRICS_SAMPLE_RATE
+)
+tier_messages = metrics.counter(
+    'nlp_tier_messages_total', 'Messages analysed, by the pipeline tier that finished them', ('tier',)
+)
+tier_duration = metrics.histogram(
+    'nlp_tier_duration_seconds', 'Time to analyse a message, by the pipeline tier that finished it',
+    ('tier',), sample_rate=Config.METRICS_SAMPLE_RATE
+)
+
+# Intents whose replies use spaCy keywords (knowledge search); the rest stop at the light tier
+FULL_PARSE_INTENTS = frozenset({'question', 'general'})
+
+# Pleasantries, matched against the whole message, that skip the classifier and parsing entirely
+GREETING = (r"(?:hi|hello|hey|hiya|howdy|yo|greetings|good (?:morning|afternoon|evening)|what'?s up|sup)"
+            r"(?: (?:there|everyone|all|again|buddy|friend|study buddy))?")
+GOODBYE = (r"(?:(?:thanks|thank you|thx|ty|cheers)(?: (?:so much|very much|a lot|for (?:the|your) help))?"
+           r"|that'?s (?:it|all)(?: for (?:now|today))?|bye(?: bye)?|goodbye|good night|farewell|cya"
+           r"|see (?:you|ya)(?: (?:later|soon|tomorrow))?|talk to you later|ttyl|i'?m done(?: for (?:now|today))?)")
+SEPARATOR = r"[\s,.!?:;)~-]*"
+
 class NLPService:
-    def __init__(self):
+    def __init__(self, use_server=True):
         self.nlp = None
-        self.load_model()
+        self.client = None
+        if use_server and Config.NLP_SERVER_SOCKET:
+            # spaCy runs in the NLP server (run_nlp_server.py), so this process never loads it
+            self.client = NLPClient(Config.NLP_SERVER_SOCKET, Config.NLP_SERVER_TIMEOUT)
+        else:
+            self.load_model()
         
-        # Define intent patterns
-        self.intent_patterns = {
-            'question': [
-                r'\b(what|how|why|when|where|who|which|explain|tell me about)\b',
-                r'\?',
-                r'\b(can you|could you|would you)\b'
-            ],
-            'study_tip': [
-                r'\b(study|learn|memorize|remember|tips|advice|help)\b',
-                r'\b(how to study|study better|improve|focus)\b'
-            ],
-            'reminder': [
-                r'\b(remind|reminder|schedule|appointment|deadline)\b',
-                r'\b(set reminder|add reminder|create reminder)\b'
-            ],
-            'schedule': [
-                r'\b(schedule|plan|timetable|calendar|organize)\b',
-                r'\b(study plan|study schedule|time management)\b'
-            ],
-            'note': [
-                r'\b(note|notes|write down|save|record)\b',
-                r'\b(take notes|make notes|add note)\b'
-            ],
-            'greeting': [
-                r'\b(hello|hi|hey|good morning|good afternoon|good evening)\b',
-                r'\b(how are you|what\'s up)\b'
-            ],
-            'goodbye': [
-                r'\b(bye|goodbye|see you|farewell|exit|quit)\b',
-                r'\b(thank you|thanks|that\'s all)\b'
-            ]
-        }
+        # Hashed n-gram intent classifier (train_intent_model.py), or one trained on the seed set
+        self.intent_model = load_intent_model(Config.INTENT_MODEL_PATH)
+        
+        # Free-slot searches ("find me 2 hours this week") are schedule requests
+        # even though they usually mention studying
+        self.free_slot_pattern = re.compile(
+            r'\b(free (time|slots?|hours?)|available (time|slots?)|'
+            r'find (me )?(\d+|an?|one|two|three) (free )?(hours?|hrs?|minutes?|mins?))\b',
+            re.IGNORECASE
+        )
+        
+        # Tier 0 of process_message: a whole-message pleasantry needs no further analysis
+        self.fast_path_pattern = re.compile(
+            rf"{SEPARATOR}(?:(?P<greeting>{GREETING}(?:{SEPARATOR}{GREETING})*)"
+            rf"|(?P<goodbye>(?:(?:ok(?:ay)?|great|cool|perfect){SEPARATOR})?{GOODBYE}(?:{SEPARATOR}{GOODBYE})*)){SEPARATOR}",
+            re.IGNORECASE
+        )
         
         # Subject keywords
         self.subject_keywords = {
@@ -65,8 +82,17 @@ class NLPService:
             logger.warning("spaCy model not found. Using basic NLP processing.")
             self.nlp = None
     
-    def process_message(self, message):
-        """Process user message and extract information"""
+    def process_message(self, message, parsed=None, prediction=None, full=False):
+        """Process user message and extract information.
+        
+        Analysis runs in tiers and stops at the cheapest one that serves the
+        reply: 'fast' answers whole-message greetings and goodbyes with one
+        regex; 'light' classifies the intent and takes keywords from the
+        tokenizer alone; 'full' adds the spaCy parse (lemmatized keywords and
+        entities) for the intents in FULL_PARSE_INTENTS. full=True, or
+        NLP_FAST_PATH_ENABLED=False, always runs the full tier. parsed is
+        this message's (keywords, entities) if parse() already ran on it.
+        """
         if not message:
             return {
                 'intent': 'unknown',
@@ -77,38 +103,116 @@ class NLPService:
             }
         
         message_lower = message.lower().strip()
+        full = full or not Config.NLP_FAST_PATH_ENABLED
+        started = time.perf_counter()
+        
+        fast_intent = None if full else self.fast_intent(message_lower)
+        if fast_intent:
+            return self.finish('fast', started, {
+                'intent': fast_intent,
+                'subject': None,
+                'keywords': [],
+                'entities': [],
+                'confidence': 1.0,
+                'original_message': message
+            })
         
-        # Extract intent
-        intent = self.extract_intent(message_lower)
+        # Classify intent; its probability is the analysis confidence
+        intent, confidence = prediction or self.classify_intent(message_lower)
+        intent_done = time.perf_counter()
         
         # Extract subject
         subject = self.extract_subject(message_lower)
+        subject_done = time.perf_counter()
         
-        # Extract keywords
-        keywords = self.extract_keywords(message_lower)
+        tier = 'full' if full or intent in FULL_PARSE_INTENTS else 'light'
+        if tier == 'full':
+            # Keywords and entities from the spaCy parse, here or on the NLP server
+            keywords, entities = parsed or self.parse([message])[0]
+        else:
+            keywords, entities = self.tokenize_keywords(message_lower), []
+        keywords_done = time.perf_counter()
         
-        # Extract entities using spaCy if available
-        entities = self.extract_entities(message) if self.nlp else []
+        stage_duration.observe(intent_done - started, stage='intent')
+        stage_duration.observe(subject_done - intent_done, stage='subject')
+        stage_duration.observe(keywords_done - subject_done, stage='keywords')
+        stage_duration.observe(keywords_done - started, stage='total')
         
-        # Calculate confidence score
-        confidence = self.calculate_confidence(intent, subject, keywords)
-        
-        return {
+        return self.finish(tier, started, {
             'intent': intent,
             'subject': subject,
             'keywords': keywords,
             'entities': entities,
             'confidence': confidence,
             'original_message': message
-        }
+        })
+    
+    def finish(self, tier, started, analysis):
+        """Count and time an analysis under the tier that produced it"""
+        tier_messages.inc(tier=tier)
+        tier_duration.observe(time.perf_counter() - started, tier=tier)
+        analysis['tier'] = tier
+        return analysis
+    
+    def process_messages(self, messages):
+        """Process several messages, classifying intents in one pass and parsing in one batch"""
+        if not messages:
+            return []
+        
+        # Only messages past the fast tier are classified, and only full-tier ones parsed
+        lowered = [(message or '').lower().strip() for message in messages]
+        fast = Config.NLP_FAST_PATH_ENABLED
+        pending = [i for i, text in enumerate(lowered) if not (fast and self.fast_intent(text))]
+        predictions = dict(zip(pending, self.classify_intents([lowered[i] for i in pending])))
+        full = [i for i in pending if messages[i] and (not fast or predictions[i][0] in FULL_PARSE_INTENTS)]
+        
+        # Full-tier messages are parsed together: one nlp.pipe here, or one request to the NLP server
+        parsed = {}
+        if full:
+            started = time.perf_counter()
+            parsed = dict(zip(full, self.parse([messages[i] for i in full])))
+            stage_duration.observe((time.perf_counter() - started) / len(full), stage='parse')
+        
+        return [self.process_message(message, parsed.get(i), predictions.get(i))
+                for i, message in enumerate(messages)]
+    
+    def parse(self, messages):
+        """(keywords, entities) for each message from the spaCy parse, on the NLP server if one is configured"""
+        if self.client:
+            try:
+                return [tuple(result) for result in self.client.parse(messages)]
+            except NLPServerError as e:
+                logger.warning("%s; using basic NLP processing", e)
+        if not self.nlp:
+            return [(self.extract_keywords(message.lower().strip()), []) for message in messages]
+        
+        # Keywords come from the lowercased text and entities from the original
+        keyword_docs = self.nlp.pipe([message.lower().strip() for message in messages])
+        entity_docs = self.nlp.pipe(messages)
+        return [(self.extract_keywords(message.lower().strip(), keyword_doc),
+                 self.extract_entities(message, entity_doc))
+                for message, keyword_doc, entity_doc in zip(messages, keyword_docs, entity_docs)]
+    
+    def fast_intent(self, message):
+        """'greeting' or 'goodbye' if the whole lowercased message is a pleasantry, else None"""
+        match = self.fast_path_pattern.fullmatch(message)
+        return match.lastgroup if match else None
     
     def extract_intent(self, message):
         """Extract intent from message"""
-        for intent, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, message, re.IGNORECASE):
-                    return intent
-        return 'general'
+        return self.classify_intent(message)[0]
+    
+    def classify_intent(self, message):
+        """(intent, calibrated confidence) for a lowercased message"""
+        if self.free_slot_pattern.search(message):
+            return 'schedule', 1.0
+        return self.intent_model.predict(message)
+    
+    def classify_intents(self, messages):
+        """classify_intent for several lowercased messages, scored as one batch"""
+        predictions = self.intent_model.predict_many(messages)
+        return [('schedule', 1.0) if self.free_slot_pattern.search(message) else prediction
+                for message, prediction in zip(messages, predictions)]
     
     def extract_subject(self, message):
         """Extract subject from message"""
@@ -118,7 +222,7 @@ class NLPService:
                     return subject
         return None
     
-    def extract_keywords(self, message):
+    def extract_keywords(self, message, doc=None):
         """Extract important keywords from message"""
         if not self.nlp:
             # Basic keyword extraction without spaCy
@@ -129,7 +233,7 @@ class NLPService:
             return keywords[:10]  # Return top 10 keywords
         
         # Advanced keyword extraction with spaCy
-        doc = self.nlp(message)
+        doc = doc if doc is not None else self.nlp(message)
         keywords = []
         
         for token in doc:
@@ -141,12 +245,21 @@ class NLPService:
         
         return list(set(keywords))[:10]  # Return unique keywords, max 10
     
-    def extract_entities(self, message):
+    def tokenize_keywords(self, message):
+        """Keywords from the tokenizer alone, without tagging or lemmatizing (the light tier)"""
+        if not self.nlp:
+            return self.extract_keywords(message)
+        
+        keywords = [token.lower_ for token in self.nlp.tokenizer(message)
+                    if not token.is_stop and not token.is_punct and len(token.text) > 2]
+        return list(dict.fromkeys(keywords))[:10]
+    
+    def extract_entities(self, message, doc=None):
         """Extract named entities from message"""
         if not self.nlp:
             return []
         
-        doc = self.nlp(message)
+        doc = doc if doc is not None else self.nlp(message)
         entities = []
         
         for ent in doc.ents:
@@ -158,53 +271,16 @@ class NLPService:
         
         return entities
     
-    def calculate_confidence(self, intent, subject, keywords):
-        """Calculate confidence score for the analysis"""
-        confidence = 0.0
-        
-        # Base confidence for intent detection
-        if intent != 'unknown':
-            confidence += 0.3
-        
-        # Additional confidence for subject detection
-        if subject:
-            confidence += 0.3
-        
-        # Additional confidence for keywords
-        if keywords:
-            confidence += min(len(keywords) * 0.05, 0.4)
-        
-        return min(confidence, 1.0)
+    def parse_date_time(self, message, now=None):
+        """Dates, times and durations in the message, resolved to concrete values (a TimeExpression)"""
+        return parse_datetime(message, now)
     
     def extract_date_time(self, message):
         """Extract date and time information from message"""
-        date_patterns = [
-            r'\b(today|tomorrow|yesterday)\b',
-            r'\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\b',
-            r'\b(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b',
-            r'\b(next week|this week|next month)\b'
-        ]
-        
-        time_patterns = [
-            r'\b(\d{1,2}:\d{2})\s*(am|pm)?\b',
-            r'\b(\d{1,2})\s*(am|pm)\b',
-            r'\b(morning|afternoon|evening|night)\b'
-        ]
-        
-        dates = []
-        times = []
-        
-        for pattern in date_patterns:
-            matches = re.findall(pattern, message, re.IGNORECASE)
-            dates.extend(matches)
-        
-        for pattern in time_patterns:
-            matches = re.findall(pattern, message, re.IGNORECASE)
-            times.extend(matches)
-        
+        expression = parse_datetime(message)
         return {
-            'dates': dates,
-            'times': times
+            'dates': expression.dates,
+            'times': expression.times
         }
     
     def generate_response_keywords(self, user_keywords, subject=None):
@@ -247,29 +323,7 @@ class NLPService:
     
     def extract_study_duration(self, message):
         """Extract study duration from message"""
-        duration_patterns = [
-            r'(\d+)\s*(hour|hours|hr|hrs)',
-            r'(\d+)\s*(minute|minutes|min|mins)',
-            r'(\d+)\s*(day|days)',
-            r'(\d+)\s*(week|weeks)'
-        ]
-        
-        for pattern in duration_patterns:
-            match = re.search(pattern, message, re.IGNORECASE)
-            if match:
-                number = int(match.group(1))
-                unit = match.group(2).lower()
-                
-                if 'hour' in unit or 'hr' in unit:
-                    return number * 60  # Convert to minutes
-                elif 'minute' in unit or 'min' in unit:
-                    return number
-                elif 'day' in unit:
-                    return number * 24 * 60  # Convert to minutes
-                elif 'week' in unit:
-                    return number * 7 * 24 * 60  # Convert to minutes
-        
-        return 60  # Default 1 hour
+        return parse_datetime(message).duration_minutes or 60  # Default 1 hour
 
 # Global NLP service instance
 nlp_service = NLPService()
@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+from app.models.user import UserProfile
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ProfileService:
+    """Keeps per-user interest profiles up to date from live chat analysis.
+    
+    Profiles are cached in process (least recently used first out) and
+    written through to the user_profiles table on every update, so reading
+    a profile never re-runs NLP over chat history. A user's updates take
+    turns on that user's lock within a worker; across workers each write
+    checks the row version it read and, if another worker wrote first,
+    reloads the profile and applies the update again.
+    """
+    
+    SAVE_ATTEMPTS = 3
+    
+    def __init__(self, max_cached=None):
+        self.max_cached = max_cached or Config.PROFILE_CACHE_SIZE
+        self.profiles = OrderedDict()
+        self.lock = threading.RLock()
+        self.user_locks = {}
+    
+    def get_profile(self, user_id):
+        """Get a user's profile, loading it from the database on first use"""
+        with self.lock:
+            profile = self.profiles.get(user_id)
+            if profile is not None:
+                self.profiles.move_to_end(user_id)
+                return profile
+        
+        try:
+            profile = UserProfile.find_by_user(user_id)
+        except Exception as e:
+            logger.error("Error loading profile for user %s: %s", user_id, e)
+            return UserProfile(user_id=user_id)
+        
+        profile = profile or UserProfile(user_id=user_id)
+        with self.lock:
+            # Another thread may have loaded it meanwhile; keep the first one
+            profile = self.profiles.setdefault(user_id, profile)
+            self.profiles.move_to_end(user_id)
+            self.evict()
+        return profile
+    
+    def evict(self):
+        while len(self.profiles) > self.max_cached:
+            user_id, _ = self.profiles.popitem(last=False)
+            self.user_locks.pop(user_id, None)
+    
+    def user_lock(self, user_id):
+        with self.lock:
+            return self.user_locks.setdefault(user_id, threading.Lock())
+    
+    def record(self, user_id, analysis):
+        """Fold a message analysis into the user's profile and persist it"""
+        return self.record_many(user_id, [analysis])
+    
+    def record_many(self, user_id, analyses):
+        """Fold several analyses into the user's profile with a single write"""
+        try:
+            with self.user_lock(user_id):
+                profile = self.get_profile(user_id)
+                for _ in range(self.SAVE_ATTEMPTS):
+                    # Update a copy, so readers of the cached profile never see half an update
+                    updated = profile.copy()
+                    for analysis in analyses:
+                        updated.record_analysis(analysis)
+                    if updated.save():
+                        with self.lock:
+                            self.profiles[user_id] = updated
+                            self.profiles.move_to_end(user_id)
+                            self.evict()
+                        return updated
+                    # Another worker saved it since it was read
+                    profile = (UserProfile.find_by_user(user_id, primary=True)
+                               or UserProfile(user_id=user_id))
+            logger.warning("Gave up updating profile for user %s after %d conflicting writes",
+                           user_id, self.SAVE_ATTEMPTS)
+            return None
+        except Exception as e:
+            logger.error("Error updating profile for user %s: %s", user_id, e)
+            return None
+    
+    def top_subjects(self, user_id, limit=3):
+        """Get the user's strongest current subjects"""
+        return self.get_profile(user_id).top_subjects(limit)
+    
+    def invalidate(self, user_id=None):
+        """Drop cached profiles so they are reloaded from the database"""
+        with self.lock:
+            if user_id is None:
+                self.profiles.clear()
+                self.user_locks.clear()
+            else:
+                self.profiles.pop(user_id, None)
+                self.user_locks.pop(user_id, None)
+
+# Global profile service instance
+profile_service = ProfileService()
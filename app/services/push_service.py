@@ -0,0 +1,159 @@
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from app.models.chat import Reminder
+from app.utils.db import DatabaseUnavailableError
+from app.utils.metrics import metrics
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Push metrics
+pushes_total = metrics.counter(
+    'websocket_pushes_total', 'Server-initiated messages queued for open chat sockets', ('type',)
+)
+
+class ChatConnection:
+    """One open chat socket: its user, chat session and the pushes waiting to be sent on it"""
+    
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.chat_session = None
+        self.outbox = deque()
+        self.closed = False
+    
+    def push(self, message):
+        self.outbox.append(message)
+    
+    def drain(self):
+        """Pushes queued since the last call, oldest first"""
+        while self.outbox:
+            yield self.outbox.popleft()
+
+class PushService:
+    """Delivers server-initiated messages, such as due reminders, to this worker's chat sockets.
+    
+    Sockets register while they're open. A background thread checks every
+    REMINDER_PUSH_POLL_SECONDS, with one query covering every connected
+    user, for reminders that fell due since the last check and queues them
+    on those users' connections. Each socket's handler sends whatever is
+    queued between client messages, so only it ever writes to its socket.
+    """
+    
+    def __init__(self, poll_seconds=None):
+        self.poll_seconds = poll_seconds or Config.REMINDER_PUSH_POLL_SECONDS
+        self.connections = {}
+        self.last_poll = None
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.started = False
+    
+    def connect(self, user_id):
+        """Register a new socket for user_id and return its connection"""
+        connection = ChatConnection(user_id)
+        with self.lock:
+            self.connections.setdefault(user_id, set()).add(connection)
+        return connection
+    
+    def disconnect(self, connection):
+        with self.lock:
+            user_connections = self.connections.get(connection.user_id)
+            if user_connections is not None:
+                user_connections.discard(connection)
+                if not user_connections:
+                    del self.connections[connection.user_id]
+    
+    def push(self, user_id, message):
+        """Queue message on each of the user's open connections; returns how many there were"""
+        with self.lock:
+            targets = list(self.connections.get(user_id, ()))
+        for connection in targets:
+            connection.push(message)
+        if targets:
+            pushes_total.inc(type=message.get('type', 'unknown'))
+        return len(targets)
+    
+    def close_user(self, user_id):
+        """Have the user's connections close (after logout) the next time their handlers wake"""
+        with self.lock:
+            for connection in self.connections.get(user_id, ()):
+                connection.closed = True
+    
+    def connection_count(self):
+        with self.lock:
+            return sum(len(user_connections) for user_connections in self.connections.values())
+    
+    def poll(self):
+        """Push the reminders that fell due since the last poll; returns how many were pushed"""
+        now = datetime.now()
+        since = self.last_poll or now
+        with self.lock:
+            user_ids = list(self.connections)
+        if not user_ids or since >= now:
+            self.last_poll = now
+            return 0
+        
+        pushed = 0
+        for reminder in Reminder.get_due_reminders(user_ids, since, now):
+            pushed += bool(self.push(reminder.user_id, {
+                'type': 'reminder',
+                'reminder_id': reminder.id,
+                'title': reminder.title,
+                'description': reminder.description,
+                'due_at': reminder.due_at()
+            }))
+        # Only move on once the window was read, so an outage doesn't drop reminders
+        self.last_poll = now
+        return pushed
+    
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+    
+    def start(self):
+        """Start the reminder polling thread (once per process)"""
+        with self.lock:
+            if self.running():
+                return
+            self.started = True
+            self.last_poll = datetime.now()
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._run, name='reminder-push', daemon=True)
+            self.thread.start()
+            logger.info("Pushing due reminders to chat sockets every %ss", self.poll_seconds)
+    
+    def stop(self):
+        """Stop the polling thread"""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.poll_seconds + 1)
+        self.thread = None
+        self.started = False
+    
+    def _run(self):
+        while not self.stopping.wait(self.poll_seconds):
+            try:
+                self.poll()
+            except DatabaseUnavailableError as e:
+                logger.warning("Reminder push skipped, database unavailable: %s", e)
+            except Exception as e:
+                logger.error("Reminder push poll failed: %s", e)
+    
+    def _after_fork(self):
+        """Threads and sockets don't survive fork; start the child with no connections"""
+        self.lock = threading.Lock()
+        self.connections = {}
+        self.thread = None
+        if self.started:
+            self.start()
+
+# Global push service instance
+push_service = PushService()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=push_service._after_fork)
+
+metrics.gauge('websocket_connections', 'Chat sockets open in this process',
+              callback=push_service.connection_count)
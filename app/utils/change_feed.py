@@ -0,0 +1,210 @@
+import os
+import threading
+import time
+from app.utils.db import db_manager, DatabaseUnavailableError
+from app.utils.metrics import metrics
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Change feed metrics
+changes_delivered = metrics.counter(
+    'knowledge_changes_delivered_total', 'Knowledge base changes handed to subscribers'
+)
+subscriber_errors = metrics.counter(
+    'knowledge_change_subscriber_errors_total', 'Subscriber callbacks that raised an error'
+)
+
+class ChangeFeed:
+    """In-process feed of knowledge base changes shared by every worker.
+    
+    Each write to ``knowledge_base`` appends a row to ``knowledge_changes``;
+    its auto-increment id is the change's revision and is also stored on the
+    entry. A background thread polls for revisions past the last one seen
+    and hands them to subscribers, so every process (or host) sharing the
+    database learns about edits within KNOWLEDGE_CHANGE_POLL_SECONDS.
+    
+    Revisions can become visible out of order when concurrent transactions
+    commit, so the cursor only moves past a missing revision once it has
+    been missing for KNOWLEDGE_CHANGE_GAP_SECONDS. Subscribers receive each
+    change once per process, but must treat a change as "this entry may
+    have changed" and re-read it, since the entry can be newer still.
+    """
+    
+    def __init__(self, poll_seconds=None, batch_size=None, gap_seconds=None):
+        self.poll_seconds = poll_seconds or Config.KNOWLEDGE_CHANGE_POLL_SECONDS
+        self.batch_size = batch_size or Config.KNOWLEDGE_CHANGE_BATCH_SIZE
+        self.gap_seconds = Config.KNOWLEDGE_CHANGE_GAP_SECONDS if gap_seconds is None else gap_seconds
+        self.subscribers = []
+        self.revision = None
+        self.delivered = set()
+        self.gaps = {}
+        self.lock = threading.RLock()
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.started = False
+    
+    def subscribe(self, callback):
+        """Call callback(changes) with each batch of [{'revision', 'entry_id'}, ...]"""
+        self.subscribers.append(callback)
+        return callback
+    
+    def latest_revision(self):
+        """Highest revision recorded so far, or None if the database is unavailable"""
+        try:
+            result = db_manager.execute_single_query(
+                "SELECT MAX(revision) AS revision FROM knowledge_changes"
+            )
+        except DatabaseUnavailableError:
+            return None
+        if result is None:
+            return None
+        return result['revision'] or 0
+    
+    def changes_since(self, revision, limit=None):
+        """Changes after revision in revision order, or None if the database is unavailable"""
+        try:
+            results = db_manager.execute_query("""
+                SELECT revision, entry_id FROM knowledge_changes
+                WHERE revision > %s
+                ORDER BY revision
+                LIMIT %s
+            """, (revision, limit or self.batch_size))
+        except DatabaseUnavailableError:
+            return None
+        if results is None:
+            return None
+        return [{'revision': row['revision'], 'entry_id': row['entry_id']} for row in results]
+    
+    def publish(self, entry_id):
+        """Record a change to a knowledge base entry and return its revision.
+        
+        Call after the entry itself has been written, so a poller that sees
+        the revision also sees the new row.
+        """
+        with self.lock:
+            # Without a poller, start the cursor here so this change is delivered inline
+            if self.revision is None and not self.running():
+                self.revision = self.latest_revision()
+        
+        revision = db_manager.execute_insert(
+            "INSERT INTO knowledge_changes (entry_id) VALUES (%s)", (entry_id,)
+        )
+        if not revision:
+            return None
+        db_manager.execute_update(
+            "UPDATE knowledge_base SET revision = %s WHERE id = %s", (revision, entry_id)
+        )
+        
+        if self.running():
+            self.wake.set()
+        else:
+            self.poll()
+        return revision
+    
+    def poll(self):
+        """Deliver changes past the cursor to subscribers; returns how many were delivered"""
+        with self.lock:
+            if self.revision is None:
+                # Subscribers load current state themselves; only later changes matter
+                self.revision = self.latest_revision()
+                return 0
+            
+            changes = self.changes_since(self.revision)
+            if not changes:
+                return 0
+            
+            fresh = [change for change in changes if change['revision'] not in self.delivered]
+            self._advance(changes)
+            if fresh:
+                self._deliver(fresh)
+            return len(fresh)
+    
+    def _advance(self, changes):
+        """Move the cursor over contiguous revisions and gaps that have waited long enough"""
+        now = time.monotonic()
+        expected = self.revision + 1
+        for change in changes:
+            for missing in range(expected, change['revision']):
+                self.gaps.setdefault(missing, now)
+            expected = change['revision'] + 1
+            self.delivered.add(change['revision'])
+        
+        revision = self.revision
+        while True:
+            following = revision + 1
+            if following in self.delivered:
+                revision = following
+            elif following in self.gaps and now - self.gaps[following] >= self.gap_seconds:
+                logger.warning("Knowledge change revision %s never appeared; skipping it", following)
+                revision = following
+            else:
+                break
+        
+        self.revision = revision
+        self.delivered = {seen for seen in self.delivered if seen > revision}
+        self.gaps = {missing: since for missing, since in self.gaps.items() if missing > revision}
+    
+    def _deliver(self, changes):
+        for callback in self.subscribers:
+            try:
+                callback(changes)
+            except Exception as e:
+                subscriber_errors.inc()
+                logger.error("Knowledge change subscriber %r failed: %s", callback, e)
+        changes_delivered.inc(len(changes))
+    
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+    
+    def start(self):
+        """Start the polling thread (once per process)"""
+        with self.lock:
+            if self.running():
+                return
+            self.started = True
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._run, name='knowledge-change-feed', daemon=True)
+            self.thread.start()
+            logger.info("Knowledge change feed polling every %ss", self.poll_seconds)
+    
+    def stop(self):
+        """Stop the polling thread"""
+        self.stopping.set()
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.poll_seconds + 1)
+        self.thread = None
+        self.started = False
+    
+    def _run(self):
+        while not self.stopping.is_set():
+            try:
+                # Keep going without waiting while full batches come back
+                while self.poll() >= self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error("Knowledge change poll failed: %s", e)
+            self.wake.wait(self.poll_seconds)
+            self.wake.clear()
+    
+    def _after_fork(self):
+        """Threads don't survive fork; restart polling in the child with fresh state"""
+        self.lock = threading.RLock()
+        self.thread = None
+        if self.started:
+            self.start()
+    
+    def current_revision(self):
+        return self.revision or 0
+
+# Global knowledge change feed instance
+change_feed = ChangeFeed()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=change_feed._after_fork)
+
+metrics.gauge('knowledge_change_revision', 'Last knowledge base revision delivered in this process',
+              callback=change_feed.current_revision)
@@ -0,0 +1,252 @@
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from app.utils.db import db_manager
+from app.utils.json_encoder import encode_value
+from app.utils.metrics import metrics
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# chat_history columns kept in archive segments
+ARCHIVE_FIELDS = ('id', 'session_id', 'user_id', 'message', 'response',
+                  'message_type', 'confidence_score', 'timestamp')
+
+SEGMENT_EXTENSIONS = {
+    'gzip': '.jsonl.gz',
+    'zstd': '.jsonl.zst'
+}
+
+# Archive metrics
+messages_archived = metrics.counter(
+    'chat_messages_archived_total', 'Chat turns moved from chat_history into archive segments'
+)
+segment_reads = metrics.counter(
+    'chat_archive_segment_reads_total', 'Archive segments read from disk (cache misses)'
+)
+
+def encode_rows(rows):
+    """One JSON object per line"""
+    return b''.join(
+        json.dumps({field: row[field] for field in ARCHIVE_FIELDS}, default=encode_value,
+                   ensure_ascii=False).encode('utf-8') + b'\n'
+        for row in rows
+    )
+
+def decode_rows(data):
+    rows = []
+    for line in data.splitlines():
+        if line:
+            row = json.loads(line)
+            row['timestamp'] = datetime.fromisoformat(row['timestamp']) if row['timestamp'] else None
+            rows.append(row)
+    return rows
+
+def precedes(row, before, before_id=None):
+    """Whether a row comes before the (before, before_id) cursor; without before_id, before its timestamp"""
+    if before is None:
+        return True
+    if not row['timestamp']:
+        return False
+    if before_id is None:
+        return row['timestamp'] < before
+    return (row['timestamp'], row['id']) < (before, before_id)
+
+class ChatArchive:
+    """Cold storage for old chat history: compressed per-user JSONL segments plus an index table.
+    
+    archive() moves turns older than CHAT_ARCHIVE_AFTER_DAYS out of
+    chat_history into segment files under CHAT_ARCHIVE_DIR/<user_id>/, and
+    records each segment's user and time range in chat_archive_segments.
+    A segment is written and indexed before its rows are deleted, so a
+    crash can at worst leave a turn in both places; readers drop the
+    duplicate by id. Segments are immutable, so recently read ones are
+    kept decompressed in memory.
+    """
+    
+    def __init__(self, directory=None, codec=None, after_days=None, segment_rows=None, cache_size=32):
+        self.directory = directory or Config.CHAT_ARCHIVE_DIR
+        self.codec = codec or Config.CHAT_ARCHIVE_COMPRESSION
+        if self.codec == 'zstd' and zstandard is None:
+            logger.warning("zstandard is not installed; archiving chat history with gzip")
+            self.codec = 'gzip'
+        self.after_days = Config.CHAT_ARCHIVE_AFTER_DAYS if after_days is None else after_days
+        self.segment_rows = segment_rows or Config.CHAT_ARCHIVE_SEGMENT_ROWS
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def cutoff(self):
+        """Turns older than this belong in the archive"""
+        return datetime.now() - timedelta(days=self.after_days)
+    
+    def archive(self, user_ids=None):
+        """Archive every user's turns older than the cutoff; returns (segments, messages) written"""
+        cutoff = self.cutoff()
+        if user_ids is None:
+            results = db_manager.execute_query(
+                "SELECT DISTINCT user_id FROM chat_history WHERE timestamp < %s", (cutoff,)
+            )
+            user_ids = [row['user_id'] for row in results or []]
+        
+        segments = messages = 0
+        for user_id in user_ids:
+            user_segments, user_messages = self.archive_user(user_id, cutoff)
+            segments += user_segments
+            messages += user_messages
+        return segments, messages
+    
+    def archive_user(self, user_id, cutoff):
+        """Move one user's turns older than cutoff into segments of at most segment_rows"""
+        segments = messages = 0
+        while True:
+            rows = db_manager.execute_query("""
+                SELECT * FROM chat_history
+                WHERE user_id = %s AND timestamp < %s
+                ORDER BY timestamp, id
+                LIMIT %s
+            """, (user_id, cutoff, self.segment_rows))
+            if not rows:
+                break
+            
+            path = self.write_segment(user_id, rows)
+            if path is None:
+                break
+            if not self.index_segment(user_id, path, rows):
+                os.unlink(os.path.join(self.directory, path))
+                break
+            self.delete_rows([row['id'] for row in rows])
+            
+            segments += 1
+            messages += len(rows)
+            messages_archived.inc(len(rows))
+            if len(rows) < self.segment_rows:
+                break
+        return segments, messages
+    
+    def write_segment(self, user_id, rows):
+        """Write rows to a new segment file (atomically) and return its path relative to the archive"""
+        ids = [row['id'] for row in rows]
+        path = os.path.join(str(user_id), f"{min(ids)}-{max(ids)}{SEGMENT_EXTENSIONS[self.codec]}")
+        target = os.path.join(self.directory, path)
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            data = encode_rows(rows)
+            if self.codec == 'zstd':
+                data = zstandard.ZstdCompressor(level=10).compress(data)
+            else:
+                data = gzip.compress(data, compresslevel=9)
+            
+            temporary = target + '.tmp'
+            with open(temporary, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, target)
+            return path
+        except OSError as e:
+            logger.error("Error writing chat archive segment %s: %s", target, e)
+            return None
+    
+    def index_segment(self, user_id, path, rows):
+        query = """
+            INSERT INTO chat_archive_segments (user_id, path, first_timestamp, last_timestamp,
+                                               first_id, last_id, message_count)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        ids = [row['id'] for row in rows]
+        params = (user_id, path, rows[0]['timestamp'], rows[-1]['timestamp'],
+                  min(ids), max(ids), len(rows))
+        return db_manager.execute_insert(query, params)
+    
+    def delete_rows(self, ids, chunk_size=500):
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            db_manager.execute_update(f"DELETE FROM chat_history WHERE id IN ({placeholders})", chunk)
+    
+    def read_segment(self, path, cache=True):
+        """Rows of a segment in timestamp order; cache=False leaves the cache as it was (for one-off scans)"""
+        with self.lock:
+            rows = self.cache.get(path)
+            if rows is not None:
+                self.cache.move_to_end(path)
+                return rows
+        
+        try:
+            with open(os.path.join(self.directory, path), 'rb') as f:
+                data = f.read()
+            if path.endswith(SEGMENT_EXTENSIONS['zstd']):
+                data = zstandard.ZstdDecompressor().decompress(data)
+            else:
+                data = gzip.decompress(data)
+            rows = decode_rows(data)
+        except (OSError, ValueError, AttributeError) as e:
+            logger.error("Error reading chat archive segment %s: %s", path, e)
+            return []
+        segment_reads.inc()
+        if not cache:
+            return rows
+        
+        with self.lock:
+            self.cache[path] = rows
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return rows
+    
+    def segments(self, user_id, after=None, before=None, newest_first=True):
+        """Paths of the user's segments overlapping [after, before], from the index"""
+        conditions, params = ["user_id = %s"], [user_id]
+        if after is not None:
+            conditions.append("last_timestamp >= %s")
+            params.append(after)
+        if before is not None:
+            conditions.append("first_timestamp <= %s")
+            params.append(before)
+        order = 'DESC' if newest_first else 'ASC'
+        results = db_manager.execute_query(f"""
+            SELECT path FROM chat_archive_segments
+            WHERE {' AND '.join(conditions)}
+            ORDER BY last_timestamp {order}, id {order}
+        """, params)
+        return [row['path'] for row in results or []]
+    
+    def user_history(self, user_id, before=None, limit=50, before_id=None):
+        """Up to limit archived turns before the (before, before_id) cursor, newest first"""
+        history = []
+        for path in self.segments(user_id, before=before):
+            for row in reversed(self.read_segment(path)):
+                if precedes(row, before, before_id):
+                    history.append(row)
+                    if len(history) >= limit:
+                        return history
+        return history
+    
+    def session_history(self, session_id, limit=50):
+        """Up to limit archived turns of a session, oldest first"""
+        session = db_manager.execute_single_query(
+            "SELECT user_id, session_start, session_end FROM chat_sessions WHERE id = %s", (session_id,)
+        )
+        # Sessions started after the cutoff can't have archived turns yet
+        if not session or (session['session_start'] and session['session_start'] >= self.cutoff()):
+            return []
+        
+        history = []
+        for path in self.segments(session['user_id'], after=session['session_start'],
+                                  newest_first=False):
+            history.extend(row for row in self.read_segment(path) if str(row['session_id']) == str(session_id))
+            if len(history) >= limit:
+                break
+        return history[:limit]
+
+# Global chat archive instance
+chat_archive = ChatArchive()
@@ -0,0 +1,62 @@
+import gzip
+from flask import request
+from app.utils.metrics import metrics
+from config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Text responses worth compressing; images and archives are compressed already
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'text/javascript',
+    'text/html', 'text/css', 'text/plain'
+}
+
+# Levels tuned for on-the-fly compression rather than the smallest output
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Compression metrics
+compressed_total = metrics.counter(
+    'http_responses_compressed_total', 'Responses sent compressed', ('encoding',)
+)
+compression_saved_bytes = metrics.counter(
+    'http_compression_saved_bytes_total', 'Response bytes saved by compression', ('encoding',)
+)
+
+def available_encodings():
+    """Content codings this process can produce, in order of preference"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+def compress_response(response):
+    """Compress a text response above COMPRESSION_MIN_BYTES with the best coding the client accepts"""
+    if (response.status_code < 200 or response.status_code >= 300 or response.status_code == 204
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    
+    # Caches must keep compressed and plain copies apart
+    response.vary.add('Accept-Encoding')
+    
+    data = response.get_data()
+    if len(data) < Config.COMPRESSION_MIN_BYTES:
+        return response
+    
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if not encoding:
+        return response
+    
+    compressed = compress(data, encoding)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    compressed_total.inc(encoding=encoding)
+    compression_saved_bytes.inc(len(data) - len(compressed), encoding=encoding)
+    return response
@@ -0,0 +1,237 @@
+import re
+from datetime import date, datetime, time, timedelta
+
+WEEKDAYS = {
+    'monday': 0, 'mon': 0, 'tuesday': 1, 'tues': 1, 'tue': 1, 'wednesday': 2, 'wed': 2,
+    'thursday': 3, 'thurs': 3, 'thur': 3, 'thu': 3, 'friday': 4, 'fri': 4,
+    'saturday': 5, 'sunday': 6
+}
+MONTHS = {
+    'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3, 'april': 4, 'apr': 4,
+    'may': 5, 'june': 6, 'jun': 6, 'july': 7, 'jul': 7, 'august': 8, 'aug': 8,
+    'september': 9, 'sept': 9, 'sep': 9, 'october': 10, 'oct': 10, 'november': 11, 'nov': 11,
+    'december': 12, 'dec': 12
+}
+NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+    'fifteen': 15, 'twenty': 20, 'thirty': 30, 'forty five': 45, 'ninety': 90
+}
+
+# Minutes per duration unit, keyed by the unit's first letter (m, h, d, w)
+UNIT_MINUTES = {'m': 1, 'h': 60, 'd': 24 * 60, 'w': 7 * 24 * 60}
+
+# Times used when a message only names a part of the day
+PARTS_OF_DAY = {'morning': time(9), 'afternoon': time(14), 'evening': time(18),
+                'night': time(20), 'tonight': time(20)}
+
+def alternatives(words):
+    """Regex alternation of words, longest first so 'thursday' wins over 'thu'"""
+    return '|'.join(sorted(map(re.escape, words), key=len, reverse=True))
+
+NUMBER = r"\d+(?:\.\d+)?"
+NUMBER_WORD = alternatives(NUMBER_WORDS).replace(' ', r'\s+')
+UNIT = r"minutes?|mins?|m|hours?|hrs?|h|days?|weeks?|wks?"
+ORDINAL = r"(?:st|nd|rd|th)?"
+
+# Words an expression can start with: other positions fail this check before any alternative is tried
+STARTS = (rf"\d|(?:in|for|half|on|the|next|this|coming|at|noon|midday|midnight|morning|afternoon"
+          rf"|evening|night|today|tonight|tomorrow|tmrw|tmr|day|{alternatives(WEEKDAYS)}|{alternatives(MONTHS)})\b")
+
+# Every expression the grammar knows, tried left to right in one scan of the message
+GRAMMAR = re.compile(rf"""
+    (?<!\w)(?={STARTS})
+  (?:
+    \bin\s+(?P<offset_n>{NUMBER}|{NUMBER_WORD})\s*(?P<offset_unit>{UNIT})\b
+  | (?:\bfor\s+)?(?P<half_hour>half\s+an?\s+hour)\b
+  | (?:\bfor\s+)?\b(?P<duration_n>{NUMBER})\s*(?P<duration_unit>{UNIT})\b
+        (?:\s*(?:and\s+)?(?P<duration_extra>\d+)\s*(?:minutes?|mins?|m)\b)?
+  | \bfor\s+(?P<duration_word>{NUMBER_WORD})\s+(?P<duration_word_unit>{UNIT})\b
+  | (?:\bon\s+)?\b(?P<iso_year>\d{{4}})-(?P<iso_month>\d{{1,2}})-(?P<iso_day>\d{{1,2}})\b
+  | (?:\bon\s+)?\b(?P<num_month>\d{{1,2}})/(?P<num_day>\d{{1,2}})(?:/(?P<num_year>\d{{2,4}}))?\b
+  | (?:\bon\s+)?\b(?P<name_month>{alternatives(MONTHS)})\.?\s+(?P<name_day>\d{{1,2}}){ORDINAL}\b
+        (?:,?\s+(?P<name_year>\d{{4}})\b)?
+  | (?:\bon\s+)?\b(?:the\s+)?(?P<day_first>\d{{1,2}}){ORDINAL}\s+(?:of\s+)?(?P<day_first_month>{alternatives(MONTHS)})\b
+        (?:,?\s+(?P<day_first_year>\d{{4}})\b)?
+  | (?:\bon\s+)?\bthe\s+(?P<ordinal>\d{{1,2}})(?:st|nd|rd|th)\b
+  | (?:\b(?P<weekday_modifier>next|this|coming|on)\s+)?\b(?P<weekday>{alternatives(WEEKDAYS)})\b
+  | \b(?P<relative_day>(?:the\s+)?day\s+after\s+tomorrow|today|tonight|tomorrow|tmrw|tmr)\b
+  | \b(?P<relative_span>next\s+week|next\s+weekend|this\s+weekend|next\s+month)\b
+  | (?:\bat\s+)?\b(?P<clock_hour>\d{{1,2}})(?::(?P<clock_minute>[0-5]\d))?\s*(?P<meridiem>[ap])\.?m\b\.?
+  | (?:\bat\s+)?\b(?P<hour24>[01]?\d|2[0-3]):(?P<minute24>[0-5]\d)\b
+  | \bat\s+(?P<bare_hour>\d{{1,2}})\b(?![/.:\d])
+  | (?:\bat\s+)?\b(?P<noon>noon|midday|midnight)\b
+  | (?:\b(?:in\s+the|this)\s+)?\b(?P<part_of_day>morning|afternoon|evening|night)\b
+  )
+""", re.IGNORECASE | re.VERBOSE)
+
+def number(text):
+    text = ' '.join(text.lower().split())
+    return NUMBER_WORDS[text] if text in NUMBER_WORDS else float(text)
+
+def unit_minutes(unit):
+    return UNIT_MINUTES[unit[0].lower()]
+
+def make_date(year, month, day):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+def upcoming(today, month, day, year=None):
+    """The date with this month and day, this year or next if it has passed"""
+    if year is not None:
+        return make_date(year + 2000 if year < 100 else year, month, day)
+    found = make_date(today.year, month, day)
+    if found is not None and found < today:
+        found = make_date(today.year + 1, month, day)
+    return found
+
+class TimeExpression:
+    """Dates, times and durations found in a message, resolved against a reference time.
+    
+    date and time are None when the message doesn't give them; dates,
+    times and durations hold the matched text and spans the (start, end)
+    of every match, so callers can cut them out of the message.
+    """
+    
+    __slots__ = ('date', 'time', 'duration_minutes', 'dates', 'times', 'durations', 'spans')
+    
+    def __init__(self):
+        self.date = None
+        self.time = None
+        self.duration_minutes = None
+        self.dates = []
+        self.times = []
+        self.durations = []
+        self.spans = []
+    
+    def __bool__(self):
+        return bool(self.spans)
+    
+    def at(self, now=None, default_time=time(9)):
+        """The datetime meant, or None if neither a date nor a time was given.
+        
+        A time without a date means today, or tomorrow once that time has
+        passed; a date without a time uses default_time.
+        """
+        if self.date is None and self.time is None:
+            return None
+        now = now or datetime.now()
+        if self.date is not None:
+            return datetime.combine(self.date, self.time or default_time)
+        moment = datetime.combine(now.date(), self.time)
+        return moment if moment > now else moment + timedelta(days=1)
+    
+    def strip(self, text):
+        """text without the matched expressions"""
+        for start, end in sorted(self.spans, reverse=True):
+            text = text[:start] + ' ' + text[end:]
+        return ' '.join(text.split())
+
+def resolve_day(groups, today):
+    """The date a date expression's groups name, or None if it isn't a real date"""
+    if groups['iso_year']:
+        return make_date(int(groups['iso_year']), int(groups['iso_month']), int(groups['iso_day']))
+    if groups['num_month']:
+        year = int(groups['num_year']) if groups['num_year'] else None
+        return upcoming(today, int(groups['num_month']), int(groups['num_day']), year)
+    if groups['name_month']:
+        year = int(groups['name_year']) if groups['name_year'] else None
+        return upcoming(today, MONTHS[groups['name_month'].lower()], int(groups['name_day']), year)
+    if groups['day_first']:
+        year = int(groups['day_first_year']) if groups['day_first_year'] else None
+        return upcoming(today, MONTHS[groups['day_first_month'].lower()], int(groups['day_first']), year)
+    if groups['ordinal']:
+        day = make_date(today.year, today.month, int(groups['ordinal']))
+        if day is None or day < today:
+            following = today.replace(day=1) + timedelta(days=32)
+            day = make_date(following.year, following.month, int(groups['ordinal']))
+        return day
+    if groups['weekday']:
+        ahead = (WEEKDAYS[groups['weekday'].lower()] - today.weekday()) % 7
+        # "Monday" on a Monday means next week's; "this Monday" means today
+        if ahead == 0 and (groups['weekday_modifier'] or '').lower() != 'this':
+            ahead = 7
+        return today + timedelta(days=ahead)
+    if groups['relative_day']:
+        relative = ' '.join(groups['relative_day'].lower().split())
+        if relative.endswith('day after tomorrow'):
+            return today + timedelta(days=2)
+        if relative in ('today', 'tonight'):
+            return today
+        return today + timedelta(days=1)
+    
+    span = ' '.join(groups['relative_span'].lower().split())
+    if span == 'next week':
+        return today + timedelta(days=7 - today.weekday())
+    if span == 'next month':
+        return (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return today + timedelta(days=(5 - today.weekday()) % 7 + (7 if span == 'next weekend' else 0))
+
+DATE_GROUPS = ('iso_year', 'num_month', 'name_month', 'day_first', 'ordinal', 'weekday',
+               'relative_day', 'relative_span')
+
+def parse_datetime(text, now=None):
+    """Find and resolve the date, time and duration expressions in text with one regex scan"""
+    now = now or datetime.now()
+    found = TimeExpression()
+    part_of_day = None
+    bare_hour = None
+    
+    for match in GRAMMAR.finditer(text):
+        groups = match.groupdict()
+        matched = match.group(0).strip()
+        found.spans.append(match.span())
+        
+        if groups['offset_n']:
+            minutes = number(groups['offset_n']) * unit_minutes(groups['offset_unit'])
+            moment = (now + timedelta(minutes=minutes)).replace(second=0, microsecond=0)
+            if found.date is None:
+                found.date, found.time = moment.date(), moment.time()
+            found.dates.append(matched)
+        elif groups['half_hour'] or groups['duration_n'] or groups['duration_word']:
+            if groups['half_hour']:
+                minutes = 30
+            elif groups['duration_n']:
+                minutes = (number(groups['duration_n']) * unit_minutes(groups['duration_unit'])
+                           + int(groups['duration_extra'] or 0))
+            else:
+                minutes = number(groups['duration_word']) * unit_minutes(groups['duration_word_unit'])
+            found.duration_minutes = found.duration_minutes or int(round(minutes))
+            found.durations.append(matched)
+        elif any(groups[name] for name in DATE_GROUPS):
+            day = resolve_day(groups, now.date())
+            if day is not None and found.date is None:
+                found.date = day
+            if (groups['relative_day'] or '').lower() == 'tonight':
+                part_of_day = part_of_day or 'tonight'
+            found.dates.append(matched)
+        else:
+            clock = None
+            if groups['clock_hour']:
+                hour = int(groups['clock_hour'])
+                if hour <= 12:
+                    clock = time(hour % 12 + (12 if groups['meridiem'].lower() == 'p' else 0),
+                                 int(groups['clock_minute'] or 0))
+            elif groups['hour24']:
+                clock = time(int(groups['hour24']), int(groups['minute24']))
+            elif groups['bare_hour']:
+                bare_hour = int(groups['bare_hour'])
+            elif groups['noon']:
+                clock = time(0) if groups['noon'].lower() == 'midnight' else time(12)
+            else:
+                part_of_day = part_of_day or groups['part_of_day'].lower()
+            if clock is not None and found.time is None:
+                found.time = clock
+            found.times.append(matched)
+    
+    if found.time is None and bare_hour is not None and bare_hour <= 23:
+        # "at 5": afternoon/evening if the message says so, else the likelier half of the day
+        if bare_hour < 12 and (part_of_day in ('afternoon', 'evening', 'night', 'tonight')
+                               or (part_of_day is None and 1 <= bare_hour <= 7)):
+            bare_hour += 12
+        found.time = time(bare_hour)
+    if found.time is None and part_of_day is not None:
+        found.time = PARTS_OF_DAY[part_of_day]
+    return found
@@ -1,108 +1,411 @@
-import pymysql
+import random
+import threading
+import time
+from contextvars import ContextVar
 from config import Config
+from app.utils.db_backends import create_backend, create_replica_backends
+from app.utils.metrics import metrics
+from app.utils.query_log import query_log
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Database metrics
+query_duration = metrics.histogram(
+    'db_query_duration_seconds', 'Time spent executing database statements',
+    ('operation',)
+)
+query_errors = metrics.counter(
+    'db_query_errors_total', 'Database statements that raised an error', ('operation',)
+)
+connections_opened = metrics.counter(
+    'db_connections_opened_total', 'Database connections opened'
+)
+connection_errors = metrics.counter(
+    'db_connection_errors_total', 'Failed attempts to open a database connection'
+)
+connections_in_use = metrics.gauge(
+    'db_connections_in_use', 'Database connections currently checked out'
+)
+reads_total = metrics.counter(
+    'db_reads_total', 'SELECT statements by the server that answered them', ('target',)
+)
+read_retries = metrics.counter(
+    'db_read_retries_total', 'SELECT statements retried after the database was unavailable'
+)
+circuit_rejections = metrics.counter(
+    'db_circuit_rejections_total', 'Database calls refused because the circuit breaker was open'
+)
+
+# Until when (epoch seconds) this request or thread reads from the primary to see its own writes
+primary_until = ContextVar('db_primary_until', default=0.0)
+
+class DatabaseUnavailableError(Exception):
+    """The database could not be reached, timed out, or is being skipped by the circuit breaker"""
+    
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Fails database calls fast while the primary is unavailable.
+    
+    After failure_threshold consecutive failures the circuit opens and
+    every call is refused for reset_seconds. Then a single trial call is
+    let through: success closes the circuit, failure keeps it open for
+    another reset_seconds.
+    """
+    
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+    
+    def allow(self):
+        """Raise DatabaseUnavailableError unless a call may go to the database now"""
+        if self.opened_at is None:
+            return
+        with self.lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            if remaining <= 0 and not self.trial:
+                self.trial = True
+                return
+        circuit_rejections.inc()
+        raise DatabaseUnavailableError("Database circuit breaker is open", max(remaining, 1.0))
+    
+    def record_success(self):
+        if self.failures == 0 and self.opened_at is None:
+            return
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info("Database reachable again; closing the circuit breaker")
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+    
+    def is_open(self):
+        """Whether allow() would refuse a call now; unlike allow() this never takes the trial call"""
+        opened_at = self.opened_at
+        if opened_at is None:
+            return False
+        return self.trial or time.monotonic() < opened_at + self.reset_seconds
+    
+    def is_closed(self):
+        """Whether calls are going through normally, with no outage or trial call under way"""
+        return self.opened_at is None
+    
+    def record_failure(self):
+        if self.failure_threshold <= 0:
+            return
+        with self.lock:
+            self.failures += 1
+            self.trial = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.error("Database failed %s times in a row; opening the circuit breaker for %ss",
+                                 self.failures, self.reset_seconds)
+                self.opened_at = time.monotonic()
+
+class ReplicaPool:
+    """Read replicas picked by fewest reads in flight; one that fails sits out retry_seconds"""
+    
+    def __init__(self, backends, retry_seconds=30):
+        self.backends = backends
+        self.retry_seconds = retry_seconds
+        self.in_flight = [0] * len(backends)
+        self.down_until = [0.0] * len(backends)
+        self.next = 0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Index of the replica to read from, or None if none is up"""
+        now = time.monotonic()
+        with self.lock:
+            best = None
+            # Start after the last pick so ties rotate through the replicas
+            for offset in range(len(self.backends)):
+                replica = (self.next + offset) % len(self.backends)
+                if self.down_until[replica] > now:
+                    continue
+                if best is None or self.in_flight[replica] < self.in_flight[best]:
+                    best = replica
+            if best is not None:
+                self.in_flight[best] += 1
+                self.next = (best + 1) % len(self.backends)
+            return best
+    
+    def release(self, replica):
+        with self.lock:
+            self.in_flight[replica] -= 1
+    
+    def mark_down(self, replica):
+        with self.lock:
+            self.down_until[replica] = time.monotonic() + self.retry_seconds
+
 class DatabaseManager:
     def __init__(self):
         self.host = Config.MYSQL_HOST
         self.user = Config.MYSQL_USER
         self.password = Config.MYSQL_PASSWORD
         self.database = Config.MYSQL_DB
-        
+        self.backend = create_backend(Config)
+        self.replicas = ReplicaPool(create_replica_backends(Config), Config.REPLICA_RETRY_SECONDS)
+        self.breaker = CircuitBreaker(Config.DB_BREAKER_FAILURES, Config.DB_BREAKER_RESET_SECONDS)
+    
     def get_connection(self):
         """Get database connection"""
         try:
-            connection = pymysql.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.database,
-                charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor,
-                autocommit=True
-            )
+            connection = self.backend.connect()
+            connections_opened.inc()
             return connection
         except Exception as e:
-            logger.error(f"Database connection error: {e}")
+            connection_errors.inc()
+            logger.error("Database connection error: %s", e)
             return None
     
-    def execute_query(self, query, params=None):
-        """Execute a SELECT query and return results"""
-        connection = self.get_connection()
-        if not connection:
-            return None
-            
+    def get_read_connection(self, primary=False):
+        """A replica connection for a SELECT and the replica's index, or (None, None) to use the primary.
+        
+        Reads go to the primary when primary is set, when no replica is
+        configured or up, or for READ_YOUR_WRITES_SECONDS after this
+        request or thread last wrote.
+        """
+        if self.replicas.backends and not primary and time.time() >= primary_until.get():
+            replica = self.replicas.acquire()
+            if replica is not None:
+                backend = self.replicas.backends[replica]
+                try:
+                    connection = backend.connect()
+                    connections_opened.inc()
+                    reads_total.inc(target=backend.label)
+                    return connection, replica
+                except Exception as e:
+                    self.replicas.release(replica)
+                    self.replicas.mark_down(replica)
+                    connection_errors.inc()
+                    logger.error("Replica %s connection error: %s; reading from the primary",
+                                 backend.label, e)
+        return None, None
+    
+    def release_connection(self, connection, replica=None):
         try:
-            with connection.cursor() as cursor:
-                cursor.execute(query, params or ())
-                result = cursor.fetchall()
-                return result
-        except Exception as e:
-            logger.error(f"Query execution error: {e}")
-            return None
-        finally:
             connection.close()
+        except Exception:
+            # Connections that timed out have already been closed by the driver
+            pass
+        if replica is not None:
+            self.replicas.release(replica)
     
-    def execute_single_query(self, query, params=None):
-        """Execute a SELECT query and return single result"""
-        connection = self.get_connection()
-        if not connection:
-            return None
+    def note_write(self):
+        """Keep this request's (and, through the session, this user's) reads on the primary for a while.
+        
+        Writes no later read depends on, like rate limit buckets, pass
+        track=False so they don't take the request off the replicas.
+        """
+        if self.replicas.backends:
+            primary_until.set(time.time() + Config.READ_YOUR_WRITES_SECONDS)
+    
+    def run(self, operation, query, params, work, error_message, default=None, read=False, primary=False):
+        """Run work(cursor), which returns (result, rows), with timing and failure handling.
+        
+        A statement that fails returns default. If the database can't be
+        reached or times out, reads are retried up to DB_READ_RETRIES times
+        with jittered exponential backoff (writes aren't, as they may have
+        been applied), and DatabaseUnavailableError is raised once attempts
+        run out. While the circuit breaker is open it's raised immediately.
+        """
+        attempts = 1 + Config.DB_READ_RETRIES if read else 1
+        for attempt in range(attempts):
+            if attempt:
+                read_retries.inc()
+                time.sleep(random.uniform(0, Config.DB_RETRY_BACKOFF_MS / 1000 * 2 ** (attempt - 1)))
             
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute(query, params or ())
-                result = cursor.fetchone()
+            connection, replica = self.get_read_connection(primary) if read else (None, None)
+            if connection is None:
+                # The breaker guards the primary; replicas have their own retry window
+                self.breaker.allow()
+                if read:
+                    reads_total.inc(target='primary')
+                connection = self.get_connection()
+                if not connection:
+                    self.breaker.record_failure()
+                    continue
+            
+            connections_in_use.inc()
+            started = time.perf_counter()
+            rows = None
+            try:
+                with connection.cursor() as cursor:
+                    result, rows = work(cursor)
+                if replica is None:
+                    self.breaker.record_success()
                 return result
-        except Exception as e:
-            logger.error(f"Single query execution error: {e}")
-            return None
-        finally:
-            connection.close()
+            except Exception as e:
+                query_errors.inc(operation=operation)
+                if not self.backend.is_unavailable(e):
+                    # The server answered, so this says nothing against its health
+                    if replica is None:
+                        self.breaker.record_success()
+                    logger.error("%s: %s", error_message, e)
+                    return default
+                
+                logger.warning("Database unavailable for %s (attempt %s of %s): %s",
+                               operation, attempt + 1, attempts, e)
+                if replica is None:
+                    self.breaker.record_failure()
+                else:
+                    self.replicas.mark_down(replica)
+            finally:
+                connections_in_use.dec()
+                self.release_connection(connection, replica)
+                self.record(operation, query, params, started, rows)
+        
+        raise DatabaseUnavailableError(f"Database unavailable for {operation}",
+                                       Config.DB_BREAKER_RESET_SECONDS if self.breaker.opened_at else 1.0)
     
-    def execute_insert(self, query, params=None):
-        """Execute an INSERT query and return the inserted ID"""
-        connection = self.get_connection()
-        if not connection:
-            return None
-            
+    def execute_query(self, query, params=None, primary=False):
+        """Execute a SELECT query and return results"""
+        def fetch(cursor):
+            cursor.execute(query, params or ())
+            result = cursor.fetchall()
+            return result, len(result)
+        return self.run('select', query, params, fetch, "Query execution error",
+                        read=True, primary=primary)
+    
+    def execute_single_query(self, query, params=None, primary=False):
+        """Execute a SELECT query and return single result"""
+        def fetch(cursor):
+            cursor.execute(query, params or ())
+            result = cursor.fetchone()
+            return result, 0 if result is None else 1
+        return self.run('select', query, params, fetch, "Single query execution error",
+                        read=True, primary=primary)
+    
+    def execute_insert(self, query, params=None, track=True):
+        """Execute an INSERT query and return the inserted ID; track=False doesn't pin later reads to the primary"""
+        def insert(cursor):
+            rows = cursor.execute(query, params or ())
+            if track:
+                self.note_write()
+            return cursor.lastrowid, rows
+        return self.run('insert', query, params, insert, "Insert execution error")
+    
+    def execute_update(self, query, params=None, track=True):
+        """Execute an UPDATE/DELETE query and return affected rows; track=False doesn't pin later reads to the primary"""
+        def update(cursor):
+            rows = cursor.execute(query, params or ())
+            if track:
+                self.note_write()
+            return rows, rows
+        return self.run('update', query, params, update, "Update execution error", default=0)
+    
+    def execute_many(self, query, params_list):
+        """Execute an INSERT/UPDATE for every parameter set in one round trip and return affected rows"""
+        if not params_list:
+            return 0
+        
+        def update(cursor):
+            rows = cursor.executemany(query, params_list)
+            self.note_write()
+            return rows, rows
+        return self.run('batch', query, params_list[0], update, "Batch execution error", default=0)
+    
+    def stream_query(self, query, params=None, batch_size=1000, primary=False):
+        """Yield the rows of a SELECT as they arrive, holding at most batch_size of them at a time.
+        
+        MySQL streams through an unbuffered server-side cursor, which keeps
+        its connection busy until the generator is exhausted or closed.
+        Nothing is retried once rows have gone out, so any error is raised
+        (as DatabaseUnavailableError if the database can't be reached)
+        rather than ending the stream early as if it were complete.
+        """
+        connection, replica = self.get_read_connection(primary)
+        backend = self.backend if replica is None else self.replicas.backends[replica]
+        if connection is None:
+            self.breaker.allow()
+            reads_total.inc(target='primary')
+            connection = self.get_connection()
+            if not connection:
+                self.breaker.record_failure()
+                raise DatabaseUnavailableError("Database unavailable for stream",
+                                               Config.DB_BREAKER_RESET_SECONDS if self.breaker.opened_at else 1.0)
+        
+        connections_in_use.inc()
+        started = time.perf_counter()
+        rows = 0
+        unavailable = False
         try:
-            with connection.cursor() as cursor:
+            with backend.stream_cursor(connection) as cursor:
                 cursor.execute(query, params or ())
-                return cursor.lastrowid
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    rows += len(batch)
+                    yield from batch
         except Exception as e:
-            logger.error(f"Insert execution error: {e}")
-            return None
+            query_errors.inc(operation='stream')
+            if not backend.is_unavailable(e):
+                logger.error("Stream query error: %s", e)
+                raise
+            logger.warning("Database unavailable while streaming after %s rows: %s", rows, e)
+            unavailable = True
+            if replica is None:
+                self.breaker.record_failure()
+            else:
+                self.replicas.mark_down(replica)
+            raise DatabaseUnavailableError("Database unavailable for stream", 1.0) from e
         finally:
-            connection.close()
+            # Also reached through GeneratorExit when the consumer stops early (a client
+            # disconnecting mid-download); the database answered, so a trial call must end
+            if replica is None and not unavailable:
+                self.breaker.record_success()
+            connections_in_use.dec()
+            self.release_connection(connection, replica)
+            # Kept out of the query log: the time includes however long the consumer took
+            query_duration.observe(time.perf_counter() - started, operation='stream')
     
-    def execute_update(self, query, params=None):
-        """Execute an UPDATE/DELETE query and return affected rows"""
+    def record(self, operation, query, params, started, rows):
+        """Time a finished statement; rows is None if it failed"""
+        seconds = time.perf_counter() - started
+        query_duration.observe(seconds, operation=operation)
+        if Config.QUERY_LOG_ENABLED:
+            query_log.record(query, params, seconds, rows, explain=self.explain)
+    
+    def explain(self, query, params=None):
+        """The backend's plan for a statement (without running it), or None if it can't be explained"""
+        # Diagnostics never add load while the breaker is open or take its trial call
+        if not self.breaker.is_closed():
+            return None
         connection = self.get_connection()
         if not connection:
-            return 0
-            
+            return None
+        
         try:
             with connection.cursor() as cursor:
-                affected_rows = cursor.execute(query, params or ())
-                return affected_rows
+                cursor.execute(self.backend.explain_prefix + query, params or ())
+                return cursor.fetchall()
         except Exception as e:
-            logger.error(f"Update execution error: {e}")
-            return 0
+            logger.error("Explain error: %s", e)
+            return None
         finally:
-            connection.close()
+            self.release_connection(connection)
     
     def test_connection(self):
         """Test database connection"""
         connection = self.get_connection()
         if connection:
-            connection.close()
+            self.release_connection(connection)
             return True
         return False
 
 # Global database manager instance
 db_manager = DatabaseManager()
+
+metrics.gauge('db_circuit_open', 'Whether the database circuit breaker is refusing calls (1) or not (0)',
+              callback=lambda: 1 if db_manager.breaker.opened_at is not None else 0)
@@ -0,0 +1,259 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, date, time
+from functools import lru_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MYSQL_SCHEMA_FILE = os.path.join(PROJECT_DIR, 'database_setup.sql')
+SQLITE_SCHEMA_FILE = os.path.join(PROJECT_DIR, 'database_setup_sqlite.sql')
+
+class MySQLBackend:
+    """PyMySQL connections to a MySQL server"""
+    
+    name = 'mysql'
+    supports_fulltext = False
+    explain_prefix = 'EXPLAIN '
+    schema_file = MYSQL_SCHEMA_FILE
+    
+    # Client and server error codes meaning the server is unreachable, overloaded or stopped answering
+    UNAVAILABLE_CODES = {1040, 1053, 2002, 2003, 2005, 2006, 2013, 2055}
+    
+    def __init__(self, host, user, password, database, port=3306, connect_timeout=None,
+                 read_timeout=None, write_timeout=None):
+        # Imported lazily so SQLite-only installs don't need PyMySQL
+        import pymysql
+        self.pymysql = pymysql
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.database = database
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.write_timeout = write_timeout
+        self.label = f"{host}:{port}"
+    
+    def connect(self):
+        return self.pymysql.connect(
+            host=self.host,
+            port=self.port,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+            charset='utf8mb4',
+            cursorclass=self.pymysql.cursors.DictCursor,
+            autocommit=True,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            write_timeout=self.write_timeout
+        )
+    
+    def stream_cursor(self, connection):
+        """Unbuffered cursor: rows are read from the server as they're fetched, not all at once"""
+        return connection.cursor(self.pymysql.cursors.SSDictCursor)
+    
+    def translate(self, query):
+        return query
+    
+    def is_unavailable(self, error):
+        """Whether an error means the server can't be used right now, rather than a bad statement"""
+        if isinstance(error, self.pymysql.err.InterfaceError):
+            return True
+        return (isinstance(error, self.pymysql.err.OperationalError)
+                and bool(error.args) and error.args[0] in self.UNAVAILABLE_CODES)
+
+@lru_cache(maxsize=512)
+def translate_mysql_to_sqlite(query):
+    """Translate the MySQL-isms used by the models into SQLite syntax"""
+    query = query.replace('%s', '?')
+    query = query.replace('INSERT IGNORE INTO', 'INSERT OR IGNORE INTO')
+    query = query.replace('CURDATE()', "DATE('now', 'localtime')")
+    return query.replace('NOW()', "DATETIME('now', 'localtime')")
+
+def _register_sqlite_types():
+    """Store dates and times as ISO strings and read them back as Python objects"""
+    sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+    sqlite3.register_adapter(date, lambda value: value.isoformat())
+    sqlite3.register_adapter(time, lambda value: value.strftime('%H:%M:%S'))
+    sqlite3.register_converter('TIMESTAMP', lambda raw: datetime.fromisoformat(raw.decode()))
+    sqlite3.register_converter('DATETIME', lambda raw: datetime.fromisoformat(raw.decode()))
+    sqlite3.register_converter('DATE', lambda raw: date.fromisoformat(raw.decode()[:10]))
+    sqlite3.register_converter('TIME', lambda raw: time.fromisoformat(raw.decode()))
+
+class SQLiteCursor:
+    """Wraps a sqlite3 cursor so it behaves like a PyMySQL DictCursor"""
+    
+    def __init__(self, cursor, lock=None):
+        self.cursor = cursor
+        self.lock = lock
+    
+    def __enter__(self):
+        if self.lock:
+            self.lock.acquire()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.cursor.close()
+        if self.lock:
+            self.lock.release()
+    
+    def execute(self, query, params=()):
+        self.cursor.execute(translate_mysql_to_sqlite(query), tuple(params or ()))
+        return self.cursor.rowcount
+    
+    def executemany(self, query, seq_of_params):
+        self.cursor.executemany(translate_mysql_to_sqlite(query),
+                                [tuple(params) for params in seq_of_params])
+        return self.cursor.rowcount
+    
+    def _to_dict(self, row):
+        return {column[0]: value for column, value in zip(self.cursor.description, row)}
+    
+    def fetchall(self):
+        return [self._to_dict(row) for row in self.cursor.fetchall()]
+    
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        return self._to_dict(row) if row is not None else None
+    
+    def fetchmany(self, size):
+        return [self._to_dict(row) for row in self.cursor.fetchmany(size)]
+    
+    def __iter__(self):
+        for row in self.cursor:
+            yield self._to_dict(row)
+    
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+    
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+class SQLiteConnection:
+    """Handle to a long-lived per-thread SQLite connection; close() keeps it open"""
+    
+    def __init__(self, connection, lock=None):
+        self.connection = connection
+        self.lock = lock
+    
+    def cursor(self):
+        return SQLiteCursor(self.connection.cursor(), self.lock)
+    
+    def close(self):
+        pass
+
+class SQLiteBackend:
+    """Embedded SQLite database in WAL mode with FTS5 search tables.
+    
+    Each thread keeps one open connection, so reads skip the connect/auth
+    round trip entirely. ``:memory:`` databases are shared by all threads
+    through a single connection guarded by a lock.
+    """
+    
+    name = 'sqlite'
+    supports_fulltext = True
+    explain_prefix = 'EXPLAIN QUERY PLAN '
+    schema_file = SQLITE_SCHEMA_FILE
+    
+    def __init__(self, path, timeout=30):
+        _register_sqlite_types()
+        self.path = path
+        self.timeout = timeout
+        self.label = path
+        self.local = threading.local()
+        self.shared = None
+        self.lock = None
+        self.schema_lock = threading.Lock()
+        self.schema_ready = False
+        
+        if path == ':memory:':
+            self.shared = self._open()
+            self.lock = threading.RLock()
+    
+    def _open(self):
+        connection = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES,
+                                     isolation_level=None, check_same_thread=False,
+                                     timeout=self.timeout)
+        if self.path != ':memory:':
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute('PRAGMA foreign_keys=ON')
+        connection.execute('PRAGMA temp_store=MEMORY')
+        self._ensure_schema(connection)
+        return connection
+    
+    def _ensure_schema(self, connection):
+        """Create the schema from database_setup_sqlite.sql on first use"""
+        if self.schema_ready:
+            return
+        with self.schema_lock:
+            if self.schema_ready:
+                return
+            exists = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'knowledge_base'"
+            ).fetchone()
+            if not exists:
+                logger.info("Initializing SQLite database at %s", self.path)
+                with open(SQLITE_SCHEMA_FILE, encoding='utf-8') as f:
+                    connection.executescript(f.read())
+            self.schema_ready = True
+    
+    def connect(self):
+        if self.shared is not None:
+            return SQLiteConnection(self.shared, self.lock)
+        
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self._open()
+            self.local.connection = connection
+        return SQLiteConnection(connection)
+    
+    def stream_cursor(self, connection):
+        # sqlite3 cursors already step through results a row at a time
+        return connection.cursor()
+    
+    def translate(self, query):
+        return translate_mysql_to_sqlite(query)
+    
+    def is_unavailable(self, error):
+        """Whether an error means the database file can't be used right now, rather than a bad statement"""
+        message = str(error)
+        return isinstance(error, sqlite3.OperationalError) and (
+            'locked' in message or 'unable to open' in message or 'disk I/O' in message
+        )
+
+def mysql_timeouts(config):
+    """PyMySQL socket timeouts from Config, so a stuck server can't hang a worker"""
+    return {
+        'connect_timeout': config.DB_CONNECT_TIMEOUT,
+        'read_timeout': config.DB_READ_TIMEOUT,
+        'write_timeout': config.DB_WRITE_TIMEOUT
+    }
+
+def create_backend(config):
+    """Create the database backend selected by Config.DB_BACKEND"""
+    backend = (config.DB_BACKEND or 'mysql').lower()
+    if backend == 'sqlite':
+        return SQLiteBackend(config.SQLITE_PATH, config.DB_WRITE_TIMEOUT)
+    if backend == 'mysql':
+        return MySQLBackend(config.MYSQL_HOST, config.MYSQL_USER,
+                            config.MYSQL_PASSWORD, config.MYSQL_DB, **mysql_timeouts(config))
+    raise ValueError(f"Unknown database backend: {config.DB_BACKEND}")
+
+def create_replica_backends(config):
+    """Backends for the read replicas in Config.DB_REPLICAS: MySQL "host[:port]"s or SQLite paths"""
+    replicas = [item.strip() for item in (config.DB_REPLICAS or '').split(',') if item.strip()]
+    if (config.DB_BACKEND or 'mysql').lower() == 'sqlite':
+        return [SQLiteBackend(path, config.DB_WRITE_TIMEOUT) for path in replicas]
+    backends = []
+    for replica in replicas:
+        host, _, port = replica.partition(':')
+        backends.append(MySQLBackend(host, config.MYSQL_USER, config.MYSQL_PASSWORD,
+                                     config.MYSQL_DB, int(port or 3306), **mysql_timeouts(config)))
+    return backends
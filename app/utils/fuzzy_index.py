@@ -0,0 +1,251 @@
+import threading
+from collections import defaultdict
+import numpy as np
+from app.utils.metrics import metrics
+from app.utils.semantic_index import semantic_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Correction metrics
+corrections_made = metrics.counter(
+    'fuzzy_corrections_total', 'Query terms replaced by a close knowledge base term'
+)
+
+def bounded_edit_distance(query, term, limit):
+    """Levenshtein distance from query to term and to the closest prefix of term.
+    
+    Only a diagonal band of the DP table is filled and the search stops as
+    soon as every cell in a row exceeds limit; distances above limit are
+    reported as limit + 1.
+    """
+    over = limit + 1
+    extra = max(0, len(term) - len(query))
+    previous = list(range(len(term) + 1))
+    for i, char in enumerate(query, 1):
+        low = max(1, i - limit)
+        high = min(len(term), i + limit + extra)
+        current = [over] * (len(term) + 1)
+        if low == 1:
+            current[0] = i
+        row_best = current[0] if low == 1 else over
+        for j in range(low, high + 1):
+            value = previous[j - 1] + (char != term[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            current[j] = value
+            if value < row_best:
+                row_best = value
+        if row_best > limit:
+            return over, over
+        previous = current
+    
+    full = min(previous[-1], over)
+    prefix = min(min(previous[max(0, len(query) - limit):]), over)
+    return full, prefix
+
+class TrigramIndex:
+    """Character trigram index for typo-tolerant lookup of vocabulary terms.
+    
+    Terms are numbered in order of length, so each trigram's postings list
+    can be cut down to a length window using offsets computed at build time. A misspelled
+    word with k edits still shares at least n - 3k of its n padded trigrams
+    with the intended term; terms passing that count are verified with a
+    bounded edit distance, best shared-trigram counts first.
+    """
+    
+    MIN_LENGTH = 4
+    # Shorter query words have too many one-edit neighbours to correct reliably
+    MIN_WORD_LENGTH = 5
+    MAX_VERIFIED = 8
+    
+    def __init__(self):
+        self.terms = []
+        self.lookup = {}
+        self.frequencies = np.zeros(0, dtype=np.int64)
+        self.postings = {}
+        self.length_starts = [0]
+    
+    @staticmethod
+    def trigrams(term):
+        padded = f"${term}$"
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+    
+    @staticmethod
+    def max_distance(length):
+        """Edits tolerated for a word of this length"""
+        if length < TrigramIndex.MIN_WORD_LENGTH:
+            return 0
+        return 1 if length <= 7 else 2
+    
+    def build(self, terms, frequencies=None):
+        """Index alphabetic terms; frequencies (e.g. document counts) break ties"""
+        frequencies = frequencies or {}
+        terms = sorted({term for term in terms if len(term) >= self.MIN_LENGTH and term.isalpha()},
+                       key=lambda term: (len(term), term))
+        postings = defaultdict(list)
+        for term_id, term in enumerate(terms):
+            for gram in self.trigrams(term):
+                postings[gram].append(term_id)
+        
+        lengths = np.array([len(term) for term in terms], dtype=np.int64)
+        self.terms = terms
+        self.lookup = {term: term_id for term_id, term in enumerate(terms)}
+        self.frequencies = np.array([frequencies.get(term, 0) for term in terms], dtype=np.int64)
+        self.length_starts = np.searchsorted(lengths, np.arange(0, (lengths.max() if len(terms) else 0) + 2))
+        
+        # Each postings list keeps where every term length starts within it
+        self.postings = {}
+        for gram, ids in postings.items():
+            ids = np.array(ids, dtype=np.int32)
+            self.postings[gram] = (ids, np.searchsorted(ids, self.length_starts).tolist())
+        self.length_starts = self.length_starts.tolist()
+        return len(terms)
+    
+    def _length_bucket(self, length):
+        return min(max(length, 0), len(self.length_starts) - 1)
+    
+    def _candidates(self, word, limit, allow_prefix):
+        """Term ids sharing enough trigrams with word, most shared first"""
+        grams = self.trigrams(word)
+        shortest = self._length_bucket(len(word) - limit)
+        longest = self._length_bucket(len(word) + limit + (3 if allow_prefix else 1))
+        low, high = self.length_starts[shortest], self.length_starts[longest]
+        
+        slices = []
+        for gram in grams:
+            entry = self.postings.get(gram)
+            if entry is not None:
+                ids, offsets = entry
+                slices.append(ids[offsets[shortest]:offsets[longest]])
+        if not slices:
+            return []
+        ids = np.concatenate(slices)
+        
+        # Prefix matches may also lose the trailing "x$" trigram
+        threshold = max(2, len(grams) - 3 * limit - (1 if allow_prefix else 0))
+        if len(ids) * 8 < high - low:
+            # Few hits: count runs in the sorted ids
+            ids.sort()
+            run_starts = np.flatnonzero(np.diff(ids, prepend=-1))
+            counts = np.diff(np.append(run_starts, len(ids)))
+            keep = counts >= threshold
+            candidates, counts = ids[run_starts[keep]], counts[keep]
+        else:
+            counts = np.bincount(ids - low, minlength=high - low)
+            candidates = np.flatnonzero(counts >= threshold)
+            counts = counts[candidates]
+            candidates = candidates + low
+        
+        if len(candidates) > self.MAX_VERIFIED:
+            best = np.argpartition(counts, -self.MAX_VERIFIED)[-self.MAX_VERIFIED:]
+            candidates, counts = candidates[best], counts[best]
+        return candidates[np.argsort(-counts, kind='stable')].tolist()
+    
+    def correct(self, word):
+        """Closest vocabulary term to word as (term, distance), or None"""
+        if word in self.lookup:
+            return word, 0
+        if not word.isalpha():
+            return None
+        
+        # Most typos are a single edit, and the narrow one-edit search settles
+        # them without scanning the much larger two-edit candidate window
+        for limit in range(1, self.max_distance(len(word)) + 1):
+            match = self._closest(word, limit)
+            if match:
+                return match
+        return None
+    
+    def _closest(self, word, limit):
+        """Best verified candidate within limit edits"""
+        # Long words may match the start of a longer term ("pythagorus" -> "pythagorean")
+        allow_prefix = limit > 1
+        best_key, best_term = None, None
+        for term_id in self._candidates(word, limit, allow_prefix):
+            term = self.terms[term_id]
+            full, prefix = bounded_edit_distance(word, term, limit)
+            if full <= limit:
+                key = (full, 0, -self.frequencies[term_id])
+            elif allow_prefix and prefix <= limit:
+                key = (prefix, 1, -self.frequencies[term_id])
+            else:
+                continue
+            if best_key is None or key < best_key:
+                best_key, best_term = key, term
+        return (best_term, best_key[0]) if best_term else None
+
+class KnowledgeTermCorrector:
+    """Corrects query terms against the knowledge base vocabulary.
+    
+    The trigram index is built from the semantic index's term dictionary
+    and rebuilt whenever that index is rebuilt or a new snapshot is mapped.
+    New terms from entries changed since then (the semantic index overlay)
+    go into a small second index.
+    """
+    
+    def __init__(self):
+        self.index = None
+        self.source = None
+        self.extra_index = None
+        self.extra_source = None
+        self.lock = threading.Lock()
+    
+    def get_index(self):
+        data = semantic_index.ensure_loaded()
+        if data is None:
+            return None
+        if data is not self.source:
+            with self.lock:
+                if data is not self.source:
+                    index = TrigramIndex()
+                    frequencies = np.diff(data.postings_offsets.astype(np.int64))
+                    count = index.build(iter(data.terms), {
+                        term: int(frequencies[term_id]) for term_id, term in enumerate(data.terms)
+                    } if len(frequencies) else None)
+                    logger.info("Trigram index built over %s knowledge base terms", count)
+                    self.index, self.source = index, data
+        return self.index
+    
+    def get_extra_index(self):
+        """Index over overlay terms the main index doesn't know, or None"""
+        overlay = semantic_index.current_overlay(self.source)
+        if overlay is None:
+            return None
+        if overlay is not self.extra_source:
+            with self.lock:
+                if overlay is not self.extra_source:
+                    index = TrigramIndex()
+                    index.build(term for term in overlay.data.terms if self.source.terms.get(term) is None)
+                    self.extra_index, self.extra_source = index, overlay
+        return self.extra_index
+    
+    def correct_terms(self, terms):
+        """Correct misspelled terms; returns (terms, [{'original', 'corrected'}, ...])"""
+        index = self.get_index()
+        if index is None:
+            return list(terms), []
+        extra = self.get_extra_index()
+        vocabularies = [self.source.terms] + ([self.extra_source.data.terms] if extra else [])
+        
+        corrected, corrections = [], []
+        for term in terms:
+            word = term.lower()
+            if len(word) < TrigramIndex.MIN_WORD_LENGTH or any(
+                    vocabulary.get(word) is not None for vocabulary in vocabularies):
+                corrected.append(term)
+                continue
+            matches = [match for match in (index.correct(word), extra.correct(word) if extra else None) if match]
+            match = min(matches, key=lambda match: match[1]) if matches else None
+            if match and match[1] > 0:
+                corrected.append(match[0])
+                corrections.append({'original': term, 'corrected': match[0]})
+                corrections_made.inc()
+            else:
+                corrected.append(term)
+        return corrected, corrections
+
+# Global knowledge term corrector instance
+term_corrector = KnowledgeTermCorrector()
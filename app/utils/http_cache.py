@@ -0,0 +1,102 @@
+import hashlib
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from functools import wraps
+from flask import request, session, make_response
+from app.utils.metrics import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Conditional GET metrics
+not_modified_total = metrics.counter(
+    'http_not_modified_total', 'Conditional GETs answered with 304 Not Modified', ('endpoint',)
+)
+
+def make_etag(*parts):
+    """Weak ETag over everything the response body depends on.
+    
+    Weak because the same body may be sent gzip- or brotli-encoded.
+    """
+    digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def http_date(value):
+    """Format a datetime as an HTTP date (whole seconds)"""
+    return formatdate(value.timestamp(), usegmt=True)
+
+def opaque_tag(tag):
+    tag = tag.strip()
+    return tag[2:] if tag.startswith('W/') else tag
+
+def etag_matches(header, etag):
+    """Weak If-None-Match comparison against a list of entity tags"""
+    if header.strip() == '*':
+        return True
+    expected = opaque_tag(etag)
+    return any(opaque_tag(tag) == expected for tag in header.split(','))
+
+def unmodified_since(header, last_modified):
+    """True when last_modified is no later than an If-Modified-Since date"""
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    return since is not None and int(last_modified.timestamp()) <= since.timestamp()
+
+def is_fresh(etag, last_modified):
+    """Whether the client's cached copy is current; If-None-Match takes precedence"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get('If-Modified-Since')
+    if if_modified_since and last_modified:
+        return unmodified_since(if_modified_since, last_modified)
+    return False
+
+def conditional_get(version, max_age=0):
+    """Decorator adding ETag/Last-Modified validation to a GET route.
+    
+    version(**view_kwargs) returns (token, last_modified) describing the
+    data behind the route, or None to skip validation. It runs before the
+    view, so a request whose cached copy is still current gets a 304
+    without the view doing any work. The ETag also covers the path, query
+    string and user, since the body depends on them.
+    
+    With max_age the browser reuses the response for that many seconds
+    before revalidating (catalog data); otherwise it revalidates every time.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                current = version(**kwargs)
+            except Exception as e:
+                logger.error("Response version lookup error: %s", e)
+                current = None
+            if current is None:
+                return f(*args, **kwargs)
+            
+            token, last_modified = current
+            if isinstance(last_modified, str):
+                # SQLite returns MAX() over timestamp columns as text
+                last_modified = datetime.fromisoformat(last_modified)
+            etag = make_etag(request.full_path, session.get('user_id'), token, last_modified)
+            headers = {
+                'ETag': etag,
+                'Cache-Control': f'private, max-age={max_age}' if max_age else 'private, no-cache'
+            }
+            if last_modified:
+                headers['Last-Modified'] = http_date(last_modified)
+            
+            if is_fresh(etag, last_modified):
+                not_modified_total.inc(endpoint=request.endpoint)
+                return make_response(('', 304, headers))
+            
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                for name, value in headers.items():
+                    response.headers[name] = value
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,218 @@
+import os
+import re
+import zlib
+from functools import lru_cache
+from itertools import chain
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Intents the classifier chooses between; 'general' is anything else
+INTENTS = ('question', 'study_tip', 'reminder', 'schedule', 'note', 'greeting', 'goodbye', 'general')
+
+DEFAULT_DIMENSIONS = 1 << 15
+
+# Temperatures tried when calibrating confidences on the held-out split
+TEMPERATURES = np.geomspace(0.25, 4.0, 41)
+
+# Model trained (and calibrated) on the seed set, shipped for deployments without INTENT_MODEL_PATH;
+# rebuild it with: python train_intent_model.py --no-history --output app/utils/intent_model_seed.npz
+SEED_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent_model_seed.npz')
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+@lru_cache(maxsize=50000)
+def word_features(word, dimensions):
+    """Hashed ids of a word and its character trigrams (which keep typos close to the right word)"""
+    padded = f" {word} "
+    grams = [f"w:{word}"] + [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return tuple(zlib.crc32(gram.encode('utf-8')) % dimensions for gram in grams)
+
+def features(text, dimensions):
+    """Hashed feature ids for a message: words, word bigrams, character trigrams and cues"""
+    words = WORD_PATTERN.findall(text.lower())
+    ids = [zlib.crc32(b'<s>') % dimensions]
+    if words:
+        ids.append(zlib.crc32(f"f:{words[0]}".encode('utf-8')) % dimensions)
+    if '?' in text:
+        ids.append(zlib.crc32(b'p:?') % dimensions)
+    for word in words:
+        ids.extend(word_features(word, dimensions))
+    for first, second in zip(words, words[1:]):
+        ids.append(zlib.crc32(f"b:{first} {second}".encode('utf-8')) % dimensions)
+    return ids
+
+def featurize(texts, dimensions):
+    """Feature ids of several messages, concatenated, with each message's offset and length"""
+    id_lists = [features(text, dimensions) for text in texts]
+    lengths = np.fromiter((len(ids) for ids in id_lists), dtype=np.int64, count=len(id_lists))
+    offsets = np.zeros(len(id_lists), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    ids = np.fromiter(chain.from_iterable(id_lists), dtype=np.int64, count=int(lengths.sum()))
+    return ids, offsets, lengths
+
+def softmax(logits):
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+class IntentModel:
+    """Linear classifier over hashed n-gram features.
+    
+    weights is a (dimensions, intents) float32 matrix: a message's logits
+    are the sum of the rows of its feature ids, scaled by 1/sqrt(feature
+    count), plus the bias. Confidences are the softmax of the logits
+    divided by a temperature fitted on held-out data, so a confidence of
+    0.8 is right about 80% of the time.
+    """
+    
+    def __init__(self, weights, bias, labels=INTENTS, temperature=1.0):
+        self.weights = weights
+        self.bias = bias
+        self.labels = tuple(labels)
+        self.temperature = float(temperature)
+    
+    @property
+    def dimensions(self):
+        return self.weights.shape[0]
+    
+    def logits(self, ids, offsets, lengths):
+        return (np.add.reduceat(self.weights[ids], offsets, axis=0)
+                / np.sqrt(lengths)[:, None] + self.bias)
+    
+    def predict(self, text):
+        """(intent, confidence) for one message"""
+        ids = features(text, self.dimensions)
+        logits = self.weights[ids].sum(axis=0) / np.sqrt(len(ids)) + self.bias
+        probabilities = softmax(logits / self.temperature)
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+    
+    def predict_many(self, texts):
+        """(intent, confidence) for each message, scored in one pass"""
+        if not texts:
+            return []
+        probabilities = softmax(self.logits(*featurize(texts, self.dimensions)) / self.temperature)
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[label], float(confidence))
+                for label, confidence in zip(best, probabilities[np.arange(len(texts)), best])]
+    
+    def save(self, path):
+        """Write the model to a compressed .npz file (replaced atomically)"""
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as f:
+            np.savez_compressed(f, weights=self.weights, bias=self.bias, labels=np.array(self.labels),
+                     temperature=np.array(self.temperature))
+        os.replace(temporary, path)
+    
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['weights'].astype(np.float32), data['bias'].astype(np.float32),
+                       [str(label) for label in data['labels']], float(data['temperature']))
+
+def fit(ids, offsets, lengths, targets, classes, dimensions, epochs=30, batch_size=64,
+        learning_rate=0.5, l2=1e-3, seed=0):
+    """Softmax regression with AdaGrad, updating only the feature rows each batch touches"""
+    rng = np.random.default_rng(seed)
+    weights = np.zeros((dimensions, classes), dtype=np.float32)
+    bias = np.zeros(classes, dtype=np.float32)
+    weights_squared = np.full((dimensions, classes), 1e-8, dtype=np.float32)
+    bias_squared = np.full(classes, 1e-8, dtype=np.float32)
+    model = IntentModel(weights, bias, range(classes))
+    
+    for _ in range(epochs):
+        order = rng.permutation(len(targets))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            batch_ids = np.concatenate([ids[offsets[i]:offsets[i] + lengths[i]] for i in batch])
+            batch_lengths = lengths[batch]
+            batch_offsets = np.zeros(len(batch), dtype=np.int64)
+            np.cumsum(batch_lengths[:-1], out=batch_offsets[1:])
+            
+            gradient = softmax(model.logits(batch_ids, batch_offsets, batch_lengths))
+            gradient[np.arange(len(batch)), targets[batch]] -= 1
+            gradient /= len(batch)
+            
+            rows = np.repeat(np.arange(len(batch)), batch_lengths)
+            touched, inverse = np.unique(batch_ids, return_inverse=True)
+            weight_gradient = np.zeros((len(touched), classes), dtype=np.float32)
+            np.add.at(weight_gradient, inverse, gradient[rows] / np.sqrt(batch_lengths[rows])[:, None])
+            weight_gradient += l2 * weights[touched]
+            
+            weights_squared[touched] += weight_gradient ** 2
+            weights[touched] -= learning_rate * weight_gradient / np.sqrt(weights_squared[touched])
+            bias_gradient = gradient.sum(axis=0)
+            bias_squared += bias_gradient ** 2
+            bias -= learning_rate * bias_gradient / np.sqrt(bias_squared)
+    return weights, bias
+
+def calibrate(model, ids, offsets, lengths, targets):
+    """Temperature minimizing the negative log likelihood of the held-out labels"""
+    logits = model.logits(ids, offsets, lengths)
+    losses = [-np.log(softmax(logits / temperature)[np.arange(len(targets)), targets] + 1e-12).mean()
+              for temperature in TEMPERATURES]
+    return float(TEMPERATURES[int(np.argmin(losses))])
+
+def calibration_error(probabilities, targets, bins=10):
+    """Expected calibration error: the gap between confidence and accuracy, averaged over confidence bins"""
+    confidence = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == targets
+    error = 0.0
+    for low in np.linspace(0, 1, bins, endpoint=False):
+        in_bin = (confidence > low) & (confidence <= low + 1.0 / bins)
+        if in_bin.any():
+            error += in_bin.mean() * abs(confidence[in_bin].mean() - correct[in_bin].mean())
+    return float(error)
+
+def train(examples, dimensions=DEFAULT_DIMENSIONS, holdout=0.2, seed=0, **options):
+    """Train on (text, intent) pairs; returns (model, stats on the held-out split).
+    
+    The temperature is fitted on the held-out split, then the final
+    weights are trained on every example.
+    """
+    examples = [(text, intent) for text, intent in examples if intent in INTENTS]
+    if not examples:
+        raise ValueError("No labelled examples to train on")
+    texts = [text for text, _ in examples]
+    targets = np.array([INTENTS.index(intent) for _, intent in examples], dtype=np.int64)
+    ids, offsets, lengths = featurize(texts, dimensions)
+    
+    order = np.random.default_rng(seed).permutation(len(examples))
+    held_out, kept = order[:int(len(order) * holdout)], order[int(len(order) * holdout):]
+    temperature, stats = 1.0, {'examples': len(examples), 'held_out': len(held_out)}
+    if len(held_out):
+        split = lambda rows: (np.concatenate([ids[offsets[i]:offsets[i] + lengths[i]] for i in rows]),
+                              np.concatenate([[0], np.cumsum(lengths[rows])[:-1]]).astype(np.int64),
+                              lengths[rows])
+        train_ids, train_offsets, train_lengths = split(kept)
+        weights, bias = fit(train_ids, train_offsets, train_lengths, targets[kept], len(INTENTS),
+                            dimensions, seed=seed, **options)
+        trial = IntentModel(weights, bias)
+        test_ids, test_offsets, test_lengths = split(held_out)
+        temperature = calibrate(trial, test_ids, test_offsets, test_lengths, targets[held_out])
+        probabilities = softmax(trial.logits(test_ids, test_offsets, test_lengths) / temperature)
+        stats.update(accuracy=float((probabilities.argmax(axis=1) == targets[held_out]).mean()),
+                     calibration_error=calibration_error(probabilities, targets[held_out]),
+                     temperature=temperature)
+    
+    weights, bias = fit(ids, offsets, lengths, targets, len(INTENTS), dimensions, seed=seed, **options)
+    return IntentModel(weights, bias, INTENTS, temperature), stats
+
+def load_intent_model(path):
+    """The trained model at path, else the shipped seed model, else one trained on the seed set now"""
+    for candidate in (path, SEED_MODEL_PATH):
+        if candidate and os.path.exists(candidate):
+            try:
+                model = IntentModel.load(candidate)
+                logger.info("Loaded intent model from %s", candidate)
+                return model
+            except (OSError, KeyError, ValueError) as e:
+                logger.error("Could not load intent model %s: %s", candidate, e)
+    
+    logger.warning("No intent model file found; training on the seed set")
+    from app.utils.intent_seed import seed_examples
+    # Hold some seeds out so the confidences are still calibrated
+    model, _ = train(seed_examples())
+    return model
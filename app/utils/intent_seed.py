@@ -0,0 +1,163 @@
+# Hand-labelled messages every intent model is trained on, alongside labelled chat history
+SEED_EXAMPLES = {
+    'question': [
+        "What is the Pythagorean theorem?",
+        "Explain photosynthesis to me",
+        "Tell me about World War II",
+        "How does recursion work in programming?",
+        "What is a linear equation and how do I find the slope?",
+        "Why is the sky blue?",
+        "Who wrote Romeo and Juliet?",
+        "When did the Roman Empire fall?",
+        "Where is the mitochondria found in a cell?",
+        "Which planet is closest to the sun?",
+        "Can you explain Newton's third law?",
+        "Could you tell me what an algorithm is?",
+        "what's the difference between mitosis and meiosis",
+        "define a prime number",
+        "how do you solve quadratic equations",
+        "What causes earthquakes?",
+        "explain the water cycle",
+        "What is a metaphor in poetry?",
+        "How do vaccines work?",
+        "what is the derivative of x squared",
+        "Tell me about the French Revolution",
+        "what does a binary search tree do",
+        "How is energy conserved in a pendulum?",
+        "What are the parts of speech in English grammar?",
+        "explain big o notation",
+    ],
+    'study_tip': [
+        "How do I study better for my chemistry exam?",
+        "how do I study for my chemistry deadline?",
+        "Give me some tips to memorize the periodic table",
+        "I can't focus when I study, any advice?",
+        "What's the best way to remember vocabulary?",
+        "Help me improve my concentration",
+        "How can I learn faster?",
+        "tips for studying math",
+        "I keep forgetting what I read, how do I retain it better?",
+        "how should I prepare for finals",
+        "Any advice for memorizing history dates?",
+        "How do I stop procrastinating on homework?",
+        "best way to revise for a test",
+        "I get distracted easily while studying",
+        "give me a study tip",
+        "How can I get better at writing essays?",
+        "what's a good technique for learning programming",
+        "how to study effectively",
+        "I'm struggling to understand calculus, how should I approach it?",
+        "Help me learn more efficiently",
+    ],
+    'reminder': [
+        "Remind me to review algebra notes tomorrow at 3 PM",
+        "Set a reminder for my biology test on Friday",
+        "remind me about the essay deadline next week",
+        "Create a reminder to read chapter 5 tonight",
+        "Don't let me forget my history presentation on Monday",
+        "add reminder: submit lab report at 9am",
+        "I have a chemistry deadline on Thursday, remind me the day before",
+        "Remind me in two hours to take a break",
+        "set reminder for project due date",
+        "Can you remind me to call my tutor at 5?",
+        "remind me to practice spanish every evening",
+        "alert me before my exam on the 12th",
+        "My assignment is due Friday, please remind me",
+        "reminder to bring calculator tomorrow",
+        "ping me at 7 pm to start homework",
+    ],
+    'schedule': [
+        "Can you help me plan a study schedule for history?",
+        "Schedule a study session for physics on Saturday at 10am",
+        "Make me a timetable for exam week",
+        "Plan two hours of math every Tuesday",
+        "find me 2 hours this week",
+        "When do I have free time to study tomorrow?",
+        "Organize my study plan for the next month",
+        "book a study block for chemistry on Wednesday afternoon",
+        "add a study session to my calendar",
+        "I need a time management plan for my courses",
+        "put english revision on my schedule for Sunday morning",
+        "create a weekly study plan",
+        "what does my study schedule look like",
+        "find free slots for a 90 minute session",
+        "Schedule biology review for 3pm tomorrow",
+    ],
+    'note': [
+        "I need to take notes on Shakespeare",
+        "Save a note: photosynthesis converts light into chemical energy",
+        "write down that the quiz covers chapters 3 and 4",
+        "Add note about the causes of World War I",
+        "make notes on the cell cycle",
+        "record this: pi is roughly 3.14159",
+        "note that mitochondria are the powerhouse of the cell",
+        "save this for later: the derivative of sin is cos",
+        "Can you store a note about Newton's laws?",
+        "take a note for my history class",
+        "jot down the key dates of the civil war",
+        "keep a note that the essay needs five paragraphs",
+        "new note: review recursion examples",
+        "please save my notes on grammar rules",
+        "add to my notes: the speed of light is 300,000 km/s",
+    ],
+    'greeting': [
+        "Hello there!",
+        "hi",
+        "Hey!",
+        "Good morning",
+        "good afternoon",
+        "Good evening!",
+        "hello, how are you?",
+        "what's up",
+        "hey there buddy",
+        "Hi, I'm new here",
+        "yo",
+        "hiya",
+        "greetings",
+        "Hello study buddy",
+        "hey, how's it going",
+    ],
+    'goodbye': [
+        "Thanks, that's all for today. Bye!",
+        "bye",
+        "Goodbye!",
+        "see you later",
+        "thank you so much",
+        "thanks!",
+        "that's all, thanks",
+        "farewell",
+        "I'm done for now",
+        "quit",
+        "exit",
+        "catch you tomorrow",
+        "talk to you later",
+        "thanks for the help, bye",
+        "good night",
+    ],
+    'general': [
+        "I like turtles",
+        "my name is Alex",
+        "ok",
+        "cool",
+        "I'm bored",
+        "lol",
+        "that's interesting",
+        "I don't know",
+        "maybe",
+        "sure",
+        "the weather is nice today",
+        "I had pizza for lunch",
+        "hmm",
+        "my dog is sleeping",
+        "nothing much",
+        "I'm in tenth grade",
+        "yes",
+        "no",
+        "whatever",
+        "I play soccer on weekends",
+    ]
+}
+
+def seed_examples():
+    """The seed set as (text, intent) pairs"""
+    return [(text, intent) for intent, texts in SEED_EXAMPLES.items() for text in texts]
@@ -0,0 +1,154 @@
+import random
+
+class _Node:
+    __slots__ = ('start', 'end', 'key', 'priority', 'max_end', 'left', 'right')
+    
+    def __init__(self, start, end, key):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.priority = random.random()
+        self.max_end = end
+        self.left = None
+        self.right = None
+
+def _update(node):
+    """Recompute the subtree max end of a node"""
+    max_end = node.end
+    if node.left and node.left.max_end > max_end:
+        max_end = node.left.max_end
+    if node.right and node.right.max_end > max_end:
+        max_end = node.right.max_end
+    node.max_end = max_end
+
+def _rotate_right(node):
+    pivot = node.left
+    node.left = pivot.right
+    pivot.right = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+def _rotate_left(node):
+    pivot = node.right
+    node.right = pivot.left
+    pivot.left = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+class IntervalTree:
+    """Half-open [start, end) intervals in a treap augmented with subtree max end.
+    
+    Intervals are identified by a unique key so they can be moved or removed
+    when the underlying record changes. Insert, remove and overlap queries
+    run in O(log n) expected time (plus the number of reported overlaps).
+    """
+    
+    def __init__(self):
+        self.root = None
+        self.intervals = {}
+    
+    def __len__(self):
+        return len(self.intervals)
+    
+    def __contains__(self, key):
+        return key in self.intervals
+    
+    def insert(self, start, end, key):
+        """Insert an interval, replacing any interval with the same key"""
+        if end <= start:
+            raise ValueError("Interval end must be after its start")
+        if key in self.intervals:
+            self.remove(key)
+        self.intervals[key] = (start, end)
+        self.root = self._insert(self.root, _Node(start, end, key))
+    
+    def _insert(self, node, new_node):
+        if node is None:
+            return new_node
+        if (new_node.start, new_node.key) < (node.start, node.key):
+            node.left = self._insert(node.left, new_node)
+            if node.left.priority > node.priority:
+                node = _rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new_node)
+            if node.right.priority > node.priority:
+                node = _rotate_left(node)
+        _update(node)
+        return node
+    
+    def remove(self, key):
+        """Remove the interval stored under key; returns True if it existed"""
+        interval = self.intervals.pop(key, None)
+        if interval is None:
+            return False
+        self.root = self._remove(self.root, interval[0], key)
+        return True
+    
+    def _remove(self, node, start, key):
+        if node is None:
+            return None
+        if node.key == key:
+            if node.left is None:
+                return node.right
+            if node.right is None:
+                return node.left
+            if node.left.priority > node.right.priority:
+                node = _rotate_right(node)
+                node.right = self._remove(node.right, start, key)
+            else:
+                node = _rotate_left(node)
+                node.left = self._remove(node.left, start, key)
+        elif (start, key) < (node.start, node.key):
+            node.left = self._remove(node.left, start, key)
+        else:
+            node.right = self._remove(node.right, start, key)
+        _update(node)
+        return node
+    
+    def overlapping(self, start, end):
+        """Return (start, end, key) tuples overlapping [start, end), ordered by start"""
+        results = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            # Nothing in this subtree ends after the query starts
+            if node.max_end <= start:
+                continue
+            if node.right and node.start < end:
+                stack.append(node.right)
+            if node.start < end and node.end > start:
+                results.append((node.start, node.end, node.key))
+            if node.left:
+                stack.append(node.left)
+        results.sort(key=lambda item: (item[0], item[1]))
+        return results
+    
+    def overlaps(self, start, end):
+        """Check whether any interval overlaps [start, end)"""
+        node = self.root
+        while node:
+            if node.start < end and node.end > start:
+                return True
+            # Go left when the left subtree can still reach past start
+            if node.left and node.left.max_end > start:
+                node = node.left
+            elif node.start < end:
+                node = node.right
+            else:
+                return False
+        return False
+    
+    def free_gaps(self, start, end):
+        """Return the gaps inside [start, end) not covered by any interval"""
+        gaps = []
+        cursor = start
+        for busy_start, busy_end, _ in self.overlapping(start, end):
+            if busy_start > cursor:
+                gaps.append((cursor, busy_start))
+            if busy_end > cursor:
+                cursor = busy_end
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
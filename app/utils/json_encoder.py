@@ -0,0 +1,101 @@
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from flask import current_app
+from flask.json import JSONEncoder
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def format_timedelta(value):
+    """PyMySQL returns TIME columns as timedelta; write them as HH:MM:SS"""
+    minutes, seconds = divmod(int(value.total_seconds()), 60)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:{seconds:02d}"
+
+# Exact-type lookup first: one dict hit per value on the hot path
+VALUE_ENCODERS = {
+    datetime: datetime.isoformat,
+    date: date.isoformat,
+    time: time.isoformat,
+    Decimal: float,
+    timedelta: format_timedelta
+}
+
+def encode_value(value):
+    """Encode the non-JSON types that come back from the database"""
+    encode = VALUE_ENCODERS.get(type(value))
+    if encode is not None:
+        return encode(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, timedelta):
+        return format_timedelta(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class StdlibEncoder:
+    """Response encoder built on the json module"""
+    
+    name = 'stdlib'
+    
+    def dumps(self, obj):
+        return json.dumps(obj, default=encode_value, ensure_ascii=False,
+                          check_circular=False, separators=(',', ':')).encode('utf-8')
+
+class OrjsonEncoder:
+    """Response encoder built on orjson, which writes datetime/date/time natively"""
+    
+    name = 'orjson'
+    
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        self.options = orjson.OPT_NON_STR_KEYS
+    
+    def dumps(self, obj):
+        return orjson.dumps(obj, default=encode_value, option=self.options)
+
+# Encoders selectable through Config.JSON_ENCODER
+ENCODERS = {
+    'stdlib': StdlibEncoder,
+    'orjson': OrjsonEncoder
+}
+
+def create_encoder(name='auto'):
+    """Build the named encoder; 'auto' prefers orjson and falls back to the stdlib"""
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'stdlib'
+    try:
+        return ENCODERS[name]()
+    except (KeyError, ImportError) as e:
+        logger.warning("JSON encoder %r unavailable (%s); using stdlib json", name, e)
+        return StdlibEncoder()
+
+class FlaskJSONEncoder(JSONEncoder):
+    """Flask's own encoder taught the same types, for anything still using flask.jsonify"""
+    
+    def default(self, o):
+        try:
+            return encode_value(o)
+        except TypeError:
+            return super().default(o)
+
+# Global response encoder instance
+response_encoder = create_encoder(Config.JSON_ENCODER)
+
+def jsonify(*args, **kwargs):
+    """Drop-in for flask.jsonify that serializes with the configured response encoder"""
+    if args and kwargs:
+        raise TypeError("jsonify() behavior undefined when passed both args and kwargs")
+    data = args[0] if len(args) == 1 else (args or kwargs)
+    return current_app.response_class(response_encoder.dumps(data) + b'\n',
+                                      mimetype='application/json')
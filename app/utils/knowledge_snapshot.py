@@ -0,0 +1,163 @@
+import mmap
+import os
+import struct
+import time
+import numpy as np
+
+# File layout: header, section table, then 64-byte aligned little-endian arrays
+MAGIC = b'KBSNAP\x00\x00'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sHHIdI')     # magic, version, reserved, dimensions, built_at, sections
+SECTION = struct.Struct('<16sQQ')      # name, offset, length in bytes
+ALIGNMENT = 64
+
+SECTION_TYPES = {
+    'ids': np.int64,
+    'subject_codes': np.uint16,
+    'subjects': np.uint8,
+    'term_offsets': np.uint64,
+    'term_blob': np.uint8,
+    'columns': np.int32,
+    'signs': np.int8,
+    'idf': np.float32,
+    'postings_offsets': np.uint64,
+    'postings': np.int32,
+    'matrix': np.float32,
+    'revision': np.int64
+}
+OPTIONAL_SECTIONS = {'matrix', 'revision'}
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file is missing, truncated or from another format version"""
+
+class TermDictionary:
+    """Sorted term list stored as one UTF-8 blob plus offsets, searched in place"""
+    
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    def __iter__(self):
+        for term_id in range(len(self)):
+            yield self.term(term_id).decode('utf-8')
+    
+    def term(self, term_id):
+        return self.blob[int(self.offsets[term_id]):int(self.offsets[term_id + 1])].tobytes()
+    
+    def get(self, token, default=None):
+        """Binary search for a term's id"""
+        key = token.encode('utf-8')
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.term(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self) and self.term(low) == key:
+            return low
+        return default
+
+def write_snapshot(path, data, include_matrix=True):
+    """Write index data to path atomically; readers see either the old or the new file"""
+    terms = sorted(data.terms, key=data.terms.get)
+    encoded = [term.encode('utf-8') for term in terms]
+    term_offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    term_offsets[1:] = np.cumsum([len(term) for term in encoded])
+    
+    sections = {
+        'ids': data.ids,
+        'subject_codes': data.subject_codes,
+        'subjects': np.frombuffer('\n'.join(data.subjects).encode('utf-8'), dtype=np.uint8),
+        'term_offsets': term_offsets,
+        'term_blob': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+        'columns': data.columns,
+        'signs': data.signs,
+        'idf': data.idf,
+        'postings_offsets': data.postings_offsets,
+        'postings': data.postings
+    }
+    if include_matrix and data.matrix is not None:
+        sections['matrix'] = data.matrix
+    if data.revision is not None:
+        sections['revision'] = np.array([data.revision])
+    
+    # Lay out sections after the header and section table
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for name, values in sections.items():
+        offset += -offset % ALIGNMENT
+        values = np.ascontiguousarray(values, dtype=SECTION_TYPES[name])
+        sections[name] = values
+        table.append((name, offset, values.nbytes))
+        offset += values.nbytes
+    
+    temp_path = f"{path}.tmp-{os.getpid()}"
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, data.dimensions, time.time(), len(table)))
+        for name, section_offset, length in table:
+            f.write(SECTION.pack(name.encode('ascii'), section_offset, length))
+        for name, section_offset, length in table:
+            f.write(b'\x00' * (section_offset - f.tell()))
+            f.write(sections[name].tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return offset
+
+class KnowledgeSnapshot:
+    """Read-only, memory-mapped view of a snapshot written by write_snapshot.
+    
+    Arrays are zero-copy views into the mapping, so every worker that opens
+    the same file shares its pages through the OS page cache. The mapping
+    stays open for as long as any array from it is referenced.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        if len(self.buffer) < HEADER.size:
+            raise SnapshotError(f"{path} is too short to be a knowledge snapshot")
+        magic, version, _, self.dimensions, self.built_at, count = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} is not a knowledge snapshot")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+        
+        arrays = {}
+        for i in range(count):
+            name, offset, length = SECTION.unpack_from(self.buffer, HEADER.size + i * SECTION.size)
+            name = name.rstrip(b'\x00').decode('ascii')
+            if name not in SECTION_TYPES:
+                continue
+            if offset + length > len(self.buffer):
+                raise SnapshotError(f"{path} is truncated (section {name})")
+            dtype = np.dtype(SECTION_TYPES[name])
+            arrays[name] = np.frombuffer(self.buffer, dtype=dtype, count=length // dtype.itemsize,
+                                         offset=offset)
+        
+        missing = set(SECTION_TYPES) - set(arrays) - OPTIONAL_SECTIONS
+        if missing:
+            raise SnapshotError(f"{path} is missing sections: {', '.join(sorted(missing))}")
+        
+        self.ids = arrays['ids']
+        self.subject_codes = arrays['subject_codes']
+        subjects = arrays['subjects'].tobytes().decode('utf-8')
+        self.subjects = subjects.split('\n') if subjects or len(self.ids) else []
+        self.subject_lookup = {subject: code for code, subject in enumerate(self.subjects)}
+        self.terms = TermDictionary(arrays['term_blob'], arrays['term_offsets'])
+        self.columns = arrays['columns']
+        self.signs = arrays['signs']
+        self.idf = arrays['idf']
+        self.postings_offsets = arrays['postings_offsets']
+        self.postings = arrays['postings']
+        self.matrix = arrays.get('matrix')
+        if self.matrix is not None:
+            self.matrix = self.matrix.reshape(len(self.ids), self.dimensions)
+        # Change feed revision the snapshot was built at (older snapshots don't record one)
+        self.revision = int(arrays['revision'][0]) if 'revision' in arrays else None
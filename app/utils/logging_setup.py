@@ -0,0 +1,159 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+# Request details attached to every record logged while handling the request
+request_context = contextvars.ContextVar('request_context', default=None)
+
+# Record attributes that belong to the logging machinery, not to the caller's extra={...}
+STANDARD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class ContextFilter(logging.Filter):
+    """Copy the current request context onto records while still on the calling thread"""
+    
+    def filter(self, record):
+        context = request_context.get()
+        if context:
+            for key, value in context.items():
+                if not hasattr(record, key):
+                    setattr(record, key, value)
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of records below WARNING from noisy loggers.
+    
+    Rates are matched on logger name prefixes, longest first, so
+    ``{'app.utils.db': 0.1}`` keeps one in ten DEBUG/INFO records from the
+    database layer. Warnings and errors are never dropped.
+    """
+    
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self.cache = {}
+    
+    def rate(self, name):
+        rate = self.cache.get(name)
+        if rate is None:
+            rate = next((rate for prefix, rate in self.rates
+                         if name == prefix or name.startswith(prefix + '.')), 1.0)
+            self.cache[name] = rate
+        return rate
+    
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue records as they are; message formatting happens on the listener thread.
+    
+    The stock QueueHandler formats every record before queueing it so it
+    can be pickled, which puts the formatting cost back on the caller.
+    Records here never leave the process.
+    """
+    
+    def prepare(self, record):
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the message, request context and any extra fields"""
+    
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+def parse_sample_rates(value):
+    """Parse "app.utils.db=0.1,app.access=0.5" into {'app.utils.db': 0.1, 'app.access': 0.5}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        name, _, rate = item.partition('=')
+        rates[name.strip()] = float(rate)
+    return rates
+
+class LoggingPipeline:
+    """Root logger wiring: callers only enqueue, a listener thread does formatting and I/O"""
+    
+    def __init__(self):
+        self.listener = None
+        self.handlers = []
+        self.lock = threading.Lock()
+    
+    def configure(self, level='INFO', log_format='json', log_file='', sample_rates=''):
+        """Install the pipeline on the root logger (idempotent)"""
+        with self.lock:
+            if self.listener is not None:
+                return
+            
+            formatter = JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT)
+            self.handlers = [logging.StreamHandler(sys.stderr)]
+            if log_file:
+                self.handlers.append(logging.handlers.WatchedFileHandler(log_file, encoding='utf-8'))
+            for handler in self.handlers:
+                handler.setFormatter(formatter)
+            
+            records = queue.SimpleQueue()
+            queue_handler = DeferredQueueHandler(records)
+            queue_handler.addFilter(SamplingFilter(parse_sample_rates(sample_rates)))
+            queue_handler.addFilter(ContextFilter())
+            
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(queue_handler)
+            root.setLevel(level.upper() if isinstance(level, str) else level)
+            
+            self.queue_handler = queue_handler
+            self.listener = logging.handlers.QueueListener(records, *self.handlers,
+                                                           respect_handler_level=True)
+            self.listener.start()
+            atexit.register(self.stop)
+    
+    def stop(self):
+        """Flush queued records and stop the listener thread"""
+        with self.lock:
+            if self.listener is not None and self.listener._thread is not None:
+                self.listener.stop()
+    
+    def _after_fork(self):
+        """The listener thread doesn't survive fork; start a new one in the child"""
+        self.lock = threading.Lock()
+        if self.listener is not None:
+            self.listener._thread = None
+            self.listener.start()
+
+# Global logging pipeline instance
+logging_pipeline = LoggingPipeline()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=logging_pipeline._after_fork)
+
+def setup_logging(config):
+    """Configure application logging from a Config class"""
+    logging_pipeline.configure(
+        level=config.LOG_LEVEL,
+        log_format=config.LOG_FORMAT,
+        log_file=config.LOG_FILE,
+        sample_rates=config.LOG_SAMPLE_RATES
+    )
@@ -0,0 +1,190 @@
+import random
+import time
+from contextlib import contextmanager
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(label_names, label_values, extra=None):
+    """Format a label set for the text exposition format"""
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter.
+    
+    Updates are plain dict operations with no lock; under the GIL a lost
+    increment is possible but rare, which is acceptable for monitoring.
+    """
+    
+    type_name = 'counter'
+    
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values = {}
+    
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        self.values[key] = self.values.get(key, 0) + amount
+    
+    def get(self, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        return self.values.get(key, 0)
+    
+    def samples(self):
+        for key, value in list(self.values.items()):
+            yield self.name, _format_labels(self.label_names, key), value
+
+class Gauge:
+    """Value that can go up and down, or be read from a callback at scrape time"""
+    
+    type_name = 'gauge'
+    
+    def __init__(self, name, documentation, label_names=(), callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.callback = callback
+        self.values = {}
+    
+    def set(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        self.values[key] = value
+    
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        self.values[key] = self.values.get(key, 0) + amount
+    
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+    
+    def samples(self):
+        if self.callback:
+            values = self.callback()
+            # Callbacks may return a bare number or a {label_values: value} dict
+            if not isinstance(values, dict):
+                values = {(): values}
+        else:
+            values = dict(self.values)
+        for key, value in values.items():
+            yield self.name, _format_labels(self.label_names, key), value
+
+class Histogram:
+    """Bucketed latency histogram with optional sampling.
+    
+    With sample_rate below 1 only that fraction of observations is recorded,
+    each weighted by 1 / sample_rate so counts and sums stay unbiased. A
+    sample_rate of 0 records nothing.
+    """
+    
+    type_name = 'histogram'
+    
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS,
+                 sample_rate=1.0):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"Histogram sample rate must be between 0 and 1, not {sample_rate}")
+        self.sample_rate = sample_rate
+        self.weight = 1.0 / sample_rate if sample_rate else 0.0
+        self.series = {}
+    
+    def observe(self, value, **labels):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        series = self.series.get(key)
+        if series is None:
+            # [bucket counts..., +Inf count, sum]
+            series = self.series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += self.weight
+                break
+        else:
+            series[len(self.buckets)] += self.weight
+        series[-1] += value * self.weight
+    
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+    
+    def samples(self):
+        for key, series in list(self.series.items()):
+            cumulative = 0.0
+            for i, bound in enumerate(self.buckets + (float('inf'),)):
+                cumulative += series[i]
+                labels = _format_labels(self.label_names, key, ('le', _format_value(bound)))
+                yield self.name + '_bucket', labels, cumulative
+            labels = _format_labels(self.label_names, key)
+            yield self.name + '_count', labels, cumulative
+            yield self.name + '_sum', labels, series[-1]
+
+class MetricsRegistry:
+    """Registry of metrics rendered in the Prometheus text exposition format"""
+    
+    def __init__(self):
+        self.metrics = {}
+    
+    def _get_or_create(self, cls, name, documentation, **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics.setdefault(name, cls(name, documentation, **kwargs))
+        return metric
+    
+    def counter(self, name, documentation, label_names=()):
+        return self._get_or_create(Counter, name, documentation, label_names=label_names)
+    
+    def gauge(self, name, documentation, label_names=(), callback=None):
+        return self._get_or_create(Gauge, name, documentation, label_names=label_names,
+                                   callback=callback)
+    
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS,
+                  sample_rate=1.0):
+        return self._get_or_create(Histogram, name, documentation, label_names=label_names,
+                                   buckets=buckets, sample_rate=sample_rate)
+    
+    def render(self):
+        """Render all metrics as text exposition format"""
+        lines = []
+        for name in sorted(self.metrics):
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+            try:
+                for sample_name, labels, value in metric.samples():
+                    lines.append(f"{sample_name}{labels} {_format_value(value)}")
+            except Exception as e:
+                lines.append(f"# error collecting {name}: {e}")
+        return '\n'.join(lines) + '\n'
+
+# Content type for the /metrics endpoint
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Global metrics registry instance
+metrics = MetricsRegistry()
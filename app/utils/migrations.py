@@ -0,0 +1,114 @@
+import re
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns added to tables that existed before them; CREATE TABLE IF NOT EXISTS
+# leaves existing tables alone, so databases created earlier need these added
+COLUMNS = [
+    # (table, column, MySQL definition, SQLite definition)
+    ('knowledge_base', 'revision', 'BIGINT DEFAULT 0', 'INTEGER DEFAULT 0'),
+    ('user_profiles', 'version', 'INT NOT NULL DEFAULT 0', 'INTEGER NOT NULL DEFAULT 0'),
+]
+
+CREATE_INDEX = re.compile(r"CREATE\s+INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s+ON\s+(\w+)", re.IGNORECASE)
+CREATE_OBJECT = re.compile(r"CREATE\s+(?:VIRTUAL\s+)?(?:TABLE|TRIGGER)\s+IF\s+NOT\s+EXISTS\s+(\w+)",
+                           re.IGNORECASE)
+
+def schema_statements(path):
+    """The statements in a schema file, one string each (trigger bodies kept whole)"""
+    statement = ''
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not statement and (not line.strip() or line.lstrip().startswith('--')):
+                continue
+            statement += line
+            if sqlite3.complete_statement(statement):
+                yield statement.strip()
+                statement = ''
+
+def existing_objects(backend, cursor):
+    """Names of the tables (and, on SQLite, triggers) in the database"""
+    if backend.name == 'sqlite':
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+    else:
+        cursor.execute("SELECT TABLE_NAME AS name FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()")
+    return {row['name'] for row in cursor.fetchall()}
+
+def table_columns(backend, cursor, table):
+    if backend.name == 'sqlite':
+        cursor.execute(f'PRAGMA table_info("{table}")')
+    else:
+        cursor.execute("""
+            SELECT COLUMN_NAME AS name FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (table,))
+    return {row['name'] for row in cursor.fetchall()}
+
+def table_indexes(backend, cursor, table):
+    if backend.name == 'sqlite':
+        cursor.execute(f'PRAGMA index_list("{table}")')
+    else:
+        cursor.execute("""
+            SELECT DISTINCT INDEX_NAME AS name FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (table,))
+    return {row['name'] for row in cursor.fetchall()}
+
+def plan(backend, cursor):
+    """(description, statement) for each change the database is missing, in the order to apply them.
+    
+    Tables and triggers come from the backend's schema file, then the
+    columns in COLUMNS, then the schema file's indexes (which may cover the
+    new columns). Sample data in the schema file is never re-inserted.
+    """
+    statements = list(schema_statements(backend.schema_file))
+    existing = existing_objects(backend, cursor)
+    steps = []
+    
+    for statement in statements:
+        match = CREATE_OBJECT.match(statement)
+        if match and match.group(1) not in existing:
+            steps.append((f"create {match.group(1)}", statement))
+    
+    for table, column, mysql_definition, sqlite_definition in COLUMNS:
+        # Tables created above already have their columns
+        if table in existing and column not in table_columns(backend, cursor, table):
+            definition = sqlite_definition if backend.name == 'sqlite' else mysql_definition
+            steps.append((f"add {table}.{column}",
+                          f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+    
+    for statement in statements:
+        match = CREATE_INDEX.match(statement)
+        if match:
+            name, table = match.groups()
+            if table not in existing or name not in table_indexes(backend, cursor, table):
+                steps.append((f"add index {name}", statement))
+    return steps
+
+def pending(backend):
+    """Descriptions of the changes the database is missing"""
+    with backend.connect().cursor() as cursor:
+        return [description for description, _ in plan(backend, cursor)]
+
+def migrate(backend):
+    """Bring a database created from an older schema up to date.
+    
+    Returns (applied, failed) lists of step descriptions. Every step is
+    skipped when already applied, so this is safe to run after each upgrade
+    and on a database that is already current; a failed step doesn't stop
+    the ones after it.
+    """
+    applied, failed = [], []
+    with backend.connect().cursor() as cursor:
+        for description, statement in plan(backend, cursor):
+            try:
+                cursor.execute(statement)
+            except Exception as e:
+                logger.error("Migration step failed (%s): %s", description, e)
+                failed.append(description)
+                continue
+            logger.info("Migration: %s", description)
+            applied.append(description)
+    return applied, failed
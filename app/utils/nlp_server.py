@@ -0,0 +1,244 @@
+import json
+import os
+import queue
+import signal
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from app.utils.metrics import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Every frame is a 4-byte big-endian body length followed by the body
+HEADER = struct.Struct('!I')
+
+# Largest body either side accepts
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+# NLP server client metrics
+server_requests = metrics.counter(
+    'nlp_server_requests_total', 'Parse requests sent to the NLP server', ('outcome',)
+)
+server_duration = metrics.histogram(
+    'nlp_server_request_duration_seconds', 'Round trip of a parse request to the NLP server'
+)
+
+class NLPServerError(Exception):
+    """The NLP server could not be reached or sent a bad reply"""
+
+def encode(value):
+    return orjson.dumps(value) if orjson else json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+def decode(body):
+    return orjson.loads(body) if orjson else json.loads(body)
+
+def send_frame(sock, body):
+    sock.sendall(HEADER.pack(len(body)) + body)
+
+def recv_exactly(sock, size):
+    """size bytes from sock, or b'' if the peer closed the connection before sending any"""
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            if buffer:
+                raise ConnectionError("Connection closed mid-frame")
+            return b''
+        buffer += chunk
+    return bytes(buffer)
+
+def recv_frame(sock):
+    """The next frame's body, or None if the peer closed the connection between frames"""
+    header = recv_exactly(sock, HEADER.size)
+    if not header:
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {size} bytes is over the {MAX_FRAME_BYTES} byte limit")
+    body = recv_exactly(sock, size)
+    if len(body) < size:
+        raise ConnectionError("Connection closed mid-frame")
+    return body
+
+class NLPServer:
+    """Parses messages for NLPService clients on a Unix-domain socket.
+    
+    The parent process loads spaCy once, binds the socket and forks
+    workers, which share the model's memory and accept connections from
+    the same listening socket. Each connection gets a thread; its requests
+    (lists of messages) are queued, and a batcher thread takes whatever
+    arrives within batch_window_ms, up to max_batch messages, and parses
+    it all with one NLPService.parse (nlp.pipe) call. Replies are
+    [keywords, entities] per message, in request order.
+    """
+    
+    def __init__(self, path, service, workers=2, batch_window_ms=3, max_batch=64):
+        self.path = path
+        self.service = service
+        self.workers = workers
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self.requests = queue.Queue()
+        self.children = set()
+        self.stopping = False
+    
+    def serve_forever(self):
+        """Bind the socket and keep workers running until SIGTERM or SIGINT"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        listener.listen(128)
+        
+        def stop(signum, frame):
+            self.stopping = True
+            for pid in list(self.children):
+                os.kill(pid, signal.SIGTERM)
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        
+        try:
+            for _ in range(self.workers):
+                self.spawn(listener)
+            while self.children:
+                try:
+                    pid, status = os.wait()
+                except ChildProcessError:
+                    break
+                except InterruptedError:
+                    continue
+                self.children.discard(pid)
+                if not self.stopping:
+                    logger.error("NLP worker %s exited with status %s; starting another", pid, status)
+                    self.spawn(listener)
+        finally:
+            listener.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+    
+    def spawn(self, listener):
+        pid = os.fork()
+        if pid:
+            self.children.add(pid)
+            return
+        
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            self.run_worker(listener)
+        finally:
+            os._exit(0)
+    
+    def run_worker(self, listener):
+        """Accept connections and feed their requests to the batcher"""
+        threading.Thread(target=self.batch_loop, daemon=True).start()
+        logger.info("NLP worker %s serving %s", os.getpid(), self.path)
+        while True:
+            connection, _ = listener.accept()
+            threading.Thread(target=self.handle, args=(connection,), daemon=True).start()
+    
+    def handle(self, connection):
+        """Answer one client's requests in order until it disconnects"""
+        try:
+            with connection:
+                while True:
+                    body = recv_frame(connection)
+                    if body is None:
+                        return
+                    texts = decode(body)
+                    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                        raise ValueError("Request is not a list of messages")
+                    reply = Future()
+                    self.requests.put((texts, reply))
+                    send_frame(connection, encode(reply.result()))
+        except Exception as e:
+            logger.warning("NLP client connection dropped: %s", e)
+    
+    def batch_loop(self):
+        """Parse queued requests together, waiting up to batch_window for a batch to fill"""
+        while True:
+            batch = [self.requests.get()]
+            count = len(batch[0][0])
+            deadline = time.monotonic() + self.batch_window
+            while count < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                count += len(request[0])
+            
+            texts = [text for request, _ in batch for text in request]
+            try:
+                results = self.service.parse(texts)
+            except Exception as e:
+                logger.error("Error parsing a batch of %s messages: %s", len(texts), e)
+                for _, reply in batch:
+                    reply.set_exception(e)
+                continue
+            
+            start = 0
+            for request, reply in batch:
+                reply.set_result(results[start:start + len(request)])
+                start += len(request)
+            logger.debug("Parsed %s messages from %s requests", len(texts), len(batch))
+
+class NLPClient:
+    """Sends parse requests to an NLPServer over one persistent connection per thread"""
+    
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+    
+    def connection(self):
+        sock = getattr(self.local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self.local.sock = sock
+        return sock
+    
+    def close(self):
+        sock = getattr(self.local, 'sock', None)
+        self.local.sock = None
+        if sock is not None:
+            sock.close()
+    
+    def parse(self, texts):
+        """[keywords, entities] for each text; raises NLPServerError if the server can't answer"""
+        started = time.perf_counter()
+        # A connection the server has since closed fails on first use, so retry once on a new one
+        for attempt in range(2):
+            try:
+                sock = self.connection()
+                send_frame(sock, encode(list(texts)))
+                body = recv_frame(sock)
+                if body is None:
+                    raise ConnectionError("Connection closed")
+                results = decode(body)
+                server_requests.inc(outcome='ok')
+                server_duration.observe(time.perf_counter() - started)
+                return results
+            except (OSError, ValueError) as e:
+                self.close()
+                # A timeout means the server is busy or stuck; another try would only wait again
+                if attempt or isinstance(e, socket.timeout):
+                    server_requests.inc(outcome='error')
+                    raise NLPServerError(f"NLP server at {self.path} unavailable: {e}") from e
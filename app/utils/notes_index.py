@@ -0,0 +1,260 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from app.utils.db import db_manager
+from app.utils.metrics import metrics
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Matches in a note's topic count more than matches in its body
+FIELD_WEIGHTS = (('topic', 3.0), ('subject', 2.0), ('note_content', 1.0))
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Rough per-item memory costs used for the LRU budget
+POSTING_BYTES = 120
+TERM_BYTES = 160
+NOTE_BYTES = 200
+
+# Notes index metrics
+index_builds = metrics.counter('notes_index_builds_total', 'Per-user notes indexes built from the database')
+index_evictions = metrics.counter('notes_index_evictions_total', 'Per-user notes indexes evicted for memory')
+
+def tokenize(text):
+    return re.findall(r'\w+', (text or '').lower())
+
+def parse_query(query):
+    """Parse "a b OR c*" into [[('a', False), ('b', False)], [('c', True)]]: OR of ANDed terms, True = prefix"""
+    groups = []
+    for part in re.split(r'\s+OR\s+', query.strip()):
+        terms = []
+        for word in part.split():
+            prefix = word.endswith('*')
+            terms.extend((token, prefix) for token in tokenize(word))
+        if terms:
+            groups.append(terms)
+    return groups
+
+class UserNotesIndex:
+    """Inverted index over one user's notes with field-weighted BM25 ranking"""
+    
+    def __init__(self):
+        self.postings = {}
+        self.terms = []
+        self.documents = {}
+        self.lengths = {}
+        self.updated = {}
+        self.total_length = 0.0
+        self.postings_count = 0
+        self.version = None
+    
+    def size(self):
+        return (self.postings_count * POSTING_BYTES + len(self.postings) * TERM_BYTES
+                + len(self.documents) * NOTE_BYTES)
+    
+    def add(self, note):
+        """Index a note row (dict with id, subject, topic, note_content, updated_at), replacing any older copy"""
+        self.remove(note['id'])
+        frequencies = Counter()
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(note.get(field)):
+                frequencies[token] += weight
+        
+        for token, frequency in frequencies.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                bisect.insort(self.terms, token)
+            postings[note['id']] = frequency
+        self.documents[note['id']] = frequencies
+        self.lengths[note['id']] = sum(frequencies.values())
+        self.updated[note['id']] = note.get('updated_at')
+        self.total_length += self.lengths[note['id']]
+        self.postings_count += len(frequencies)
+    
+    def remove(self, note_id):
+        frequencies = self.documents.pop(note_id, None)
+        if frequencies is None:
+            return
+        self.updated.pop(note_id, None)
+        self.total_length -= self.lengths.pop(note_id)
+        for token in frequencies:
+            postings = self.postings[token]
+            del postings[note_id]
+            if not postings:
+                del self.postings[token]
+                del self.terms[bisect.bisect_left(self.terms, token)]
+        self.postings_count -= len(frequencies)
+    
+    def expand(self, token, prefix):
+        """Index terms a query term matches"""
+        if not prefix:
+            return [token] if token in self.postings else []
+        start = bisect.bisect_left(self.terms, token)
+        end = bisect.bisect_left(self.terms, token + '\uffff', start)
+        return self.terms[start:end]
+    
+    def term_scores(self, token, prefix):
+        """{note_id: score} for one query term; a prefix term scores each note by its best expansion"""
+        count = len(self.documents)
+        average = self.total_length / count if count else 1.0
+        scores = {}
+        for term in self.expand(token, prefix):
+            postings = self.postings[term]
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for note_id, frequency in postings.items():
+                length = self.lengths[note_id]
+                score = idf * frequency * (K1 + 1) / (frequency + K1 * (1 - B + B * length / average))
+                if score > scores.get(note_id, 0.0):
+                    scores[note_id] = score
+        return scores
+    
+    def search(self, query, limit=20):
+        """Note ids matching the query, best first (most recently updated first on ties)"""
+        totals = {}
+        for group in parse_query(query):
+            # Intersect from the rarest term so AND queries touch as few notes as possible
+            term_scores = sorted((self.term_scores(token, prefix) for token, prefix in group), key=len)
+            matches = dict(term_scores[0])
+            for scores in term_scores[1:]:
+                matches = {note_id: score + scores[note_id]
+                           for note_id, score in matches.items() if note_id in scores}
+                if not matches:
+                    break
+            for note_id, score in matches.items():
+                if score > totals.get(note_id, 0.0):
+                    totals[note_id] = score
+        
+        ranked = heapq.nlargest(limit, totals.items(),
+                                key=lambda item: (item[1], str(self.updated.get(item[0]) or '')))
+        return [note_id for note_id, _ in ranked]
+
+class NotesIndexCache:
+    """Per-user notes indexes, built on a user's first search and kept in step with saves.
+    
+    Each search compares the user's note count and latest updated_at with
+    the index (one indexed query) and re-reads only notes updated since, so
+    edits made by other workers are picked up. Indexes are evicted least
+    recently used first once their estimated size passes NOTES_INDEX_MEMORY_MB.
+    """
+    
+    def __init__(self, memory_budget=None):
+        self.memory_budget = memory_budget or Config.NOTES_INDEX_MEMORY_MB * 1024 * 1024
+        self.indexes = OrderedDict()
+        self.lock = threading.RLock()
+        self.total_bytes = 0
+    
+    def current_version(self, user_id):
+        result = db_manager.execute_single_query("""
+            SELECT COUNT(*) AS total, MAX(updated_at) AS updated_at
+            FROM user_notes
+            WHERE user_id = %s
+        """, (user_id,))
+        if result is None:
+            return None
+        return result['total'], str(result['updated_at'] or '')
+    
+    def load_notes(self, user_id, since=None):
+        query = """
+            SELECT id, subject, topic, note_content, updated_at FROM user_notes
+            WHERE user_id = %s
+        """
+        params = (user_id,)
+        if since:
+            query += " AND updated_at >= %s"
+            params = (user_id, since)
+        return db_manager.execute_query(query, params)
+    
+    def get_index(self, user_id):
+        """The user's index brought up to date with the database, or None if it can't be read"""
+        version = self.current_version(user_id)
+        if version is None:
+            return None
+        
+        with self.lock:
+            index = self.indexes.get(user_id)
+            if index is not None:
+                self.indexes.move_to_end(user_id)
+                if index.version == version:
+                    return index
+        
+        # Catch up on notes edited elsewhere; rebuild if the count still disagrees
+        if index is not None:
+            notes = self.load_notes(user_id, since=index.version[1])
+            if notes is not None:
+                with self.lock:
+                    if self.indexes.get(user_id) is index:
+                        self.apply(user_id, index, notes)
+                        if len(index.documents) == version[0]:
+                            index.version = version
+                            return index
+        
+        notes = self.load_notes(user_id)
+        if notes is None:
+            return None
+        index = UserNotesIndex()
+        for note in notes:
+            index.add(note)
+        index.version = version
+        index_builds.inc()
+        
+        with self.lock:
+            previous = self.indexes.pop(user_id, None)
+            if previous is not None:
+                self.total_bytes -= previous.size()
+            self.indexes[user_id] = index
+            self.total_bytes += index.size()
+            self.evict(keep=user_id)
+        return index
+    
+    def apply(self, user_id, index, notes):
+        """Add notes to a cached index and re-account it against the memory budget"""
+        previous = index.size()
+        for note in notes:
+            index.add(note)
+        self.total_bytes += index.size() - previous
+        self.evict(keep=user_id)
+    
+    def evict(self, keep=None):
+        """Drop least recently used indexes (other than keep) until within the memory budget"""
+        for user_id in list(self.indexes):
+            if self.total_bytes <= self.memory_budget:
+                break
+            if user_id != keep:
+                self.total_bytes -= self.indexes.pop(user_id).size()
+                index_evictions.inc()
+    
+    def search(self, user_id, query, limit=20):
+        """Ranked note ids for a query, or None if the notes can't be read"""
+        index = self.get_index(user_id)
+        if index is None:
+            return None
+        with self.lock:
+            return index.search(query, limit)
+    
+    def note_saved(self, note):
+        """Update the user's index, if loaded, right after a note is written"""
+        with self.lock:
+            index = self.indexes.get(note.user_id)
+            if index is None:
+                return
+            self.apply(note.user_id, index, [{
+                'id': note.id,
+                'subject': note.subject,
+                'topic': note.topic,
+                'note_content': note.note_content,
+                'updated_at': note.updated_at
+            }])
+
+# Global notes index cache instance
+notes_index = NotesIndexCache()
+
+metrics.gauge('notes_index_bytes', 'Estimated memory held by per-user notes indexes',
+              callback=lambda: notes_index.total_bytes)
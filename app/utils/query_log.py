@@ -0,0 +1,193 @@
+import queue
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from app.utils.metrics import metrics
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Statements the database can explain
+EXPLAINABLE = re.compile(r'^\s*(SELECT|WITH|UPDATE|DELETE|INSERT)\b', re.IGNORECASE)
+
+# Recent durations kept per fingerprint for percentiles
+SAMPLE_SIZE = 256
+
+# Orders accepted by QueryLog.top
+ORDERS = ('total', 'p95', 'count', 'slow', 'rows')
+
+# Slow statements waiting for their plan; more are dropped until the explain thread catches up
+EXPLAIN_QUEUE_SIZE = 32
+
+slow_queries = metrics.counter(
+    'db_slow_queries_total', 'Database statements slower than SLOW_QUERY_MS'
+)
+explains_dropped = metrics.counter(
+    'db_slow_query_explains_dropped_total', 'Slow statement plans skipped because the explain queue was full'
+)
+
+@lru_cache(maxsize=2048)
+def fingerprint(query):
+    """Normalize a statement so calls differing only in values, IN-list length or spacing group together"""
+    query = re.sub(r'--[^\n]*|/\*.*?\*/', ' ', query, flags=re.DOTALL)
+    query = re.sub(r"'(?:[^'\\]|\\.|'')*'", '?', query)
+    query = re.sub(r'%s|\b\d+(?:\.\d+)?\b', '?', query)
+    query = re.sub(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', 'IN (...)', query, flags=re.IGNORECASE)
+    return ' '.join(query.split())
+
+class QueryStats:
+    """Aggregate timings for one statement fingerprint"""
+    
+    __slots__ = ('fingerprint', 'count', 'errors', 'slow', 'rows', 'total_seconds',
+                 'max_seconds', 'samples', 'plan', 'explained_at')
+    
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.errors = 0
+        self.slow = 0
+        self.rows = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+        self.plan = None
+        self.explained_at = None
+    
+    def p95(self):
+        """95th percentile of the recent durations"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    
+    def to_dict(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'count': self.count,
+            'errors': self.errors,
+            'slow': self.slow,
+            'rows': self.rows,
+            'total_ms': round(self.total_seconds * 1000, 3),
+            'mean_ms': round(self.total_seconds * 1000 / self.count, 3) if self.count else 0.0,
+            'p95_ms': round(self.p95() * 1000, 3),
+            'max_ms': round(self.max_seconds * 1000, 3),
+            'plan': self.plan
+        }
+
+class QueryLog:
+    """Per-fingerprint statement statistics with EXPLAIN plans captured for slow statements.
+    
+    Every statement run through DatabaseManager is recorded under its
+    fingerprint. A statement slower than SLOW_QUERY_MS is logged as a
+    warning, and at most once per SLOW_QUERY_EXPLAIN_SECONDS per
+    fingerprint it is explained with the parameters of the slow call; the
+    latest plan is kept with the fingerprint's stats. Plans are captured by
+    a background thread, so the request that ran the slow statement never
+    waits on EXPLAIN. Only fingerprints are kept, never parameter values
+    (which are held just until their statement is explained).
+    """
+    
+    def __init__(self, threshold_ms=None, explain_seconds=None, max_fingerprints=None):
+        self.threshold = (Config.SLOW_QUERY_MS if threshold_ms is None else threshold_ms) / 1000
+        self.explain_seconds = (Config.SLOW_QUERY_EXPLAIN_SECONDS if explain_seconds is None
+                                else explain_seconds)
+        self.max_fingerprints = max_fingerprints or Config.QUERY_LOG_MAX_FINGERPRINTS
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.pending = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+        self.thread = None
+    
+    def record(self, query, params, seconds, rows, explain=None):
+        """Account one statement; rows is None if it failed. explain(query, params) returns a plan"""
+        key = fingerprint(query)
+        now = time.monotonic()
+        with self.lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.add(key)
+            stats.count += 1
+            stats.total_seconds += seconds
+            stats.samples.append(seconds)
+            if seconds > stats.max_seconds:
+                stats.max_seconds = seconds
+            if rows is None:
+                stats.errors += 1
+            else:
+                stats.rows += rows
+            
+            slow = seconds >= self.threshold
+            capture = (slow and explain is not None and rows is not None
+                       and EXPLAINABLE.match(query) is not None
+                       and (stats.explained_at is None or now - stats.explained_at >= self.explain_seconds))
+            if slow:
+                stats.slow += 1
+            if capture:
+                stats.explained_at = now
+        
+        if not slow:
+            return
+        slow_queries.inc()
+        if capture:
+            self.schedule(stats, query, params, explain)
+        logger.warning("Slow query took %.1f ms: %s", seconds * 1000, key, extra={
+            'duration_ms': round(seconds * 1000, 1),
+            'rows': rows,
+            'plan': stats.plan
+        })
+    
+    def schedule(self, stats, query, params, explain):
+        """Queue a slow statement for the explain thread, starting it on first use (and after a fork)"""
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='slow-query-explain', daemon=True)
+                self.thread.start()
+        try:
+            self.pending.put_nowait((stats, query, params, explain))
+        except queue.Full:
+            explains_dropped.inc()
+            # Let the next slow call of this fingerprint try again
+            with self.lock:
+                stats.explained_at = None
+    
+    def _run(self):
+        while True:
+            stats, query, params, explain = self.pending.get()
+            try:
+                plan = explain(query, params)
+            except Exception as e:
+                logger.error("Explain error: %s", e)
+                plan = None
+            if plan is not None:
+                with self.lock:
+                    stats.plan = plan
+            self.pending.task_done()
+    
+    def add(self, key):
+        """Start stats for a new fingerprint, dropping the one with the least total time if full"""
+        if len(self.stats) >= self.max_fingerprints:
+            del self.stats[min(self.stats, key=lambda existing: self.stats[existing].total_seconds)]
+        stats = self.stats[key] = QueryStats(key)
+        return stats
+    
+    def top(self, limit=20, order='total'):
+        """The worst fingerprints as dicts, by total time, p95, call count, slow calls or rows"""
+        sort_keys = {
+            'total': lambda stats: stats.total_seconds,
+            'p95': QueryStats.p95,
+            'count': lambda stats: stats.count,
+            'slow': lambda stats: stats.slow,
+            'rows': lambda stats: stats.rows
+        }
+        with self.lock:
+            ranked = sorted(self.stats.values(), key=sort_keys[order], reverse=True)[:limit]
+            return [stats.to_dict() for stats in ranked]
+    
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+
+# Global query log instance
+query_log = QueryLog()
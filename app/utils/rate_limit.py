@@ -0,0 +1,213 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import request, session
+from app.utils.db import db_manager, DatabaseUnavailableError
+from app.utils.metrics import metrics
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Endpoints that are never limited: health checks and scrapes must answer under load, and the
+# long-lived chat socket would hold a load-shedding slot for hours (its messages are limited one by one)
+EXEMPT_ENDPOINTS = {'static', 'health_check', 'metrics_endpoint', 'query_stats', 'chat_socket'}
+
+# Endpoints also limited per username tried, however many addresses the attempts come from
+USERNAME_ENDPOINTS = {'auth.login'}
+
+# Rate limiting and load shedding metrics
+rate_limited_total = metrics.counter(
+    'http_rate_limited_total', 'Requests rejected with 429 by per-client rate limits', ('endpoint',)
+)
+shed_total = metrics.counter(
+    'http_requests_shed_total', 'Requests rejected with 503 after waiting too long for a worker slot'
+)
+queue_wait = metrics.histogram(
+    'http_request_queue_wait_seconds', 'Time requests waited for a worker slot',
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+def parse_limits(value):
+    """Parse "auth.login=5/60,chat.send_message=30/60:10" into {endpoint: (tokens per second, burst)}.
+    
+    "count/seconds" refills count tokens every seconds; the optional
+    ":burst" caps how many can be saved up (count by default).
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        endpoint, _, spec = item.partition('=')
+        spec, _, burst = spec.partition(':')
+        count, _, seconds = spec.partition('/')
+        count = float(count)
+        limits[endpoint.strip()] = (count / float(seconds or 1), float(burst) if burst else count)
+    return limits
+
+def refill(tokens, updated, now, rate, burst):
+    """Tokens in a bucket last left with tokens at updated"""
+    return min(burst, tokens + max(now - updated, 0.0) * rate)
+
+class MemoryBucketStore:
+    """Token buckets held in this worker's memory; the least recently used are dropped past max_keys"""
+    
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def take(self, key, rate, burst, now):
+        """Take a token; returns 0 on success or the seconds until one is available"""
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (burst, now))
+            tokens = refill(tokens, updated, now, rate, burst)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            self.buckets[key] = (tokens - 1 if not wait else tokens, now)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+            return wait
+    
+    def purge(self, older_than):
+        """Nothing to do: memory buckets are bounded by max_keys"""
+
+class DatabaseBucketStore:
+    """Token buckets in the rate_limit_buckets table, shared by every worker and host.
+    
+    Updates are compare-and-set on updated_at (microseconds), so two
+    workers spending the same bucket can't both use its last token. A
+    denied request costs one SELECT; an allowed one a SELECT and an UPDATE.
+    A bucket still contended after ATTEMPTS tries is treated as empty for
+    CONTENDED_WAIT seconds. If the database is unavailable requests are
+    let through.
+    """
+    
+    ATTEMPTS = 3
+    CONTENDED_WAIT = 1.0
+    
+    def take(self, key, rate, burst, now):
+        try:
+            return self.try_take(key, rate, burst, now)
+        except DatabaseUnavailableError:
+            logger.warning("Rate limit bucket %s unavailable; allowing request", key)
+            return 0.0
+    
+    def try_take(self, key, rate, burst, now):
+        stamp = int(now * 1000000)
+        for _ in range(self.ATTEMPTS):
+            row = db_manager.execute_single_query(
+                "SELECT tokens, updated_at FROM rate_limit_buckets WHERE bucket_key = %s", (key,),
+                primary=True
+            )
+            if row is None:
+                # New bucket (or a lost race to create it, in which case read it again)
+                if db_manager.execute_update(
+                    "INSERT IGNORE INTO rate_limit_buckets (bucket_key, tokens, updated_at) VALUES (%s, %s, %s)",
+                    (key, burst - 1, stamp), track=False
+                ):
+                    return 0.0
+                continue
+            
+            tokens = refill(row['tokens'], row['updated_at'] / 1000000, now, rate, burst)
+            if tokens < 1:
+                return (1 - tokens) / rate
+            if db_manager.execute_update("""
+                UPDATE rate_limit_buckets SET tokens = %s, updated_at = %s
+                WHERE bucket_key = %s AND updated_at = %s
+            """, (tokens - 1, stamp, key, row['updated_at']), track=False):
+                return 0.0
+        
+        # Lost every update to other requests spending the same bucket
+        logger.warning("Rate limit bucket %s contended; asking client to retry", key)
+        return self.CONTENDED_WAIT
+    
+    def purge(self, older_than):
+        """Delete buckets idle long enough to have refilled completely"""
+        try:
+            db_manager.execute_update(
+                "DELETE FROM rate_limit_buckets WHERE updated_at < %s", (int(older_than * 1000000),),
+                track=False
+            )
+        except DatabaseUnavailableError:
+            pass
+
+# Bucket stores selectable through Config.RATE_LIMIT_STORAGE
+STORES = {
+    'memory': MemoryBucketStore,
+    'database': DatabaseBucketStore
+}
+
+class RateLimiter:
+    """Per-client token buckets for each limited endpoint"""
+    
+    PURGE_SECONDS = 600
+    
+    def __init__(self, limits=None, storage=None):
+        self.limits = parse_limits(Config.RATE_LIMITS) if limits is None else limits
+        self.store = STORES[storage or Config.RATE_LIMIT_STORAGE]()
+        self.idle_seconds = max((burst / rate for rate, burst in self.limits.values()), default=0)
+        self.last_purge = time.monotonic()
+    
+    def check(self, endpoint, clients):
+        """Seconds to wait before calling endpoint, or 0 if this call is allowed by every one of clients' buckets"""
+        limit = self.limits.get(endpoint)
+        if limit is None:
+            return 0.0
+        
+        now = time.time()
+        if time.monotonic() - self.last_purge > self.PURGE_SECONDS:
+            self.last_purge = time.monotonic()
+            self.store.purge(now - self.idle_seconds)
+        
+        rate, burst = limit
+        for client in clients:
+            wait = self.store.take(f"{endpoint}:{client}", rate, burst, now)
+            if wait:
+                return wait
+        return 0.0
+
+class ConcurrencyLimiter:
+    """Caps requests in flight in this worker; requests that can't get a slot within max_wait are shed"""
+    
+    def __init__(self, max_concurrent, max_wait):
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self.slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent > 0 else None
+        self.in_flight = 0
+    
+    def acquire(self):
+        """Take a slot, waiting up to max_wait; False means the request should be shed"""
+        if self.slots is None:
+            return True
+        if not self.slots.acquire(blocking=False):
+            started = time.perf_counter()
+            acquired = self.slots.acquire(timeout=self.max_wait)
+            queue_wait.observe(time.perf_counter() - started)
+            if not acquired:
+                shed_total.inc()
+                return False
+        self.in_flight += 1
+        return True
+    
+    def release(self):
+        if self.slots is not None:
+            self.in_flight -= 1
+            self.slots.release()
+
+def client_keys():
+    """Rate limit keys for the request: the client address, the signed-in user and, for logins, the username tried"""
+    keys = [f"ip:{request.remote_addr}"]
+    user_id = session.get('user_id')
+    if user_id:
+        keys.append(f"user:{user_id}")
+    if request.endpoint in USERNAME_ENDPOINTS:
+        data = request.get_json(silent=True)
+        username = data.get('username') if isinstance(data, dict) else None
+        if isinstance(username, str) and username.strip():
+            keys.append(f"username:{username.strip().lower()[:100]}")
+    return keys
+
+# Global rate limiter and concurrency limiter instances
+rate_limiter = RateLimiter()
+concurrency_limiter = ConcurrencyLimiter(Config.MAX_CONCURRENT_REQUESTS, Config.MAX_QUEUE_WAIT_SECONDS)
+
+metrics.gauge('http_requests_in_flight', 'Requests holding a worker slot in this process',
+              callback=lambda: concurrency_limiter.in_flight)
@@ -0,0 +1,175 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+from app.utils.db import db_manager
+from app.utils.interval_tree import IntervalTree
+from app.utils.metrics import metrics
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cache metrics
+index_lookups = metrics.counter(
+    'schedule_index_lookups_total', 'Schedule index lookups by cache result', ('result',)
+)
+
+def schedule_bounds(scheduled_date, scheduled_time, duration_minutes):
+    """Convert a schedule's date, time and duration into start/end datetimes"""
+    if isinstance(scheduled_date, str):
+        scheduled_date = datetime.strptime(scheduled_date, '%Y-%m-%d').date()
+    elif isinstance(scheduled_date, datetime):
+        scheduled_date = scheduled_date.date()
+    
+    if isinstance(scheduled_time, str):
+        scheduled_time = datetime.strptime(scheduled_time[:5], '%H:%M').time()
+    
+    # PyMySQL returns TIME columns as timedelta
+    if isinstance(scheduled_time, timedelta):
+        start = datetime.combine(scheduled_date, time()) + scheduled_time
+    else:
+        start = datetime.combine(scheduled_date, scheduled_time or time())
+    
+    return start, start + timedelta(minutes=int(duration_minutes or 60))
+
+class ScheduleIndex:
+    """Per-user interval trees over pending study schedules.
+    
+    A user's tree is loaded from the database on first use and then kept in
+    sync by ``StudySchedule.save``; bulk writers such as imports call
+    ``invalidate`` so the tree is reloaded. Conflict checks and free-slot
+    searches on a loaded tree never touch the database. Trees are evicted
+    least recently used first beyond SCHEDULE_INDEX_MAX_USERS.
+    """
+    
+    def __init__(self, max_users=None):
+        self.max_users = max_users or Config.SCHEDULE_INDEX_MAX_USERS
+        self.trees = OrderedDict()
+        # Bumped by every write, so a load that raced one isn't cached
+        self.writes = 0
+        self.lock = threading.RLock()
+    
+    def get_tree(self, user_id):
+        """Get the interval tree for a user, loading it if needed"""
+        with self.lock:
+            tree = self.trees.get(user_id)
+            if tree is not None:
+                self.trees.move_to_end(user_id)
+                index_lookups.inc(result='hit')
+                return tree
+            writes = self.writes
+        
+        index_lookups.inc(result='miss')
+        rows = self.load_rows(user_id)
+        # Don't cache a tree built from a failed query
+        if rows is None:
+            return IntervalTree()
+        
+        tree = self.build(rows)
+        with self.lock:
+            if self.writes != writes:
+                return tree
+            self.trees[user_id] = tree
+            while len(self.trees) > self.max_users:
+                self.trees.popitem(last=False)
+        return tree
+    
+    def load_rows(self, user_id):
+        """A user's pending schedules, or None if they can't be read"""
+        return db_manager.execute_query("""
+            SELECT id, scheduled_date, scheduled_time, duration_minutes
+            FROM study_schedules
+            WHERE user_id = %s AND status = 'pending'
+        """, (user_id,))
+    
+    def build(self, rows):
+        """Build an interval tree from schedule rows"""
+        tree = IntervalTree()
+        for row in rows:
+            try:
+                start, end = schedule_bounds(row['scheduled_date'], row['scheduled_time'],
+                                             row['duration_minutes'])
+                tree.insert(start, end, row['id'])
+            except (TypeError, ValueError) as e:
+                logger.warning("Skipping schedule %s in index: %s", row.get('id'), e)
+        return tree
+    
+    def update(self, schedule):
+        """Apply a saved StudySchedule to its user's tree"""
+        if not schedule.id or not schedule.user_id:
+            return
+        with self.lock:
+            self.writes += 1
+            # Users that were never loaded will pick the change up on first load
+            tree = self.trees.get(schedule.user_id)
+            if tree is None:
+                return
+            if schedule.status != 'pending':
+                tree.remove(schedule.id)
+            else:
+                start, end = schedule_bounds(schedule.scheduled_date, schedule.scheduled_time,
+                                             schedule.duration_minutes)
+                tree.insert(start, end, schedule.id)
+    
+    def remove(self, user_id, schedule_id):
+        """Remove a schedule from a user's tree"""
+        with self.lock:
+            self.writes += 1
+            tree = self.trees.get(user_id)
+            if tree is not None:
+                tree.remove(schedule_id)
+    
+    def invalidate(self, user_id=None):
+        """Drop cached trees so they are reloaded from the database"""
+        with self.lock:
+            self.writes += 1
+            if user_id is None:
+                self.trees.clear()
+            else:
+                self.trees.pop(user_id, None)
+    
+    def find_conflicts(self, user_id, start, end, exclude_id=None):
+        """Return ids of pending schedules overlapping [start, end)"""
+        tree = self.get_tree(user_id)
+        with self.lock:
+            return [key for _, _, key in tree.overlapping(start, end) if key != exclude_id]
+    
+    def has_conflict(self, user_id, start, end):
+        """Check whether [start, end) overlaps any pending schedule"""
+        tree = self.get_tree(user_id)
+        with self.lock:
+            return tree.overlaps(start, end)
+    
+    def find_free_slots(self, user_id, duration_minutes, window_start, window_end,
+                        day_start=time(8, 0), day_end=time(22, 0), limit=5):
+        """Find free slots of at least duration_minutes inside a window.
+        
+        Only the daily [day_start, day_end) study hours are considered; one
+        slot is returned per free gap, starting at the beginning of the gap.
+        """
+        duration = timedelta(minutes=duration_minutes)
+        slots = []
+        
+        tree = self.get_tree(user_id)
+        with self.lock:
+            current_day = window_start.date()
+            while current_day <= window_end.date() and len(slots) < limit:
+                day_open = max(datetime.combine(current_day, day_start), window_start)
+                day_close = min(datetime.combine(current_day, day_end), window_end)
+                if day_close - day_open >= duration:
+                    for gap_start, gap_end in tree.free_gaps(day_open, day_close):
+                        if gap_end - gap_start >= duration:
+                            slots.append((gap_start, gap_start + duration))
+                            if len(slots) >= limit:
+                                break
+                current_day += timedelta(days=1)
+        
+        return slots
+
+# Global schedule index instance
+schedule_index = ScheduleIndex()
+
+metrics.gauge(
+    'schedule_index_users', 'Users with a loaded schedule index',
+    callback=lambda: len(schedule_index.trees)
+)
@@ -0,0 +1,454 @@
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from array import array
+import numpy as np
+from app.utils.change_feed import change_feed
+from app.utils.db import db_manager, DatabaseUnavailableError
+from app.utils.knowledge_snapshot import KnowledgeSnapshot
+from app.utils.metrics import metrics
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Search metrics
+search_duration = metrics.histogram(
+    'semantic_search_duration_seconds', 'Semantic knowledge base search latency'
+)
+
+def tokenize(text):
+    """Lowercase word tokens, ignoring single characters"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1]
+
+def entry_text(entry):
+    """Text embedded for a knowledge base row; topic and keywords count twice"""
+    heading = ' '.join(filter(None, (entry.get('topic'), entry.get('subtopic'), entry.get('keywords'))))
+    return f"{heading} {heading} {entry.get('content') or ''}"
+
+class IndexData:
+    """Search structures for one version of the knowledge base.
+    
+    Row i describes entry ids[i]. Terms are numbered in sorted order and
+    map to a hashed column, a sign, an IDF weight and a postings list of
+    rows. ``revision`` is the change feed revision the data was read at.
+    KnowledgeSnapshot exposes the same attributes backed by mmap.
+    """
+    
+    def __init__(self, dimensions, ids, subject_codes, subjects, terms, columns, signs, idf,
+                 postings_offsets, postings, matrix=None, revision=None):
+        self.dimensions = dimensions
+        self.ids = ids
+        self.subject_codes = subject_codes
+        self.subjects = subjects
+        self.terms = terms
+        self.columns = columns
+        self.signs = signs
+        self.idf = idf
+        self.postings_offsets = postings_offsets
+        self.postings = postings
+        self.matrix = matrix
+        self.revision = revision
+        self.subject_lookup = {subject: code for code, subject in enumerate(subjects)}
+
+class IndexOverlay:
+    """Entries changed since a base index was built.
+    
+    Changed entries are hidden in the base, and the ones still active are
+    embedded into a small IndexData of their own using the base's IDF
+    weights, so scores from both can be merged directly.
+    """
+    
+    def __init__(self, base, changed, documents, data):
+        self.base = base
+        self.changed = changed
+        self.documents = documents
+        self.data = data
+        self.hidden = np.isin(base.ids, np.fromiter(changed, dtype=np.int64, count=len(changed)))
+
+class SemanticIndex:
+    """Hashing-trick TF-IDF embeddings of the knowledge base in one NumPy matrix.
+    
+    Every active entry is embedded once into a row of a contiguous float32
+    matrix with unit-length rows. A query is embedded the same way, so
+    cosine similarity against all entries is a single matrix-vector product
+    and the top results are picked with ``argpartition``.
+    
+    Tokens are hashed into ``dimensions`` columns with a hash-derived sign,
+    so collisions tend to cancel out instead of piling up.
+    
+    When KNOWLEDGE_SNAPSHOT_PATH is set the structures are memory-mapped from
+    a snapshot built offline instead of being rebuilt from the database, and
+    a replaced snapshot file is picked up without a restart.
+    
+    Entries changed after the base was built (reported by the change feed)
+    are served from an IndexOverlay until the next full build or snapshot.
+    """
+    
+    def __init__(self, dimensions=None, snapshot_path=None):
+        self.dimensions = dimensions or Config.SEMANTIC_DIMENSIONS
+        self.snapshot_path = snapshot_path if snapshot_path is not None else Config.KNOWLEDGE_SNAPSHOT_PATH
+        self.lock = threading.Lock()
+        self.data = None
+        self.overlay = None
+        self.pending = set()
+        self.pending_lock = threading.Lock()
+        self.stale = False
+        self.snapshot_stat = None
+        self.snapshot_checked = 0.0
+    
+    def build_from(self, documents):
+        """Build the index from (entry_id, subject, text) triples"""
+        self.data = self.build_data(documents)
+        self.overlay = None
+        return len(self.data.ids)
+    
+    def build_data(self, documents, base=None):
+        """Embed (entry_id, subject, text) triples; with a base, reuse its IDF weights"""
+        vocabulary = {}
+        subjects = {}
+        ids, subject_codes = array('q'), array('H')
+        rows, token_ids, weights = array('i'), array('i'), array('f')
+        
+        for row, (entry_id, subject, text) in enumerate(documents):
+            ids.append(entry_id)
+            subject_codes.append(subjects.setdefault((subject or '').lower(), len(subjects)))
+            counts = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                token_id = vocabulary.get(token)
+                if token_id is None:
+                    token_id = vocabulary[token] = len(vocabulary)
+                rows.append(row)
+                token_ids.append(token_id)
+                weights.append(1.0 + math.log(count))
+        
+        # Number terms in sorted order so the dictionary can be binary searched on disk
+        terms = sorted(vocabulary)
+        remap = np.empty(len(terms), dtype=np.int32)
+        for term_id, term in enumerate(terms):
+            remap[vocabulary[term]] = term_id
+        token_ids = remap[np.frombuffer(token_ids, dtype=np.int32)] if token_ids else np.zeros(0, np.int32)
+        rows = np.frombuffer(rows, dtype=np.int32) if rows else np.zeros(0, np.int32)
+        
+        count = len(ids)
+        df = np.bincount(token_ids, minlength=len(terms))
+        total = count + (len(base.ids) if base is not None else 0)
+        idf = (np.log((1.0 + total) / (1.0 + df)) + 1.0).astype(np.float32)
+        if base is not None:
+            # Terms the base already knows keep its weights so scores stay comparable
+            for term_id, term in enumerate(terms):
+                base_id = base.terms.get(term)
+                if base_id is not None:
+                    idf[term_id] = base.idf[base_id]
+        columns, signs = self._hash_terms(terms)
+        
+        # Scatter all (row, column) contributions at once
+        values = np.frombuffer(weights, dtype=np.float32) * idf[token_ids] * signs[token_ids]
+        matrix = np.zeros((count, self.dimensions), dtype=np.float32)
+        if len(token_ids):
+            np.add.at(matrix, (rows, columns[token_ids]), values)
+        
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        
+        # Postings: the rows containing each term, grouped by term
+        postings = rows[np.argsort(token_ids, kind='stable')]
+        postings_offsets = np.zeros(len(terms) + 1, dtype=np.uint64)
+        postings_offsets[1:] = np.cumsum(df)
+        
+        return IndexData(
+            self.dimensions,
+            np.frombuffer(ids, dtype=np.int64).copy(),
+            np.frombuffer(subject_codes, dtype=np.uint16).copy() if subject_codes else np.zeros(0, np.uint16),
+            list(subjects),
+            {term: term_id for term_id, term in enumerate(terms)},
+            columns, signs, idf, postings_offsets, postings, matrix
+        )
+    
+    def _hash_terms(self, terms):
+        """Map every term to a column and a +/-1 sign"""
+        columns = np.zeros(len(terms), dtype=np.int32)
+        signs = np.zeros(len(terms), dtype=np.int8)
+        for term_id, term in enumerate(terms):
+            digest = zlib.crc32(term.encode('utf-8'))
+            columns[term_id] = digest % self.dimensions
+            signs[term_id] = 1 if digest & 0x80000000 else -1
+        return columns, signs
+    
+    def load(self):
+        """Embed every active knowledge base entry"""
+        query = """
+            SELECT id, subject, topic, subtopic, keywords, content FROM knowledge_base
+            WHERE is_active = TRUE
+        """
+        # Clear the flag first so an invalidation during the rebuild isn't lost
+        self.stale = False
+        revision = change_feed.latest_revision()
+        try:
+            results = db_manager.execute_query(query)
+        except DatabaseUnavailableError:
+            results = None
+        if results is None:
+            self.stale = True
+            return 0
+        count = self.build_from((row['id'], row['subject'], entry_text(row)) for row in results)
+        self.data.revision = revision
+        self._catch_up()
+        logger.info("Semantic index built with %s entries", count)
+        return count
+    
+    def load_snapshot(self):
+        """Map the snapshot file if it is new or has been replaced"""
+        try:
+            stat = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return False
+        
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity == self.snapshot_stat:
+            return True
+        
+        try:
+            snapshot = KnowledgeSnapshot(self.snapshot_path)
+        except Exception as e:
+            logger.error("Could not open knowledge snapshot %s: %s", self.snapshot_path, e)
+            return self.uses_snapshot()
+        
+        # Searches already running keep their reference to the previous mapping
+        self.data = snapshot
+        self.overlay = None
+        self.dimensions = snapshot.dimensions
+        self.snapshot_stat = identity
+        self._catch_up()
+        logger.info("Mapped knowledge snapshot %s (%s entries)", self.snapshot_path, len(snapshot.ids))
+        return True
+    
+    def _catch_up(self):
+        """Queue the changes made since the base was read"""
+        revision = self.data.revision
+        if revision is None:
+            return
+        while True:
+            changes = change_feed.changes_since(revision)
+            if not changes:
+                return
+            self.apply_changes(changes)
+            revision = changes[-1]['revision']
+    
+    def ensure_loaded(self):
+        """Map the snapshot, or build from the database on first use or after invalidation"""
+        if not self.has_snapshot() and (self.stale or self.data is None):
+            with self.lock:
+                if self.stale or self.data is None:
+                    self.load()
+        
+        if self.pending and self.data is not None:
+            with self.lock:
+                if self.pending:
+                    self._apply_pending()
+        return self.data
+    
+    def invalidate(self):
+        """Mark the index for rebuilding on the next search.
+        
+        A memory-mapped snapshot only changes when a new one is built.
+        """
+        self.stale = True
+    
+    def apply_changes(self, changes):
+        """Change feed subscriber: re-embed the changed entries on the next search"""
+        with self.pending_lock:
+            self.pending.update(change['entry_id'] for change in changes)
+    
+    def _apply_pending(self):
+        """Rebuild the overlay with the entries changed since the base was built"""
+        with self.pending_lock:
+            entry_ids, self.pending = self.pending, set()
+        placeholders = ', '.join(['%s'] * len(entry_ids))
+        try:
+            results = db_manager.execute_query(f"""
+                SELECT id, subject, topic, subtopic, keywords, content, is_active FROM knowledge_base
+                WHERE id IN ({placeholders})
+            """, list(entry_ids))
+        except DatabaseUnavailableError:
+            results = None
+        if results is None:
+            with self.pending_lock:
+                self.pending.update(entry_ids)
+            return
+        
+        overlay = self.current_overlay()
+        changed = (overlay.changed if overlay else set()) | entry_ids
+        documents = {entry_id: document for entry_id, document in (overlay.documents if overlay else {}).items()
+                     if entry_id not in entry_ids}
+        for row in results:
+            if row['is_active']:
+                documents[row['id']] = (row['subject'], entry_text(row))
+        
+        # Past the limit a full rebuild is cheaper than merging two indexes per search
+        if len(changed) > Config.SEMANTIC_OVERLAY_LIMIT and not self.uses_snapshot():
+            self.load()
+            return
+        
+        data = self.build_data(((entry_id, subject, text) for entry_id, (subject, text) in documents.items()),
+                               base=self.data)
+        self.overlay = IndexOverlay(self.data, changed, documents, data)
+        logger.info("Semantic index overlay now holds %s changed entries", len(changed))
+    
+    def current_overlay(self, data=None):
+        """The overlay for data (default: the current base), if any"""
+        data = data or self.data
+        overlay = self.overlay
+        return overlay if overlay is not None and overlay.base is data else None
+    
+    def uses_snapshot(self):
+        return isinstance(self.data, KnowledgeSnapshot)
+    
+    def has_snapshot(self):
+        """Whether searches are served from a memory-mapped snapshot"""
+        if not self.snapshot_path:
+            return False
+        
+        # Re-stat the file at most every KNOWLEDGE_SNAPSHOT_CHECK_SECONDS
+        now = time.monotonic()
+        if self.data is None or now - self.snapshot_checked >= Config.KNOWLEDGE_SNAPSHOT_CHECK_SECONDS:
+            with self.lock:
+                self.snapshot_checked = now
+                self.load_snapshot()
+        return self.uses_snapshot()
+    
+    def term_ids(self, text, data, exclude=None):
+        """Term ids (with counts) of the tokens in text known to data but not to exclude"""
+        counts = {}
+        for token in tokenize(text):
+            term_id = data.terms.get(token)
+            if term_id is not None and (exclude is None or exclude.terms.get(token) is None):
+                counts[term_id] = counts.get(term_id, 0) + 1
+        return counts
+    
+    def _add_terms(self, vector, data, counts):
+        term_ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        np.add.at(vector, data.columns[term_ids], weights * data.idf[term_ids] * data.signs[term_ids])
+    
+    def embed(self, text, data=None, overlay=None):
+        """Embed query text into a unit vector, or None if no token is known"""
+        data = data or self.ensure_loaded()
+        vector = np.zeros(data.dimensions, dtype=np.float32)
+        counts = self.term_ids(text, data)
+        if counts:
+            self._add_terms(vector, data, counts)
+        
+        # Tokens only the overlay knows (new terms in changed entries)
+        if overlay is not None:
+            extra = self.term_ids(text, overlay.data, exclude=data)
+            if extra:
+                self._add_terms(vector, overlay.data, extra)
+        
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+    
+    def _subject_mask(self, data, subject):
+        """Boolean row mask for a subject, or None if the subject is unknown"""
+        code = data.subject_lookup.get(subject.lower())
+        return None if code is None else data.subject_codes == code
+    
+    def _top(self, data, scores, limit, min_score):
+        """Highest scoring (entry_id, score) pairs"""
+        if limit < len(scores):
+            top = np.argpartition(scores, -limit)[-limit:]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(int(data.ids[i]), float(scores[i])) for i in top if scores[i] >= min_score]
+    
+    def _merge(self, results, overlay_results, limit):
+        if not overlay_results:
+            return results
+        return sorted(results + overlay_results, key=lambda match: match[1], reverse=True)[:limit]
+    
+    def _similarity(self, data, vector, subject, limit, min_score, hidden=None):
+        """Top matches in one IndexData by cosine similarity"""
+        if not len(data.ids):
+            return []
+        scores = data.matrix @ vector
+        if hidden is not None:
+            scores[hidden] = -1.0
+        if subject:
+            mask = self._subject_mask(data, subject)
+            if mask is None:
+                return []
+            scores = np.where(mask, scores, -1.0)
+        return self._top(data, scores, limit, min_score)
+    
+    def search(self, text, limit=5, min_score=None, subject=None):
+        """Get (entry_id, score) pairs for the entries most similar to text"""
+        min_score = Config.SEMANTIC_MIN_SCORE if min_score is None else min_score
+        with search_duration.time():
+            data = self.ensure_loaded()
+            if data is None or data.matrix is None:
+                return []
+            overlay = self.current_overlay(data)
+            vector = self.embed(text, data, overlay)
+            if vector is None:
+                return []
+            
+            results = self._similarity(data, vector, subject, limit, min_score,
+                                       overlay.hidden if overlay else None)
+            if overlay is not None:
+                results = self._merge(results, self._similarity(overlay.data, vector, subject, limit, min_score),
+                                      limit)
+            return results
+    
+    def _keyword_scores(self, data, counts, hidden=None):
+        scores = np.zeros(len(data.ids), dtype=np.float32)
+        for term_id in counts:
+            start, end = int(data.postings_offsets[term_id]), int(data.postings_offsets[term_id + 1])
+            scores[data.postings[start:end]] += data.idf[term_id]
+        if hidden is not None:
+            scores[hidden] = 0.0
+        return scores
+    
+    def keyword_search(self, text, limit=10):
+        """Get (entry_id, score) pairs for entries containing any query term, ranked by IDF"""
+        data = self.ensure_loaded()
+        if data is None:
+            return []
+        overlay = self.current_overlay(data)
+        
+        results = []
+        counts = self.term_ids(text, data)
+        if counts and len(data.ids):
+            scores = self._keyword_scores(data, counts, overlay.hidden if overlay else None)
+            results = self._top(data, scores, limit, 1e-6)
+        
+        if overlay is not None and len(overlay.data.ids):
+            counts = self.term_ids(text, overlay.data)
+            if counts:
+                scores = self._keyword_scores(overlay.data, counts)
+                results = self._merge(results, self._top(overlay.data, scores, limit, 1e-6), limit)
+        return results
+    
+    def size(self):
+        data = self.data
+        if data is None:
+            return 0
+        overlay = self.current_overlay(data)
+        if overlay is None:
+            return len(data.ids)
+        return len(data.ids) - int(overlay.hidden.sum()) + len(overlay.data.ids)
+
+# Global semantic index instance
+semantic_index = SemanticIndex()
+change_feed.subscribe(semantic_index.apply_changes)
+
+metrics.gauge('semantic_index_entries', 'Knowledge base entries in the semantic index',
+              callback=semantic_index.size)
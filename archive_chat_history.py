@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Move old chat history into compressed archive segments
+Run periodically (e.g. nightly from cron) with CHAT_ARCHIVE_ENABLED=True so history reads include the archive
+"""
+
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.chat_archive import chat_archive
+from app.utils.db import db_manager, DatabaseUnavailableError
+from config import Config
+
+def main():
+    """Archive chat turns older than CHAT_ARCHIVE_AFTER_DAYS into CHAT_ARCHIVE_DIR"""
+    parser = argparse.ArgumentParser(description="Archive old chat history")
+    parser.add_argument('--user-id', type=int, action='append',
+                        help="Only archive these users (repeatable)")
+    args = parser.parse_args()
+    
+    if not Config.CHAT_ARCHIVE_ENABLED:
+        print("❌ Set CHAT_ARCHIVE_ENABLED=True first, or archived turns won't show up in history")
+        return 1
+    
+    print("🗄️  Archiving chat history...")
+    if not db_manager.test_connection():
+        print("❌ Database connection failed!")
+        return 1
+    
+    started = time.perf_counter()
+    try:
+        segments, messages = chat_archive.archive(args.user_id)
+    except DatabaseUnavailableError as e:
+        # Segments already written are indexed, so the next run carries on from here
+        print(f"❌ Database became unavailable while archiving: {e}")
+        return 1
+    print(f"✅ Archived {messages} turns older than {Config.CHAT_ARCHIVE_AFTER_DAYS} days "
+          f"into {segments} segments in {time.perf_counter() - started:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark for knowledge base change propagation across processes
+Starts several worker processes sharing one SQLite database, edits the knowledge base from the parent
+and measures how long each worker takes to serve the new entry from its semantic index
+"""
+
+import sys
+import os
+import argparse
+import multiprocessing
+import queue
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.knowledge_base import KnowledgeBase
+from app.utils.change_feed import change_feed
+from app.utils.db import db_manager
+from app.utils.semantic_index import semantic_index
+from benchmarks.harness import summarize, print_result
+from benchmarks.standin_db import StandInDatabase
+
+def worker(path, poll_seconds, results, ready):
+    """Follow the change feed and report when each changed entry becomes searchable"""
+    StandInDatabase(path).install(db_manager)
+    semantic_index.ensure_loaded()
+    
+    def report(changes):
+        for change in changes:
+            entry = KnowledgeBase.find_by_id(change['entry_id'])
+            marker = entry.keywords if entry else ''
+            found = any(entry_id == change['entry_id'] for entry_id, _ in semantic_index.keyword_search(marker))
+            results.put((os.getpid(), change['entry_id'], time.time(), found))
+    
+    change_feed.subscribe(report)
+    change_feed.poll_seconds = poll_seconds
+    change_feed.start()
+    ready.put(os.getpid())
+    while True:
+        time.sleep(1)
+
+def main():
+    """Publish changes from the parent and collect propagation latency from every worker"""
+    parser = argparse.ArgumentParser(description="Benchmark knowledge change propagation")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--changes', type=int, default=20)
+    parser.add_argument('--entries', type=int, default=10000,
+                        help="Knowledge base size each worker indexes")
+    parser.add_argument('--poll-seconds', type=float, default=0.5)
+    parser.add_argument('--interval', type=float, default=0.2,
+                        help="Seconds between published changes")
+    args = parser.parse_args()
+    
+    print("🔁 Knowledge Change Feed Benchmark")
+    print("=" * 50)
+    database = StandInDatabase()
+    database.seed_knowledge_base(args.entries)
+    database.install(db_manager)
+    
+    context = multiprocessing.get_context('spawn')
+    results, ready = context.Queue(), context.Queue()
+    processes = [context.Process(target=worker, args=(database.path, args.poll_seconds, results, ready),
+                                 daemon=True) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get(timeout=120)
+    
+    published = {}
+    for i in range(args.changes):
+        entry = KnowledgeBase(subject='Science', topic=f'Probe {i}', content=f'Change feed probe number {i}',
+                              keywords=f'probe{i}')
+        saved_at = time.time()
+        entry.save()
+        published[entry.id] = saved_at
+        time.sleep(args.interval)
+    
+    latencies, found, expected = [], 0, args.workers * args.changes
+    deadline = time.time() + args.poll_seconds * 4 + 10
+    while len(latencies) < expected and time.time() < deadline:
+        try:
+            _, entry_id, seen_at, visible = results.get(timeout=1)
+        except queue.Empty:
+            continue
+        if entry_id in published:
+            latencies.append(seen_at - published[entry_id])
+            found += visible
+    
+    for process in processes:
+        process.terminate()
+    os.unlink(database.path)
+    
+    print_result(f'change_feed.propagation[{args.workers} workers]', summarize(latencies))
+    print(f"{'':<42} {len(latencies)}/{expected} deliveries, {found} searchable on arrival")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark for date, time and duration parsing
+Compares the single-pass date grammar with the per-pattern regex loops it replaced
+"""
+
+import sys
+import os
+import argparse
+import re
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.date_grammar import parse_datetime
+from benchmarks.harness import measure, print_result
+
+MESSAGES = [
+    "Remind me to review algebra notes tomorrow at 3 PM",
+    "Schedule a study session for physics next Monday morning for 90 minutes",
+    "remind me about the essay deadline on 12/05/2025",
+    "Book chemistry revision on Saturday at 10:30am for 2 hours",
+    "Can you remind me to call my tutor at 5?",
+    "Plan history review on the 12th in the afternoon",
+    "remind me in 45 minutes to take a break",
+    "What is the Pythagorean theorem?",
+    "How do I study better for my chemistry exam?",
+    "Tell me about World War II"
+]
+
+# What NLPService.extract_date_time and extract_study_duration did before the grammar
+LEGACY_PATTERNS = [
+    r'\b(today|tomorrow|yesterday)\b',
+    r'\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\b',
+    r'\b(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b',
+    r'\b(next week|this week|next month)\b',
+    r'\b(\d{1,2}:\d{2})\s*(am|pm)?\b',
+    r'\b(\d{1,2})\s*(am|pm)\b',
+    r'\b(morning|afternoon|evening|night)\b'
+]
+LEGACY_DURATIONS = [
+    r'(\d+)\s*(hour|hours|hr|hrs)',
+    r'(\d+)\s*(minute|minutes|min|mins)',
+    r'(\d+)\s*(day|days)',
+    r'(\d+)\s*(week|weeks)'
+]
+
+def legacy_extract(message):
+    """Matched date/time strings and a duration, without resolving them to datetimes"""
+    found = [re.findall(pattern, message, re.IGNORECASE) for pattern in LEGACY_PATTERNS]
+    duration = next((match for match in (re.search(pattern, message, re.IGNORECASE)
+                                         for pattern in LEGACY_DURATIONS) if match), None)
+    return found, duration
+
+def main():
+    """Measure per-message parse latency and overall throughput"""
+    parser = argparse.ArgumentParser(description="Benchmark date/time/duration parsing")
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+    
+    print("📅 Date Parsing Benchmark")
+    print("=" * 50)
+    now = datetime(2025, 3, 12, 10, 0)
+    message = lambda i: (MESSAGES[i % len(MESSAGES)],)
+    
+    print_result('dates.grammar', measure(lambda text: parse_datetime(text, now), args.iterations,
+                                          args_factory=message))
+    print_result('dates.legacy_patterns', measure(legacy_extract, args.iterations, args_factory=message))
+    
+    started = time.perf_counter()
+    for i in range(args.iterations):
+        parse_datetime(MESSAGES[i % len(MESSAGES)], now)
+    elapsed = time.perf_counter() - started
+    print(f"\nGrammar throughput: {args.iterations / elapsed:,.0f} messages/s "
+          f"({sum(bool(parse_datetime(text, now)) for text in MESSAGES)} of {len(MESSAGES)} "
+          f"sample messages contain a date, time or duration)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark for user data export and import
+Seeds users with growing chat histories and compares the streaming export's memory with loading everything first
+"""
+
+import sys
+import os
+import argparse
+import io
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.export_service import export_service, SECTIONS
+from app.utils.db import db_manager
+from app.utils.json_encoder import response_encoder
+from benchmarks.standin_db import StandInDatabase
+
+def seed_history(database, user_id, count):
+    """Give a user count chat turns across sessions of 50"""
+    started = datetime(2024, 1, 1)
+    with database.backend.connect().cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO users (id, username, email, password_hash, first_name, last_name)
+            VALUES (%s, %s, %s, 'x', 'Bench', 'User')
+        """, (user_id, f'bench{user_id}', f'bench{user_id}@example.com'))
+        for session in range(0, count, 50):
+            cursor.execute("INSERT INTO chat_sessions (user_id, session_start) VALUES (%s, %s)",
+                           (user_id, started + timedelta(hours=session)))
+            session_id = cursor.lastrowid
+            cursor.executemany("""
+                INSERT INTO chat_history (session_id, user_id, message, response, message_type,
+                                          confidence_score, timestamp)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, [(session_id, user_id, f"What is photosynthesis? (turn {turn})",
+                   "Photosynthesis is the process by which plants turn light, water and carbon "
+                   "dioxide into glucose and oxygen.", 'question', 0.92,
+                   started + timedelta(hours=session, minutes=turn - session))
+                  for turn in range(session, min(session + 50, count))])
+
+def buffered_export(user_id):
+    """The naive export: every row loaded with fetchall, then written out"""
+    output = []
+    for section, (table, fields) in SECTIONS.items():
+        rows = db_manager.execute_query(
+            f"SELECT {', '.join(fields)} FROM {table} WHERE user_id = %s ORDER BY id", (user_id,)
+        )
+        output.extend(response_encoder.dumps({'type': section, **row}) + b'\n' for row in rows or [])
+    return b''.join(output)
+
+def streamed_export(user_id):
+    return sum(len(chunk) for chunk in export_service.export(user_id))
+
+def run(func, *args):
+    """(seconds, peak traced MB) of one call, timed without tracing"""
+    started = time.perf_counter()
+    func(*args)
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 1024 / 1024
+
+def main():
+    """Measure export time and peak memory at each history size, then import one export back"""
+    parser = argparse.ArgumentParser(description="Benchmark user data export and import")
+    parser.add_argument('--sizes', default='10000,50000,200000',
+                        help="Comma-separated chat history sizes (one user each)")
+    args = parser.parse_args()
+    
+    print("📦 Export Benchmark")
+    print("=" * 50)
+    database = StandInDatabase().install(db_manager)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    for user_id, size in enumerate(sizes, start=1):
+        seed_history(database, user_id, size)
+    
+    for user_id, size in enumerate(sizes, start=1):
+        for name, func in (('streamed', streamed_export), ('buffered', buffered_export)):
+            seconds, peak = run(func, user_id)
+            print(f"export.{name}[{size}]{'':<{24 - len(name) - len(str(size))}} {seconds:8.2f} s  "
+                  f"{size / seconds:10,.0f} rows/s  peak {peak:8.1f} MB")
+    
+    user_id, size = len(sizes), sizes[-1]
+    seed_history(database, user_id + 1, 0)
+    data = b''.join(export_service.export(user_id, compress=True))
+    started = time.perf_counter()
+    counts = export_service.import_data(user_id + 1, io.BytesIO(data))
+    seconds = time.perf_counter() - started
+    print(f"\nGzipped export of {size:,} turns: {len(data) / 1024 / 1024:.1f} MB; "
+          f"imported {counts['history']:,} turns in {seconds:.2f} s ({counts['history'] / seconds:,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
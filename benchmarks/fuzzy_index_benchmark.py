@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark for typo-tolerant term correction
+Builds the trigram index over a synthetic vocabulary and measures correct() latency for misspelled words
+"""
+
+import sys
+import os
+import argparse
+import bisect
+import glob
+import random
+import re
+import time
+from collections import Counter, defaultdict
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.fuzzy_index import TrigramIndex
+from benchmarks.harness import measure, print_result
+
+KNOWN_TERMS = ['photosynthesis', 'pythagorean', 'derivative', 'shakespeare', 'revolution', 'algorithm']
+
+def word_model(limit=200):
+    """Character bigram -> next character model trained on words from the standard library sources"""
+    words = Counter()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.__file__), '*.py')))[:limit]:
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            words.update(word for word in re.findall(r'[a-z]+', f.read().lower()) if len(word) > 2)
+    
+    transitions = defaultdict(Counter)
+    for word, count in words.items():
+        padded = f"^^{word}$"
+        for i in range(len(padded) - 2):
+            transitions[padded[i:i + 2]][padded[i + 2]] += count
+    
+    model = {}
+    for state, following in transitions.items():
+        characters = list(following)
+        cumulative, total = [], 0
+        for character in characters:
+            total += following[character]
+            cumulative.append(total)
+        model[state] = (characters, cumulative)
+    return model, set(words)
+
+def vocabulary(size, seed=42):
+    """Word-like terms with realistic trigram overlap, plus a few known subject terms"""
+    model, terms = word_model()
+    terms.update(KNOWN_TERMS)
+    rng = random.Random(seed)
+    while len(terms) < size:
+        word = '^^'
+        while len(word) < 18:
+            characters, cumulative = model[word[-2:]]
+            character = characters[bisect.bisect_right(cumulative, rng.random() * cumulative[-1])]
+            if character == '$':
+                break
+            word += character
+        if len(word) > 4:
+            terms.add(word[2:])
+    return list(terms)
+
+def misspell(word, rng):
+    """Apply one random deletion, insertion, substitution or transposition"""
+    i = rng.randrange(1, len(word) - 1)
+    letter = rng.choice('abcdefghijklmnopqrstuvwxyz')
+    edit = rng.randrange(4)
+    if edit == 0:
+        return word[:i] + word[i + 1:]
+    if edit == 1:
+        return word[:i] + letter + word[i:]
+    if edit == 2:
+        return word[:i] + letter + word[i + 1:]
+    return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+
+def run(size, iterations, queries=500):
+    terms = vocabulary(size)
+    index = TrigramIndex()
+    started = time.perf_counter()
+    index.build(terms)
+    build_seconds = time.perf_counter() - started
+    
+    rng = random.Random(7)
+    words = [misspell(term, rng) for term in rng.sample(index.terms, queries - 2)]
+    words += ['photosyntesis', 'pythagorus']
+    result = measure(index.correct, iterations, warmup=50, args_factory=lambda i: (words[i % len(words)],))
+    result['build_seconds'] = build_seconds
+    result['terms'] = len(index.terms)
+    result['examples'] = {word: index.correct(word) for word in words[-2:]}
+    return result
+
+def main():
+    """Run the benchmark at each requested vocabulary size"""
+    parser = argparse.ArgumentParser(description="Benchmark typo-tolerant term correction")
+    parser.add_argument('--sizes', default='50000,500000',
+                        help="Comma-separated vocabulary sizes")
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+    
+    print("🔤 Typo Correction Benchmark")
+    print("=" * 50)
+    for size in (int(size) for size in args.sizes.split(',')):
+        result = run(size, args.iterations)
+        print_result(f"fuzzy.correct[{result['terms']}]", result)
+        print(f"{'':<42} build {result['build_seconds']:.1f} s")
+        for word, match in result['examples'].items():
+            print(f"{'':<42} {word} -> {match[0] if match else '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Timing helpers shared by the benchmark scripts
+Reports p50/p95/p99 latency and throughput, and compares runs against a JSON baseline
+"""
+
+import json
+import os
+import platform
+import time
+from datetime import datetime
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(durations, elapsed=None):
+    """Summarize per-call durations (seconds) into a result dict"""
+    durations = sorted(durations)
+    count = len(durations)
+    total = elapsed if elapsed is not None else sum(durations)
+    return {
+        'iterations': count,
+        'mean_us': (sum(durations) / count) * 1e6 if count else 0.0,
+        'p50_us': percentile(durations, 0.50) * 1e6,
+        'p95_us': percentile(durations, 0.95) * 1e6,
+        'p99_us': percentile(durations, 0.99) * 1e6,
+        'max_us': durations[-1] * 1e6 if count else 0.0,
+        'throughput_per_sec': count / total if total else 0.0
+    }
+
+def measure(func, iterations=1000, warmup=50, args_factory=None):
+    """Time func over a number of iterations after a warmup.
+    
+    args_factory, if given, is called with the iteration number and must
+    return the positional arguments for that call, so inputs can vary.
+    """
+    for i in range(warmup):
+        func(*(args_factory(i) if args_factory else ()))
+    
+    durations = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        args = args_factory(i) if args_factory else ()
+        call_started = time.perf_counter()
+        func(*args)
+        durations.append(time.perf_counter() - call_started)
+    return summarize(durations, time.perf_counter() - started)
+
+def print_result(name, result):
+    """Print one benchmark result line"""
+    print(f"{name:<42} p50 {result['p50_us']:10.1f} us  p95 {result['p95_us']:10.1f} us  "
+          f"p99 {result['p99_us']:10.1f} us  {result['throughput_per_sec']:10.1f} ops/s")
+
+def environment():
+    """Describe the machine the benchmarks ran on"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'timestamp': datetime.now().isoformat()
+    }
+
+def save_results(path, results):
+    """Write results to a JSON file"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+
+def compare_to_baseline(results, baseline_path, tolerance=0.20):
+    """Compare p95 latencies with a baseline file; returns the list of regressions"""
+    if not os.path.exists(baseline_path):
+        print(f"No baseline found at {baseline_path}; run with --save-baseline to create one")
+        return []
+    
+    with open(baseline_path) as f:
+        baseline = json.load(f).get('results', {})
+    
+    regressions = []
+    print(f"\nComparison with baseline ({baseline_path}, tolerance {tolerance:.0%}):")
+    for name, result in sorted(results.items()):
+        previous = baseline.get(name)
+        if not previous or not previous.get('p95_us'):
+            print(f"  {name:<40} (new)")
+            continue
+        change = (result['p95_us'] - previous['p95_us']) / previous['p95_us']
+        marker = 'REGRESSION' if change > tolerance else 'ok'
+        print(f"  {name:<40} p95 {previous['p95_us']:10.1f} -> {result['p95_us']:10.1f} us "
+              f"({change:+.1%}) {marker}")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
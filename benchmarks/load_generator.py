@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+End-to-end load generator for the chat API
+Replays realistic chat transcripts against /api/chat/message, either in-process
+through the Flask test client (with a seeded stand-in database) or against a running server
+"""
+
+import sys
+import os
+import argparse
+import http.cookiejar
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import summarize, print_result
+
+TRANSCRIPTS = [
+    ["Hi!", "What is the Pythagorean theorem?", "How do I study for geometry?",
+     "Thanks, bye!"],
+    ["Hello", "Explain Newton's laws of motion", "What is inertia?",
+     "Remind me to review physics tomorrow at 4 PM", "Goodbye"],
+    ["Good morning", "Tell me about World War II", "Who were the Axis powers?",
+     "Can you help me make a study plan for history?", "That's all, thank you"],
+    ["Hey", "What is a linear equation?", "How do I find the slope of a line?",
+     "Give me tips to memorize formulas", "Find me 2 hours this week", "Bye"],
+    ["Hello there", "I need to take notes on Shakespeare", "What is a sonnet?",
+     "How can I focus better when reading?", "See you"],
+    ["Hi", "How does recursion work in programming?", "What is an algorithm?",
+     "Schedule a study session for computer science", "Thanks!"],
+    ["What is the periodic table?", "How are elements grouped?",
+     "What is the Pomodoro technique?", "Remind me about my chemistry deadline on friday"]
+]
+
+class TestClientDriver:
+    """Sends requests through the Flask test client"""
+    
+    def __init__(self, app):
+        self.client = app.test_client()
+    
+    def post(self, path, payload):
+        response = self.client.post(path, json=payload)
+        return response.status_code, response.get_json()
+
+class HTTPDriver:
+    """Sends requests to a running server, keeping the session cookie"""
+    
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+    
+    def post(self, path, payload):
+        request = urllib.request.Request(
+            self.base_url + path, data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        try:
+            with self.opener.open(request) as response:
+                return response.status, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+def login(driver, username, password='benchmark-password'):
+    """Register (if needed) and log in a benchmark user"""
+    driver.post('/api/auth/register', {
+        'username': username, 'email': f'{username}@example.com', 'password': password,
+        'first_name': 'Load', 'last_name': 'Test'
+    })
+    status, _ = driver.post('/api/auth/login', {'username': username, 'password': password})
+    if status != 200:
+        raise RuntimeError(f"Could not log in benchmark user {username} (HTTP {status})")
+
+def replay(driver, conversations, rng, durations, errors):
+    """Replay a number of transcripts, recording per-message latency"""
+    for _ in range(conversations):
+        session_id = None
+        for message in rng.choice(TRANSCRIPTS):
+            started = time.perf_counter()
+            status, data = driver.post('/api/chat/message',
+                                       {'message': message, 'session_id': session_id})
+            durations.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+            elif data:
+                session_id = data.get('session_id')
+
+def run(driver_factory, users=1, conversations=50, seed=42):
+    """Run the load test with one thread per simulated user"""
+    durations, errors = [], []
+    drivers = []
+    for i in range(users):
+        driver = driver_factory()
+        login(driver, f'loaduser{seed}_{i}')
+        drivers.append(driver)
+    
+    threads = [threading.Thread(target=replay,
+                                args=(driver, conversations, random.Random(seed + i), durations, errors))
+               for i, driver in enumerate(drivers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    result = summarize(durations, time.perf_counter() - started)
+    result['errors'] = len(errors)
+    return result
+
+def run_in_process(users=1, conversations=50, knowledge_entries=5000, seed=42):
+    """Run the load test through the Flask test client with a stand-in database"""
+    from app import create_app
+    from app.utils.db import db_manager
+    from benchmarks.standin_db import install_standin
+    
+    install_standin(db_manager, knowledge_entries=knowledge_entries, seed=seed)
+    app = create_app()
+    return run(lambda: TestClientDriver(app), users, conversations, seed)
+
+def main():
+    """Parse arguments and run the load generator"""
+    parser = argparse.ArgumentParser(description="Replay chat transcripts against the chat API")
+    parser.add_argument('--url', help="Base URL of a running server (default: in-process test client)")
+    parser.add_argument('--users', type=int, default=1, help="Concurrent simulated users")
+    parser.add_argument('--conversations', type=int, default=50, help="Transcripts per user")
+    parser.add_argument('--knowledge-entries', type=int, default=5000,
+                        help="Synthetic knowledge base size for in-process runs")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    if args.url:
+        result = run(lambda: HTTPDriver(args.url), args.users, args.conversations, args.seed)
+    else:
+        result = run_in_process(args.users, args.conversations, args.knowledge_entries, args.seed)
+    
+    print_result('load./api/chat/message', result)
+    print(f"errors: {result['errors']}")
+
+if __name__ == "__main__":
+    main()
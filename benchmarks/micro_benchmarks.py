@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the chatbot hot paths
+Covers NLP analysis, intent extraction, knowledge base search and JSON serialization
+"""
+
+import sys
+import os
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import measure, print_result
+
+SAMPLE_MESSAGES = [
+    "Hello there!",
+    "What is the Pythagorean theorem?",
+    "How do I study better for my chemistry exam?",
+    "Explain photosynthesis to me",
+    "Remind me to review algebra notes tomorrow at 3 PM",
+    "Can you help me plan a study schedule for history?",
+    "Tell me about World War II",
+    "I need to take notes on Shakespeare",
+    "What is a linear equation and how do I find the slope?",
+    "Thanks, that's all for today. Bye!",
+    "How does recursion work in programming?",
+    "Give me some tips to memorize the periodic table"
+]
+
+SEARCH_TERMS = ['equation slope', 'photosynthesis', 'war empire', 'shakespeare poetry',
+                'algorithm recursion', 'memory focus', 'gravity force energy', 'unknownterm']
+
+def bench_nlp(iterations):
+    """Benchmark NLPService analysis"""
+    from app.services.nlp_service import nlp_service
+    
+    pick = lambda i: (SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)],)
+    lower = lambda i: (SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)].lower(),)
+    return {
+        'nlp.process_message': measure(nlp_service.process_message, iterations, args_factory=pick),
+        'nlp.process_message.full': measure(nlp_service.process_message, iterations,
+                                            args_factory=lambda i: (*pick(i), None, None, True)),
+        'nlp.extract_intent': measure(nlp_service.extract_intent, iterations * 10, args_factory=lower),
+        'nlp.intent_batch[64]': measure(nlp_service.classify_intents, iterations,
+                                        args_factory=lambda i: ([SAMPLE_MESSAGES[(i + j) % len(SAMPLE_MESSAGES)].lower()
+                                                                 for j in range(64)],))
+    }
+
+def bench_knowledge(iterations):
+    """Benchmark the KnowledgeBase search paths"""
+    from app.models.knowledge_base import KnowledgeBase
+    
+    term = lambda i: (SEARCH_TERMS[i % len(SEARCH_TERMS)],)
+    subjects = ['Mathematics', 'Science', 'History', 'English']
+    return {
+        'kb.search_by_keywords': measure(KnowledgeBase.search_by_keywords, iterations,
+                                         args_factory=term),
+        'kb.search_content': measure(KnowledgeBase.search_content, iterations, args_factory=term),
+        'kb.get_by_subject': measure(KnowledgeBase.get_by_subject, iterations,
+                                     args_factory=lambda i: (subjects[i % len(subjects)],))
+    }
+
+def build_rows(rows, seed=42):
+    """Build chat_history rows as the MySQL driver returns them"""
+    rng = random.Random(seed)
+    started = datetime(2024, 1, 1, 9, 0)
+    return [{
+        'id': i + 1,
+        'session_id': i // 20 + 1,
+        'user_id': 1,
+        'message': rng.choice(SAMPLE_MESSAGES),
+        'response': "**Algebra**\n\nA linear equation is an equation that makes a straight line when graphed.",
+        'message_type': rng.choice(['question', 'study_tip', 'general']),
+        'confidence_score': Decimal(f"{rng.random():.2f}"),
+        'timestamp': started + timedelta(minutes=i)
+    } for i in range(rows)]
+
+def build_history(rows, seed=42):
+    """Build ChatHistory objects the way the history route used to return them"""
+    from app.models.chat import ChatHistory
+    
+    return [ChatHistory(**row) for row in build_rows(rows, seed)]
+
+def bench_serialization(iterations, rows=1000):
+    """Benchmark serializing a history response: model objects + flask.jsonify vs rows + response encoders"""
+    from app import create_app
+    from flask import jsonify as flask_jsonify
+    from app.models.chat import ChatHistory
+    from app.utils.json_encoder import ENCODERS, create_encoder, jsonify
+    
+    results = build_rows(rows)
+    history = build_history(rows)
+    app = create_app()
+    
+    def to_dicts():
+        return [chat.to_dict() for chat in history]
+    
+    def model_jsonify():
+        with app.app_context():
+            flask_jsonify({'history': [ChatHistory(**row).to_dict() for row in results]}).get_data()
+    
+    def row_jsonify():
+        with app.app_context():
+            jsonify({'history': ChatHistory.serialize_rows(results)}).get_data()
+    
+    timings = {
+        f'serialize.to_dict[{rows}]': measure(to_dicts, iterations, warmup=5),
+        f'serialize.flask_jsonify[{rows}]': measure(model_jsonify, iterations, warmup=5),
+        f'serialize.jsonify[{rows}]': measure(row_jsonify, iterations, warmup=5)
+    }
+    for name in ENCODERS:
+        encoder = create_encoder(name)
+        if encoder.name == name:
+            timings[f'serialize.{name}[{rows}]'] = measure(
+                lambda: encoder.dumps({'history': ChatHistory.serialize_rows(results)}),
+                iterations, warmup=5
+            )
+    return timings
+
+def run(iterations=500):
+    """Run all microbenchmarks and return their results"""
+    results = {}
+    for group in (bench_nlp, bench_knowledge):
+        results.update(group(iterations))
+    results.update(bench_serialization(max(iterations // 10, 10)))
+    return results
+
+def main():
+    """Run the microbenchmarks against a seeded stand-in database"""
+    from app.utils.db import db_manager
+    from benchmarks.standin_db import install_standin
+    
+    install_standin(db_manager, knowledge_entries=5000)
+    for name, result in run().items():
+        print_result(name, result)
+
+if __name__ == "__main__":
+    main()
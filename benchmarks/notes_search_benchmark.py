@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark for per-user notes search
+Seeds users with growing numbers of notes and compares the in-memory notes index with the SQL search path
+"""
+
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.knowledge_base import UserNote
+from app.utils.db import db_manager
+from app.utils.notes_index import notes_index
+from benchmarks.harness import measure, print_result
+from benchmarks.standin_db import StandInDatabase, synthetic_entries
+from config import Config
+
+QUERIES = ['photosynthesis', 'algebra equation', 'war OR empire', 'recur*', 'memory focus OR sleep',
+           'shakespeare sonnet', 'integ* derivative', 'unknownterm']
+
+def seed_notes(database, user_id, count):
+    """Give a user count synthetic notes"""
+    with database.backend.connect().cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO users (id, username, email, password_hash, first_name, last_name)
+            VALUES (%s, %s, %s, 'x', 'Bench', 'User')
+        """, (user_id, f'bench{user_id}', f'bench{user_id}@example.com'))
+        cursor.executemany("""
+            INSERT INTO user_notes (user_id, subject, topic, note_content)
+            VALUES (%s, %s, %s, %s)
+        """, [(user_id, subject, topic, content)
+              for subject, topic, _, content, _, _, _ in synthetic_entries(count, seed=user_id)])
+
+def main():
+    """Measure search latency at each notes count, with and without the index"""
+    parser = argparse.ArgumentParser(description="Benchmark per-user notes search")
+    parser.add_argument('--sizes', default='100,1000,10000',
+                        help="Comma-separated notes counts (one user each)")
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+    
+    print("📝 Notes Search Benchmark")
+    print("=" * 50)
+    database = StandInDatabase().install(db_manager)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    for user_id, size in enumerate(sizes, start=1):
+        seed_notes(database, user_id, size)
+    
+    query = lambda user_id: lambda i: (user_id, QUERIES[i % len(QUERIES)])
+    for user_id, size in enumerate(sizes, start=1):
+        Config.NOTES_INDEX_ENABLED = True
+        started = time.perf_counter()
+        notes_index.get_index(user_id)
+        build_seconds = time.perf_counter() - started
+        print_result(f'notes.index[{size}]',
+                     measure(UserNote.search_user_notes, args.iterations, args_factory=query(user_id)))
+        print(f"{'':<42} first search builds the index in {build_seconds * 1000:.1f} ms")
+        
+        Config.NOTES_INDEX_ENABLED = False
+        print_result(f'notes.sql[{size}]',
+                     measure(UserNote.search_user_notes, args.iterations, args_factory=query(user_id)))
+    
+    os.unlink(database.path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Run the full benchmark suite against a seeded local stand-in database
+Prints p50/p95/p99 and throughput, writes results to JSON and compares them with a baseline
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import print_result, save_results, compare_to_baseline
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+def main():
+    """Run micro and load benchmarks"""
+    parser = argparse.ArgumentParser(description="Run the chatbot benchmark suite")
+    parser.add_argument('--iterations', type=int, default=500, help="Iterations per microbenchmark")
+    parser.add_argument('--conversations', type=int, default=50, help="Transcripts replayed by the load test")
+    parser.add_argument('--knowledge-entries', type=int, default=5000, help="Synthetic knowledge base size")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=os.path.join(BENCHMARK_DIR, 'results.json'),
+                        help="Where to write this run's results")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline file to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.20, help="Allowed p95 slowdown before failing")
+    args = parser.parse_args()
+    
+    from app.utils.db import db_manager
+    from benchmarks.standin_db import install_standin
+    from benchmarks import micro_benchmarks, load_generator
+    from app import create_app
+    
+    print("📊 Educational Chatbot Benchmarks")
+    print("=" * 50)
+    
+    install_standin(db_manager, knowledge_entries=args.knowledge_entries, seed=args.seed)
+    results = micro_benchmarks.run(args.iterations)
+    
+    app = create_app()
+    results['load./api/chat/message'] = load_generator.run(
+        lambda: load_generator.TestClientDriver(app), users=1,
+        conversations=args.conversations, seed=args.seed
+    )
+    
+    for name, result in results.items():
+        print_result(name, result)
+    
+    save_results(args.output, results)
+    print(f"\nResults written to {args.output}")
+    
+    if args.save_baseline:
+        save_results(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    
+    regressions = compare_to_baseline(results, args.baseline, args.tolerance)
+    if regressions:
+        print(f"\n⚠️  {len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
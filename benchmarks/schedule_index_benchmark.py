@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the per-user study schedule interval index
+Measures insert, conflict check and free-slot search with thousands of sessions per user
+"""
+
+import sys
+import os
+import random
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.interval_tree import IntervalTree
+from app.utils.schedule_index import ScheduleIndex
+
+def build_sessions(count, seed=42):
+    """Generate non-overlapping study sessions spread over the coming days"""
+    rng = random.Random(seed)
+    sessions = []
+    start = datetime(2024, 1, 1, 8, 0)
+    for i in range(count):
+        start += timedelta(minutes=rng.choice([30, 60, 90, 120]))
+        duration = timedelta(minutes=rng.choice([30, 45, 60]))
+        sessions.append((start, start + duration, i + 1))
+        start += duration
+    return sessions
+
+def timed(func, repeat):
+    """Run func repeat times and return microseconds per call"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+def run(count, repeat=2000):
+    sessions = build_sessions(count)
+    rng = random.Random(7)
+    
+    started = time.perf_counter()
+    tree = IntervalTree()
+    for start, end, key in sessions:
+        tree.insert(start, end, key)
+    insert_us = (time.perf_counter() - started) / count * 1e6
+    
+    first, last = sessions[0][0], sessions[-1][1]
+    span = int((last - first).total_seconds() // 60)
+    
+    def probe():
+        start = first + timedelta(minutes=rng.randrange(span))
+        return start, start + timedelta(minutes=60)
+    
+    def conflict_check():
+        tree.overlaps(*probe())
+    
+    def conflict_list():
+        tree.overlapping(*probe())
+    
+    index = ScheduleIndex()
+    index.trees[1] = tree
+    
+    def free_slots():
+        start, _ = probe()
+        index.find_free_slots(1, 120, start, start + timedelta(days=7))
+    
+    print(f"{count:>7} sessions | insert {insert_us:7.2f} us"
+          f" | overlaps {timed(conflict_check, repeat):7.2f} us"
+          f" | overlapping {timed(conflict_list, repeat):7.2f} us"
+          f" | free slots (7 days) {timed(free_slots, repeat // 10):8.2f} us")
+
+def main():
+    """Run the schedule index benchmark"""
+    print("📊 Study schedule interval index benchmark")
+    print("=" * 50)
+    for count in (1000, 5000, 20000):
+        run(count)
+
+if __name__ == "__main__":
+    main()
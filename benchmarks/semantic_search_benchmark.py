@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark for semantic knowledge base search
+Builds the embedding matrix from synthetic entries and measures top-k query latency at each size,
+both in memory and from a memory-mapped snapshot
+"""
+
+import sys
+import os
+import argparse
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.knowledge_snapshot import write_snapshot
+from app.utils.semantic_index import SemanticIndex, entry_text
+from benchmarks.harness import measure, print_result
+from benchmarks.standin_db import synthetic_entries
+
+QUERIES = ['how do plants use photosynthesis', 'slope of a linear equation', 'causes of the war',
+           'shakespeare sonnet poetry', 'recursion algorithm', 'tips to improve memory and focus',
+           'gravity and energy', 'treaty that ended the empire']
+
+def documents(count, seed=42):
+    """Synthetic (id, text) pairs shaped like knowledge base rows"""
+    columns = ('subject', 'topic', 'subtopic', 'content', 'keywords')
+    for i, row in enumerate(synthetic_entries(count, seed)):
+        yield i + 1, row[0], entry_text(dict(zip(columns, row)))
+
+def run(count, iterations, dimensions, limit=5):
+    index = SemanticIndex(dimensions, snapshot_path='')
+    started = time.perf_counter()
+    index.build_from(documents(count))
+    build_seconds = time.perf_counter() - started
+    
+    query = lambda i: (QUERIES[i % len(QUERIES)], limit, 0.0)
+    result = measure(index.search, iterations, warmup=10, args_factory=query)
+    result['build_seconds'] = build_seconds
+    result['matrix_mb'] = index.data.matrix.nbytes / 1e6
+    return result
+
+def run_snapshot(count, iterations, dimensions, limit=5):
+    """Write a snapshot, then time opening it and searching through the mapping"""
+    index = SemanticIndex(dimensions, snapshot_path='')
+    index.build_from(documents(count))
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'knowledge.snapshot')
+        write_snapshot(path, index.data)
+        del index
+        
+        mapped = SemanticIndex(snapshot_path=path)
+        started = time.perf_counter()
+        mapped.ensure_loaded()
+        open_seconds = time.perf_counter() - started
+        
+        query = lambda i: (QUERIES[i % len(QUERIES)], limit, 0.0)
+        result = measure(mapped.search, iterations, warmup=10, args_factory=query)
+        result['open_ms'] = open_seconds * 1e3
+        return result
+
+def main():
+    """Run the benchmark at each requested size"""
+    parser = argparse.ArgumentParser(description="Benchmark semantic knowledge base search")
+    parser.add_argument('--sizes', default='10000,100000,1000000',
+                        help="Comma-separated knowledge base sizes")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--dimensions', type=int, default=256)
+    parser.add_argument('--snapshot', action='store_true',
+                        help="Also measure searches served from a memory-mapped snapshot")
+    args = parser.parse_args()
+    
+    print("🔎 Semantic Search Benchmark")
+    print("=" * 50)
+    for count in (int(size) for size in args.sizes.split(',')):
+        result = run(count, args.iterations, args.dimensions)
+        print_result(f'semantic.search[{count}]', result)
+        print(f"{'':<42} build {result['build_seconds']:.1f} s  matrix {result['matrix_mb']:.1f} MB")
+        if args.snapshot:
+            result = run_snapshot(count, args.iterations, args.dimensions)
+            print_result(f'semantic.search.mmap[{count}]', result)
+            print(f"{'':<42} open {result['open_ms']:.2f} ms")
+
+if __name__ == "__main__":
+    main()
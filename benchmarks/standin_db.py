@@ -0,0 +1,80 @@
+"""
+Local stand-in for the MySQL database used by the benchmarks
+Runs the SQLite backend on a throwaway file, seeded with a synthetic knowledge base
+"""
+
+import os
+import random
+import tempfile
+
+from app.utils.db_backends import SQLiteBackend
+
+# Vocabulary used to generate the synthetic knowledge base
+SUBJECT_VOCABULARY = {
+    'Mathematics': ['algebra', 'geometry', 'calculus', 'equation', 'slope', 'triangle', 'hypotenuse',
+                    'derivative', 'integral', 'matrix', 'probability', 'statistics', 'fraction'],
+    'Science': ['physics', 'chemistry', 'biology', 'photosynthesis', 'atom', 'molecule', 'force',
+                'energy', 'cell', 'evolution', 'gravity', 'element', 'reaction'],
+    'History': ['war', 'empire', 'revolution', 'civilization', 'treaty', 'dynasty', 'ancient',
+                'medieval', 'colonial', 'independence', 'constitution', 'monarchy'],
+    'English': ['grammar', 'poetry', 'shakespeare', 'novel', 'metaphor', 'essay', 'literature',
+                'syntax', 'narrative', 'sonnet', 'rhetoric', 'vocabulary'],
+    'Computer Science': ['algorithm', 'programming', 'recursion', 'database', 'network', 'compiler',
+                         'sorting', 'graph', 'software', 'memory', 'variable', 'function'],
+    'Study Tips': ['pomodoro', 'memory', 'focus', 'recall', 'schedule', 'notes', 'review',
+                   'concentration', 'motivation', 'sleep', 'planning', 'practice']
+}
+
+FILLER_WORDS = ['the', 'concept', 'of', 'is', 'used', 'to', 'describe', 'how', 'students', 'learn',
+                'and', 'apply', 'important', 'ideas', 'in', 'everyday', 'problems', 'with', 'examples']
+
+def synthetic_entries(count, seed=42):
+    """Generate count synthetic knowledge base rows"""
+    rng = random.Random(seed)
+    subjects = list(SUBJECT_VOCABULARY)
+    for i in range(count):
+        subject = subjects[i % len(subjects)]
+        terms = rng.sample(SUBJECT_VOCABULARY[subject], 4)
+        words = terms + rng.sample(FILLER_WORDS, 10)
+        rng.shuffle(words)
+        yield (
+            subject,
+            f"{terms[0].title()} {i // len(subjects)}",
+            f"{terms[1].title()} basics",
+            ' '.join(words).capitalize() + '.',
+            ', '.join(terms),
+            rng.choice(['beginner', 'intermediate', 'advanced']),
+            '9-12'
+        )
+
+class StandInDatabase:
+    """SQLite database on a temporary file standing in for MySQL"""
+
+    def __init__(self, path=None):
+        if path is None:
+            handle, path = tempfile.mkstemp(prefix='chatbot-bench-', suffix='.db')
+            os.close(handle)
+            os.unlink(path)
+        self.path = path
+        self.backend = SQLiteBackend(path)
+
+    def install(self, manager):
+        """Point a DatabaseManager at this stand-in"""
+        manager.backend = self.backend
+        return self
+    
+    def seed_knowledge_base(self, count=1000, seed=42):
+        """Insert count synthetic knowledge base entries"""
+        with self.backend.connect().cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO knowledge_base (subject, topic, subtopic, content, keywords,
+                                            difficulty_level, grade_level)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, list(synthetic_entries(count, seed)))
+        return count
+
+def install_standin(manager, knowledge_entries=1000, seed=42, path=None):
+    """Create a seeded stand-in database and install it on a DatabaseManager"""
+    database = StandInDatabase(path)
+    database.seed_knowledge_base(knowledge_entries, seed)
+    return database.install(manager)
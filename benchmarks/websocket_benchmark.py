@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the WebSocket chat channel
+Sends the same chat messages to a running server over /ws/chat and over POST /api/chat/message
+and reports messages per second per worker for each
+"""
+
+import sys
+import os
+import argparse
+import itertools
+import json
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import summarize, print_result
+from benchmarks.load_generator import HTTPDriver, TRANSCRIPTS, login
+
+try:
+    import simple_websocket
+except ImportError:
+    simple_websocket = None
+
+MESSAGES = [message for transcript in TRANSCRIPTS for message in transcript]
+
+def http_user(driver, count, durations, errors):
+    session_id = None
+    for message in itertools.islice(itertools.cycle(MESSAGES), count):
+        started = time.perf_counter()
+        status, data = driver.post('/api/chat/message', {'message': message, 'session_id': session_id})
+        durations.append(time.perf_counter() - started)
+        if status != 200:
+            errors.append(status)
+        elif data:
+            session_id = data.get('session_id')
+
+def websocket_user(driver, count, durations, errors):
+    url = driver.base_url.replace('http', 'ws', 1) + '/ws/chat'
+    cookie = '; '.join(f"{cookie.name}={cookie.value}" for cookie in driver.cookies)
+    ws = simple_websocket.Client(url, headers={'Cookie': cookie})
+    try:
+        ready = json.loads(ws.receive())
+        if ready.get('type') != 'ready':
+            raise RuntimeError(f"Chat socket refused the connection: {ready.get('error')}")
+        for frame_id, message in enumerate(itertools.islice(itertools.cycle(MESSAGES), count)):
+            started = time.perf_counter()
+            ws.send(json.dumps({'type': 'message', 'id': frame_id, 'message': message}))
+            # Skip any reminders pushed meanwhile
+            while True:
+                reply = json.loads(ws.receive())
+                if reply.get('id') == frame_id:
+                    break
+            durations.append(time.perf_counter() - started)
+            if reply['type'] != 'response':
+                errors.append(reply.get('error'))
+    finally:
+        ws.close()
+
+def run(base_url, transport, users, messages, seed):
+    """Send messages from each of users concurrent clients and time every reply"""
+    durations, errors = [], []
+    drivers = []
+    for i in range(users):
+        driver = HTTPDriver(base_url)
+        login(driver, f'socketuser{seed}_{i}')
+        drivers.append(driver)
+    
+    threads = [threading.Thread(target=transport, args=(driver, messages, durations, errors))
+               for driver in drivers]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    result = summarize(durations, time.perf_counter() - started)
+    result['errors'] = len(errors)
+    return result
+
+def main():
+    """Run both transports against the server and compare messages per second per worker"""
+    parser = argparse.ArgumentParser(description="Compare chat over WebSockets with chat over HTTP")
+    parser.add_argument('--url', default='http://localhost:5000', help="Base URL of a running server")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes the server runs, to report per-worker throughput")
+    parser.add_argument('--users', type=int, default=4, help="Concurrent clients")
+    parser.add_argument('--messages', type=int, default=200, help="Messages per client")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    if simple_websocket is None:
+        print("❌ Install flask-sock (which brings simple-websocket) to benchmark the chat socket")
+        return 1
+    
+    print("🔌 WebSocket Chat Benchmark")
+    print("=" * 50)
+    print(f"{args.users} clients x {args.messages} messages against {args.url} "
+          f"(run the server with RATE_LIMIT_ENABLED=False)\n")
+    
+    results = {}
+    for name, transport in (('http', http_user), ('websocket', websocket_user)):
+        results[name] = run(args.url, transport, args.users, args.messages, args.seed)
+        print_result(f'chat.{name}', results[name])
+        if results[name]['errors']:
+            print(f"{'':<42} {results[name]['errors']} errors")
+    
+    http_rate, socket_rate = (results[name]['throughput_per_sec'] / args.workers
+                              for name in ('http', 'websocket'))
+    print(f"\nPer worker: {http_rate:,.0f} messages/s over HTTP, {socket_rate:,.0f} over the socket "
+          f"({socket_rate / http_rate:.2f}x)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Build the memory-mapped knowledge base snapshot
+Run offline (e.g. from cron after content changes); workers pick up the new file without a restart
+"""
+
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.db import db_manager
+from app.utils.knowledge_snapshot import write_snapshot
+from app.utils.semantic_index import SemanticIndex
+from config import Config
+
+def main():
+    """Embed the knowledge base and write the snapshot file"""
+    parser = argparse.ArgumentParser(description="Build the knowledge base search snapshot")
+    parser.add_argument('--output', default=Config.KNOWLEDGE_SNAPSHOT_PATH or 'knowledge.snapshot',
+                        help="Snapshot file to write (replaced atomically)")
+    parser.add_argument('--dimensions', type=int, default=Config.SEMANTIC_DIMENSIONS,
+                        help="Embedding dimensions")
+    parser.add_argument('--no-embeddings', action='store_true',
+                        help="Leave out the embedding matrix (keyword postings only)")
+    args = parser.parse_args()
+    
+    print("📦 Building knowledge snapshot...")
+    if not db_manager.test_connection():
+        print("❌ Database connection failed!")
+        return 1
+    
+    started = time.perf_counter()
+    index = SemanticIndex(args.dimensions, snapshot_path='')
+    count = index.load()
+    if index.data is None:
+        print("❌ Could not read the knowledge base")
+        return 1
+    
+    size = write_snapshot(args.output, index.data, include_matrix=not args.no_embeddings)
+    print(f"✅ Wrote {count} entries ({size / 1e6:.1f} MB) to {args.output} "
+          f"in {time.perf_counter() - started:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
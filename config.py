@@ -8,22 +8,146 @@ class Config:
     # Flask Configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
     
+    # Database Backend Configuration ('mysql' or 'sqlite')
+    DB_BACKEND = os.getenv('DB_BACKEND', 'mysql')
+    SQLITE_PATH = os.getenv('SQLITE_PATH', 'educational_chatbot.db')
+    
     # MySQL Database Configuration
     MYSQL_HOST = os.getenv('MYSQL_HOST', 'localhost')
     MYSQL_USER = os.getenv('MYSQL_USER', 'root')
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', '')
     MYSQL_DB = os.getenv('MYSQL_DB', 'educational_chatbot')
     
+    # Database Timeout, Retry and Circuit Breaker Configuration
+    DB_CONNECT_TIMEOUT = float(os.getenv('DB_CONNECT_TIMEOUT', 3))
+    DB_READ_TIMEOUT = float(os.getenv('DB_READ_TIMEOUT', 10))
+    DB_WRITE_TIMEOUT = float(os.getenv('DB_WRITE_TIMEOUT', 10))  # also SQLite's lock wait
+    DB_READ_RETRIES = int(os.getenv('DB_READ_RETRIES', 2))
+    DB_RETRY_BACKOFF_MS = float(os.getenv('DB_RETRY_BACKOFF_MS', 50))
+    DB_BREAKER_FAILURES = int(os.getenv('DB_BREAKER_FAILURES', 5))  # 0 disables the breaker
+    DB_BREAKER_RESET_SECONDS = float(os.getenv('DB_BREAKER_RESET_SECONDS', 15))
+    
+    # Read Replica Configuration ("host[:port]" list for MySQL, file paths for SQLite)
+    DB_REPLICAS = os.getenv('DB_REPLICAS', '')
+    READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', 5))
+    REPLICA_RETRY_SECONDS = float(os.getenv('REPLICA_RETRY_SECONDS', 30))
+    
     # Session Configuration
     SESSION_TYPE = 'filesystem'
     PERMANENT_SESSION_LIFETIME = 1800  # 30 minutes
+    SESSION_COOKIE_SAMESITE = os.getenv('SESSION_COOKIE_SAMESITE', 'Lax')  # not sent on cross-site requests
     
     # Application Configuration
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
+    # Reverse proxies in front of the app whose X-Forwarded-* headers are trusted (0 = none)
+    PROXY_FIX_HOPS = int(os.getenv('PROXY_FIX_HOPS', 0))
+    # Operator endpoints: signed-in users with these usernames, or requests with "Authorization: Bearer <ADMIN_TOKEN>"
+    ADMIN_USERNAMES = os.getenv('ADMIN_USERNAMES', '')  # comma-separated
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
     
     # NLP Configuration
     SPACY_MODEL = 'en_core_web_sm'
+    INTENT_MODEL_PATH = os.getenv('INTENT_MODEL_PATH', 'intent_model.npz')  # built with train_intent_model.py
+    NLP_FAST_PATH_ENABLED = os.getenv('NLP_FAST_PATH_ENABLED', 'True').lower() == 'true'  # False parses every message
+    NLP_SERVER_SOCKET = os.getenv('NLP_SERVER_SOCKET', '')  # e.g. /run/study-buddy/nlp.sock; empty parses in-process
+    NLP_SERVER_WORKERS = int(os.getenv('NLP_SERVER_WORKERS', 2))
+    NLP_SERVER_TIMEOUT = float(os.getenv('NLP_SERVER_TIMEOUT', 5))
+    NLP_BATCH_WINDOW_MS = float(os.getenv('NLP_BATCH_WINDOW_MS', 3))
+    NLP_BATCH_MAX = int(os.getenv('NLP_BATCH_MAX', 64))
     
     # Knowledge Base Configuration
     MIN_CONFIDENCE_SCORE = 0.7
     MAX_RESPONSE_LENGTH = 500
+    MAX_BATCH_MESSAGES = int(os.getenv('MAX_BATCH_MESSAGES', 100))
+    
+    # WebSocket Chat Configuration (needs flask-sock; the web client falls back to HTTP without it)
+    WEBSOCKET_ENABLED = os.getenv('WEBSOCKET_ENABLED', 'True').lower() == 'true'
+    WEBSOCKET_PUSH_SECONDS = float(os.getenv('WEBSOCKET_PUSH_SECONDS', 1))  # longest a push waits on an idle connection
+    WEBSOCKET_PING_SECONDS = float(os.getenv('WEBSOCKET_PING_SECONDS', 25))
+    WEBSOCKET_MAX_MESSAGE_BYTES = int(os.getenv('WEBSOCKET_MAX_MESSAGE_BYTES', 16384))
+    WEBSOCKET_ALLOWED_ORIGINS = os.getenv('WEBSOCKET_ALLOWED_ORIGINS', '')  # besides the app's own host, e.g. "https://study.example.com"
+    WEBSOCKET_SESSION_CHECK_SECONDS = float(os.getenv('WEBSOCKET_SESSION_CHECK_SECONDS', 15))  # re-reads the login session
+    REMINDER_PUSH_POLL_SECONDS = float(os.getenv('REMINDER_PUSH_POLL_SECONDS', 30))
+    
+    # Study Scheduling Configuration
+    STUDY_DAY_START_HOUR = int(os.getenv('STUDY_DAY_START_HOUR', 8))
+    STUDY_DAY_END_HOUR = int(os.getenv('STUDY_DAY_END_HOUR', 22))
+    SCHEDULE_INDEX_MAX_USERS = int(os.getenv('SCHEDULE_INDEX_MAX_USERS', 10000))  # per worker, least recently used evicted
+    
+    # Personalization Configuration
+    PROFILE_HALF_LIFE_DAYS = float(os.getenv('PROFILE_HALF_LIFE_DAYS', 14))
+    PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 10000))
+    
+    # Semantic Search Configuration
+    SEMANTIC_SEARCH_ENABLED = os.getenv('SEMANTIC_SEARCH_ENABLED', 'True').lower() == 'true'
+    SEMANTIC_DIMENSIONS = int(os.getenv('SEMANTIC_DIMENSIONS', 256))
+    SEMANTIC_MIN_SCORE = float(os.getenv('SEMANTIC_MIN_SCORE', 0.2))
+    
+    # Knowledge Snapshot Configuration (built offline with build_knowledge_snapshot.py)
+    KNOWLEDGE_SNAPSHOT_PATH = os.getenv('KNOWLEDGE_SNAPSHOT_PATH', '')
+    KNOWLEDGE_SNAPSHOT_CHECK_SECONDS = float(os.getenv('KNOWLEDGE_SNAPSHOT_CHECK_SECONDS', 5))
+    
+    # Knowledge Change Feed Configuration
+    KNOWLEDGE_CHANGE_FEED_ENABLED = os.getenv('KNOWLEDGE_CHANGE_FEED_ENABLED', 'True').lower() == 'true'
+    KNOWLEDGE_CHANGE_POLL_SECONDS = float(os.getenv('KNOWLEDGE_CHANGE_POLL_SECONDS', 2))
+    KNOWLEDGE_CHANGE_BATCH_SIZE = int(os.getenv('KNOWLEDGE_CHANGE_BATCH_SIZE', 500))
+    KNOWLEDGE_CHANGE_GAP_SECONDS = float(os.getenv('KNOWLEDGE_CHANGE_GAP_SECONDS', 30))
+    SEMANTIC_OVERLAY_LIMIT = int(os.getenv('SEMANTIC_OVERLAY_LIMIT', 1000))
+    
+    # Typo Correction Configuration
+    TYPO_CORRECTION_ENABLED = os.getenv('TYPO_CORRECTION_ENABLED', 'True').lower() == 'true'
+    
+    # Logging Configuration
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')  # json or text
+    LOG_FILE = os.getenv('LOG_FILE', '')
+    # Fraction of DEBUG/INFO records kept per logger prefix, e.g. "app.access=0.1,app.utils.db=0.5"
+    LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', '')
+    
+    # Query Log Configuration
+    QUERY_LOG_ENABLED = os.getenv('QUERY_LOG_ENABLED', 'True').lower() == 'true'
+    QUERY_LOG_ENDPOINT_ENABLED = os.getenv('QUERY_LOG_ENDPOINT_ENABLED', 'False').lower() == 'true'
+    QUERY_LOG_MAX_FINGERPRINTS = int(os.getenv('QUERY_LOG_MAX_FINGERPRINTS', 1000))
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+    SLOW_QUERY_EXPLAIN_SECONDS = float(os.getenv('SLOW_QUERY_EXPLAIN_SECONDS', 300))  # per fingerprint
+    
+    # Notes Search Configuration
+    NOTES_INDEX_ENABLED = os.getenv('NOTES_INDEX_ENABLED', 'True').lower() == 'true'
+    NOTES_INDEX_MEMORY_MB = int(os.getenv('NOTES_INDEX_MEMORY_MB', 64))  # all users' indexes, per worker
+    
+    # Chat History Archive Configuration (run archive_chat_history.py from cron)
+    CHAT_ARCHIVE_ENABLED = os.getenv('CHAT_ARCHIVE_ENABLED', 'False').lower() == 'true'
+    CHAT_ARCHIVE_DIR = os.getenv('CHAT_ARCHIVE_DIR', 'chat_archive')
+    CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv('CHAT_ARCHIVE_AFTER_DAYS', 90))
+    CHAT_ARCHIVE_COMPRESSION = os.getenv('CHAT_ARCHIVE_COMPRESSION', 'gzip')  # gzip or zstd
+    CHAT_ARCHIVE_SEGMENT_ROWS = int(os.getenv('CHAT_ARCHIVE_SEGMENT_ROWS', 5000))
+    
+    # Data Import Configuration
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 32 * 1024 * 1024))  # request bodies, uploads included
+    IMPORT_MAX_BYTES = int(os.getenv('IMPORT_MAX_BYTES', 256 * 1024 * 1024))  # an import once decompressed
+    
+    # Response Configuration
+    JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto')  # auto, orjson or stdlib
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+    # Seconds browsers may reuse subject/topic/learning-path responses before revalidating
+    CATALOG_CACHE_SECONDS = int(os.getenv('CATALOG_CACHE_SECONDS', 60))
+    
+    # Rate Limiting Configuration
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    # endpoint=count/seconds[:burst] per client IP, per signed-in user and, for logins, per username
+    RATE_LIMITS = os.getenv(
+        'RATE_LIMITS',
+        'auth.login=5/60,auth.register=3/600,auth.change_password=5/300,'
+        'chat.send_message=30/60:10,chat.send_messages_batch=5/60:2,'
+        'chat.export_data=3/300,chat.import_data=3/600'
+    )
+    RATE_LIMIT_STORAGE = os.getenv('RATE_LIMIT_STORAGE', 'memory')  # memory or database (shared by workers)
+    # Load shedding: requests in flight per worker (0 = unlimited) and how long a request may wait for a slot
+    MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS', 32))
+    MAX_QUEUE_WAIT_SECONDS = float(os.getenv('MAX_QUEUE_WAIT_SECONDS', 2))
+    
+    # Metrics Configuration
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 1.0))  # 0 to 1 of histogram observations kept; 0 keeps none
+    METRICS_REQUIRE_ADMIN = os.getenv('METRICS_REQUIRE_ADMIN', 'False').lower() == 'true'  # scrape with ADMIN_TOKEN
@@ -42,6 +42,20 @@ CREATE TABLE IF NOT EXISTS chat_history (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Index of archived chat history segments (see archive_chat_history.py)
+CREATE TABLE IF NOT EXISTS chat_archive_segments (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    path VARCHAR(255) NOT NULL,
+    first_timestamp DATETIME NOT NULL,
+    last_timestamp DATETIME NOT NULL,
+    first_id INT NOT NULL,
+    last_id INT NOT NULL,
+    message_count INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
 -- Knowledge base table for educational content
 CREATE TABLE IF NOT EXISTS knowledge_base (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -54,7 +68,22 @@ CREATE TABLE IF NOT EXISTS knowledge_base (
     grade_level VARCHAR(20),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    is_active BOOLEAN DEFAULT TRUE
+    is_active BOOLEAN DEFAULT TRUE,
+    revision BIGINT DEFAULT 0
+);
+
+-- Knowledge base change log; each row's id is a revision polled by every worker's change feed
+CREATE TABLE IF NOT EXISTS knowledge_changes (
+    revision BIGINT AUTO_INCREMENT PRIMARY KEY,
+    entry_id INT NOT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Rate limit token buckets shared by all workers (RATE_LIMIT_STORAGE=database)
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    bucket_key VARCHAR(191) PRIMARY KEY,
+    tokens DOUBLE NOT NULL,
+    updated_at BIGINT NOT NULL
 );
 
 -- Study schedules table
@@ -97,6 +126,15 @@ CREATE TABLE IF NOT EXISTS reminders (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- User interest profiles (compact JSON, maintained incrementally by the chat service)
+CREATE TABLE IF NOT EXISTS user_profiles (
+    user_id INT PRIMARY KEY,
+    profile_data TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    version INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
 -- Insert sample knowledge base data
 INSERT INTO knowledge_base (subject, topic, subtopic, content, keywords, difficulty_level, grade_level) VALUES
 ('Mathematics', 'Algebra', 'Linear Equations', 'A linear equation is an equation that makes a straight line when graphed. It has the form y = mx + b, where m is the slope and b is the y-intercept.', 'linear equation, slope, y-intercept, graph', 'beginner', '9-12'),
@@ -115,7 +153,11 @@ INSERT INTO knowledge_base (subject, topic, subtopic, content, keywords, difficu
 -- Create indexes for better performance
 CREATE INDEX idx_chat_history_user_id ON chat_history(user_id);
 CREATE INDEX idx_chat_history_timestamp ON chat_history(timestamp);
+CREATE INDEX idx_chat_history_user_time ON chat_history(user_id, timestamp, id);
+CREATE INDEX idx_chat_history_session_time ON chat_history(session_id, timestamp);
+CREATE INDEX idx_chat_archive_segments_user_time ON chat_archive_segments(user_id, last_timestamp);
 CREATE INDEX idx_knowledge_base_subject ON knowledge_base(subject);
-CREATE INDEX idx_knowledge_base_keywords ON knowledge_base(keywords);
+CREATE INDEX idx_knowledge_base_revision ON knowledge_base(revision);
+CREATE INDEX idx_knowledge_base_keywords ON knowledge_base(keywords(255));
 CREATE INDEX idx_study_schedules_user_date ON study_schedules(user_id, scheduled_date);
 CREATE INDEX idx_reminders_user_date ON reminders(user_id, reminder_date);
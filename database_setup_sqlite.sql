@@ -0,0 +1,211 @@
+-- Educational Chatbot Database Setup (SQLite)
+-- Used by the SQLite backend (DB_BACKEND=sqlite); applied automatically when the database file is new.
+-- Mirrors database_setup.sql, with ENUMs as CHECK constraints and FTS5 tables for search.
+
+-- Users table for authentication
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    first_name VARCHAR(50) NOT NULL,
+    last_name VARCHAR(50) NOT NULL,
+    grade_level VARCHAR(20),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_login TIMESTAMP NULL,
+    is_active BOOLEAN DEFAULT TRUE
+);
+
+-- Chat sessions table
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    session_start TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    session_end TIMESTAMP NULL,
+    total_messages INTEGER DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Chat history table
+CREATE TABLE IF NOT EXISTS chat_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    response TEXT NOT NULL,
+    message_type VARCHAR(20) DEFAULT 'general',
+    confidence_score REAL DEFAULT 0.00,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Index of archived chat history segments (see archive_chat_history.py)
+CREATE TABLE IF NOT EXISTS chat_archive_segments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    first_timestamp DATETIME NOT NULL,
+    last_timestamp DATETIME NOT NULL,
+    first_id INTEGER NOT NULL,
+    last_id INTEGER NOT NULL,
+    message_count INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Knowledge base table for educational content
+-- Subjects compare case-insensitively, like MySQL's default collation
+CREATE TABLE IF NOT EXISTS knowledge_base (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    subject VARCHAR(50) NOT NULL COLLATE NOCASE,
+    topic VARCHAR(100) NOT NULL COLLATE NOCASE,
+    subtopic VARCHAR(100),
+    content TEXT NOT NULL,
+    keywords TEXT,
+    difficulty_level VARCHAR(20) DEFAULT 'beginner'
+        CHECK (difficulty_level IN ('beginner', 'intermediate', 'advanced')),
+    grade_level VARCHAR(20),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_active BOOLEAN DEFAULT TRUE,
+    revision INTEGER DEFAULT 0
+);
+
+-- Knowledge base change log; each row's id is a revision polled by every worker's change feed
+-- (AUTOINCREMENT so revisions are never reused)
+CREATE TABLE IF NOT EXISTS knowledge_changes (
+    revision INTEGER PRIMARY KEY AUTOINCREMENT,
+    entry_id INTEGER NOT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Rate limit token buckets shared by all workers (RATE_LIMIT_STORAGE=database)
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    bucket_key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+
+-- Study schedules table
+CREATE TABLE IF NOT EXISTS study_schedules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    subject VARCHAR(50) NOT NULL,
+    topic VARCHAR(100) NOT NULL,
+    scheduled_date DATE NOT NULL,
+    scheduled_time TIME NOT NULL,
+    duration_minutes INTEGER DEFAULT 60,
+    status VARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'completed', 'missed')),
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- User notes table
+CREATE TABLE IF NOT EXISTS user_notes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    subject VARCHAR(50) NOT NULL COLLATE NOCASE,
+    topic VARCHAR(100) NOT NULL,
+    note_content TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Reminders table
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    title VARCHAR(100) NOT NULL,
+    description TEXT,
+    reminder_date DATE NOT NULL,
+    reminder_time TIME NOT NULL,
+    is_completed BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- User interest profiles (compact JSON, maintained incrementally by the chat service)
+CREATE TABLE IF NOT EXISTS user_profiles (
+    user_id INTEGER PRIMARY KEY,
+    profile_data TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    version INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Full-text search over the knowledge base (external content, kept in sync by triggers)
+CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_base_fts USING fts5(
+    topic, subtopic, content, keywords,
+    content='knowledge_base', content_rowid='id', tokenize='unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS knowledge_base_ai AFTER INSERT ON knowledge_base BEGIN
+    INSERT INTO knowledge_base_fts (rowid, topic, subtopic, content, keywords)
+    VALUES (new.id, new.topic, new.subtopic, new.content, new.keywords);
+END;
+
+CREATE TRIGGER IF NOT EXISTS knowledge_base_ad AFTER DELETE ON knowledge_base BEGIN
+    INSERT INTO knowledge_base_fts (knowledge_base_fts, rowid, topic, subtopic, content, keywords)
+    VALUES ('delete', old.id, old.topic, old.subtopic, old.content, old.keywords);
+END;
+
+CREATE TRIGGER IF NOT EXISTS knowledge_base_au AFTER UPDATE OF topic, subtopic, content, keywords
+ON knowledge_base BEGIN
+    INSERT INTO knowledge_base_fts (knowledge_base_fts, rowid, topic, subtopic, content, keywords)
+    VALUES ('delete', old.id, old.topic, old.subtopic, old.content, old.keywords);
+    INSERT INTO knowledge_base_fts (rowid, topic, subtopic, content, keywords)
+    VALUES (new.id, new.topic, new.subtopic, new.content, new.keywords);
+END;
+
+-- Full-text search over user notes
+CREATE VIRTUAL TABLE IF NOT EXISTS user_notes_fts USING fts5(
+    note_content, topic, subject,
+    content='user_notes', content_rowid='id', tokenize='unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS user_notes_ai AFTER INSERT ON user_notes BEGIN
+    INSERT INTO user_notes_fts (rowid, note_content, topic, subject)
+    VALUES (new.id, new.note_content, new.topic, new.subject);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_notes_ad AFTER DELETE ON user_notes BEGIN
+    INSERT INTO user_notes_fts (user_notes_fts, rowid, note_content, topic, subject)
+    VALUES ('delete', old.id, old.note_content, old.topic, old.subject);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_notes_au AFTER UPDATE ON user_notes BEGIN
+    INSERT INTO user_notes_fts (user_notes_fts, rowid, note_content, topic, subject)
+    VALUES ('delete', old.id, old.note_content, old.topic, old.subject);
+    INSERT INTO user_notes_fts (rowid, note_content, topic, subject)
+    VALUES (new.id, new.note_content, new.topic, new.subject);
+END;
+
+-- Insert sample knowledge base data
+INSERT INTO knowledge_base (subject, topic, subtopic, content, keywords, difficulty_level, grade_level) VALUES
+('Mathematics', 'Algebra', 'Linear Equations', 'A linear equation is an equation that makes a straight line when graphed. It has the form y = mx + b, where m is the slope and b is the y-intercept.', 'linear equation, slope, y-intercept, graph', 'beginner', '9-12'),
+('Mathematics', 'Geometry', 'Pythagorean Theorem', 'The Pythagorean theorem states that in a right triangle, the square of the hypotenuse equals the sum of squares of the other two sides: a² + b² = c²', 'pythagorean theorem, right triangle, hypotenuse', 'intermediate', '9-12'),
+('Science', 'Physics', 'Newton''s Laws', 'Newton''s First Law: An object at rest stays at rest, and an object in motion stays in motion unless acted upon by an external force.', 'newton laws, motion, force, inertia', 'intermediate', '9-12'),
+('Science', 'Chemistry', 'Periodic Table', 'The periodic table organizes elements by atomic number. Elements in the same group have similar properties.', 'periodic table, elements, atomic number, groups', 'beginner', '9-12'),
+('History', 'World History', 'World War II', 'World War II (1939-1945) was a global conflict involving most nations. It ended with the defeat of the Axis powers.', 'world war 2, global conflict, axis powers', 'intermediate', '9-12'),
+('English', 'Literature', 'Shakespeare', 'William Shakespeare was an English playwright and poet, widely regarded as the greatest writer in the English language.', 'shakespeare, playwright, literature, english', 'intermediate', '9-12');
+
+-- Insert sample study tips
+INSERT INTO knowledge_base (subject, topic, subtopic, content, keywords, difficulty_level, grade_level) VALUES
+('Study Tips', 'Time Management', 'Pomodoro Technique', 'The Pomodoro Technique involves studying for 25 minutes, then taking a 5-minute break. After 4 cycles, take a longer 15-30 minute break.', 'pomodoro, time management, study technique, breaks', 'beginner', 'all'),
+('Study Tips', 'Memory', 'Active Recall', 'Active recall involves testing yourself on material rather than just re-reading. This strengthens memory and improves retention.', 'active recall, memory, testing, retention', 'beginner', 'all'),
+('Study Tips', 'Note Taking', 'Cornell Method', 'The Cornell note-taking method divides your page into three sections: notes, cues, and summary. This helps organize and review information effectively.', 'cornell method, note taking, organization, review', 'beginner', 'all');
+
+-- Create indexes for better performance
+CREATE INDEX IF NOT EXISTS idx_chat_history_user_id ON chat_history(user_id);
+CREATE INDEX IF NOT EXISTS idx_chat_history_timestamp ON chat_history(timestamp);
+CREATE INDEX IF NOT EXISTS idx_chat_history_user_time ON chat_history(user_id, timestamp, id);
+CREATE INDEX IF NOT EXISTS idx_chat_history_session_time ON chat_history(session_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_chat_archive_segments_user_time ON chat_archive_segments(user_id, last_timestamp);
+CREATE INDEX IF NOT EXISTS idx_knowledge_base_subject ON knowledge_base(subject);
+CREATE INDEX IF NOT EXISTS idx_knowledge_base_revision ON knowledge_base(revision);
+CREATE INDEX IF NOT EXISTS idx_study_schedules_user_date ON study_schedules(user_id, scheduled_date);
+CREATE INDEX IF NOT EXISTS idx_reminders_user_date ON reminders(user_id, reminder_date);
+CREATE INDEX IF NOT EXISTS idx_user_notes_user_updated ON user_notes(user_id, updated_at);
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Upgrade an existing database to the current schema
+Adds the tables, columns and indexes introduced since it was created; safe to run repeatedly
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.db import db_manager, DatabaseUnavailableError
+from app.utils.migrations import migrate, pending
+
+def main():
+    """Apply (or with --check, list) the schema changes the database is missing"""
+    parser = argparse.ArgumentParser(description="Upgrade the database schema")
+    parser.add_argument('--check', action='store_true', help="List missing changes without applying them")
+    args = parser.parse_args()
+    
+    if not db_manager.test_connection():
+        print("❌ Database connection failed!")
+        return 1
+    
+    backend = db_manager.backend
+    try:
+        if args.check:
+            missing = pending(backend)
+            for description in missing:
+                print(f"• {description}")
+            print(f"{'⚠️ ' if missing else '✅'} {len(missing)} schema changes pending on {backend.label}")
+            return 1 if missing else 0
+        
+        print(f"🔧 Migrating {backend.label}...")
+        applied, failed = migrate(backend)
+    except DatabaseUnavailableError as e:
+        print(f"❌ Database became unavailable: {e}")
+        return 1
+    
+    for description in applied:
+        print(f"✅ {description}")
+    for description in failed:
+        print(f"❌ {description} (see the log for the error)")
+    if not applied and not failed:
+        print("✅ Schema is already up to date")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,17 @@
 from app import create_app
 from app.utils.db import db_manager
+from app.utils.logging_setup import setup_logging
+from app.utils.migrations import pending
+from config import Config
 import logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 def main():
     """Main function to run the application"""
+    # Configure logging before anything logs
+    setup_logging(Config)
+    
     # Test database connection
     logger.info("Testing database connection...")
     if not db_manager.test_connection():
@@ -20,6 +21,12 @@ def main():
     
     logger.info("Database connection successful!")
     
+    # Features fail quietly on columns and tables an older schema lacks
+    missing = pending(db_manager.backend)
+    if missing:
+        logger.warning("Database schema is out of date (%s); run: python migrate_database.py",
+                       ', '.join(missing))
+    
     # Create Flask app
     app = create_app()
     
@@ -36,7 +43,7 @@ def main():
     except KeyboardInterrupt:
         logger.info("Application stopped by user")
     except Exception as e:
-        logger.error(f"Application error: {e}")
+        logger.error("Application error: %s", e)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Run the NLP server
+Loads spaCy once and serves parse requests from the web workers on NLP_SERVER_SOCKET
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.nlp_service import NLPService
+from app.utils.logging_setup import setup_logging
+from app.utils.nlp_server import NLPServer
+from config import Config
+
+def main():
+    """Load the model, then fork the workers and serve until stopped"""
+    parser = argparse.ArgumentParser(description="Serve spaCy parsing to the web workers")
+    parser.add_argument('--socket', default=Config.NLP_SERVER_SOCKET,
+                        help="Unix socket path (NLP_SERVER_SOCKET)")
+    parser.add_argument('--workers', type=int, default=Config.NLP_SERVER_WORKERS)
+    parser.add_argument('--batch-window-ms', type=float, default=Config.NLP_BATCH_WINDOW_MS)
+    parser.add_argument('--max-batch', type=int, default=Config.NLP_BATCH_MAX)
+    args = parser.parse_args()
+    
+    if not args.socket:
+        print("❌ Set NLP_SERVER_SOCKET (or pass --socket) to the path the web workers connect to")
+        return 1
+    
+    setup_logging(Config)
+    service = NLPService(use_server=False)
+    if not service.nlp:
+        print(f"❌ spaCy model {Config.SPACY_MODEL} not found; run: python -m spacy download {Config.SPACY_MODEL}")
+        return 1
+    
+    print(f"🧠 Serving NLP on {args.socket} with {args.workers} workers "
+          f"(batches of up to {args.max_batch} within {args.batch_window_ms:g} ms)")
+    NLPServer(args.socket, service, args.workers, args.batch_window_ms, args.max_batch).serve_forever()
+    print("👋 NLP server stopped")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,13 @@ let currentUser = null;
 let currentSessionId = null;
 let currentTab = 'chat';
 
+// WebSocket chat channel; messages go over HTTP whenever it isn't open
+let chatSocket = null;
+let chatSocketReady = false;
+let chatSocketRetries = 0;
+let chatFrameId = 0;
+const pendingReplies = new Map();
+
 // Initialize the application
 document.addEventListener('DOMContentLoaded', function() {
     checkAuth();
@@ -132,6 +139,7 @@ async function logout() {
         await fetch('/api/auth/logout', { method: 'POST' });
         currentUser = null;
         currentSessionId = null;
+        disconnectChatSocket();
         showAuthSection();
         showAlert('Logged out successfully', 'info');
     } catch (error) {
@@ -153,6 +161,7 @@ function showChatSection() {
     // Load initial data
     loadChatHistory();
     showTab('chat');
+    connectChatSocket();
 }
 
 function toggleAuthForm() {
@@ -213,28 +222,13 @@ async function sendMessage() {
     const typingId = addTypingIndicator();
     
     try {
-        const response = await fetch('/api/chat/message', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-                message: message,
-                session_id: currentSessionId
-            })
-        });
-        
-        const data = await response.json();
+        const data = await sendChatMessage(message);
         
         // Remove typing indicator
         removeTypingIndicator(typingId);
         
-        if (response.ok) {
-            currentSessionId = data.session_id;
-            addMessageToChat(data.response, 'bot');
-        } else {
-            addMessageToChat('Sorry, I encountered an error. Please try again.', 'bot');
-        }
+        currentSessionId = data.session_id;
+        addMessageToChat(data.response, 'bot');
     } catch (error) {
         console.error('Message error:', error);
         removeTypingIndicator(typingId);
@@ -242,6 +236,125 @@ async function sendMessage() {
     }
 }
 
+// Send a message over the chat socket if it's open, otherwise (or if it drops) over HTTP
+async function sendChatMessage(message) {
+    if (chatSocketReady && chatSocket.readyState === WebSocket.OPEN) {
+        try {
+            return await sendOverSocket(message);
+        } catch (error) {
+            if (error.fromServer) {
+                throw error;
+            }
+            console.warn('Chat socket unavailable, sending over HTTP:', error);
+        }
+    }
+    
+    const response = await fetch('/api/chat/message', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            message: message,
+            session_id: currentSessionId
+        })
+    });
+    
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error || 'Message failed');
+    }
+    return data;
+}
+
+function sendOverSocket(message) {
+    return new Promise((resolve, reject) => {
+        const id = ++chatFrameId;
+        pendingReplies.set(id, { resolve, reject });
+        chatSocket.send(JSON.stringify({
+            type: 'message',
+            id: id,
+            message: message,
+            session_id: currentSessionId
+        }));
+    });
+}
+
+// Chat socket connection
+function connectChatSocket() {
+    if (!('WebSocket' in window) || chatSocket) return;
+    
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(`${protocol}//${window.location.host}/ws/chat`);
+    chatSocket = socket;
+    
+    socket.addEventListener('message', function(event) {
+        handleSocketFrame(JSON.parse(event.data));
+    });
+    
+    socket.addEventListener('close', function() {
+        chatSocket = null;
+        chatSocketReady = false;
+        
+        // Messages still waiting for a reply are retried over HTTP
+        pendingReplies.forEach(pending => pending.reject(new Error('Chat socket closed')));
+        pendingReplies.clear();
+        
+        // Reconnect with backoff while signed in; a server without WebSocket support stops this after a few tries
+        if (currentUser && chatSocketRetries < 5) {
+            chatSocketRetries++;
+            setTimeout(connectChatSocket, 1000 * 2 ** chatSocketRetries);
+        }
+    });
+}
+
+function disconnectChatSocket() {
+    chatSocketRetries = 0;
+    if (chatSocket) {
+        chatSocket.close();
+    }
+}
+
+function handleSocketFrame(frame) {
+    switch (frame.type) {
+        case 'ready':
+            chatSocketReady = true;
+            chatSocketRetries = 0;
+            break;
+        case 'response':
+        case 'error': {
+            const pending = pendingReplies.get(frame.id);
+            if (!pending) {
+                console.warn('Chat socket error:', frame.error);
+                break;
+            }
+            pendingReplies.delete(frame.id);
+            if (frame.type === 'response') {
+                pending.resolve(frame);
+            } else {
+                const error = new Error(frame.error);
+                error.fromServer = true;
+                pending.reject(error);
+            }
+            break;
+        }
+        case 'reminder':
+            showReminder(frame);
+            break;
+    }
+}
+
+// Reminders pushed by the server when they fall due
+function showReminder(reminder) {
+    const details = reminder.description ? `: ${reminder.description}` : '';
+    addMessageToChat(`⏰ Reminder: ${reminder.title}${details}`, 'bot');
+    showAlert(`Reminder: ${reminder.title}`, 'info');
+    
+    if (currentTab === 'reminders') {
+        loadReminders();
+    }
+}
+
 function addMessageToChat(message, sender) {
     const messagesContainer = document.getElementById('chat-messages');
     const messageDiv = document.createElement('div');
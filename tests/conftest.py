@@ -0,0 +1,22 @@
+"""
+Fixtures shared by the test modules
+"""
+
+import pytest
+
+from app.utils.db import db_manager
+from app.utils.db_backends import SQLiteBackend
+
+@pytest.fixture
+def database(tmp_path):
+    """A fresh SQLite database under tmp_path with one user (id 1), installed on db_manager for the test"""
+    backend = db_manager.backend
+    sqlite = SQLiteBackend(str(tmp_path / 'chatbot.db'))
+    db_manager.backend = sqlite
+    with sqlite.connect().cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO users (id, username, email, password_hash, first_name, last_name)
+            VALUES (1, 'student', 'student@example.com', 'x', 'Test', 'Student')
+        """)
+    yield sqlite
+    db_manager.backend = backend
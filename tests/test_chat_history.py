@@ -0,0 +1,69 @@
+"""
+Tests for paging back through chat history, across the archive, on (timestamp, id)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import chat
+from app.models.chat import ChatHistory
+from app.utils.chat_archive import ChatArchive
+from config import Config
+
+USER_ID = 1
+OLD = (datetime.now() - timedelta(days=60)).replace(microsecond=0)
+RECENT = (datetime.now() - timedelta(days=1)).replace(microsecond=0)
+
+@pytest.fixture(autouse=True)
+def chat_session(database):
+    """The chat session (id 1) every turn here belongs to"""
+    with database.connect().cursor() as cursor:
+        cursor.execute("INSERT INTO chat_sessions (id, user_id) VALUES (1, %s)", (USER_ID,))
+
+@pytest.fixture
+def archive(monkeypatch, tmp_path):
+    """Archive turns older than 30 days in segments of 3, read back by get_user_history"""
+    archive = ChatArchive(directory=str(tmp_path / 'archive'), after_days=30, segment_rows=3)
+    monkeypatch.setattr(Config, 'CHAT_ARCHIVE_ENABLED', True)
+    monkeypatch.setattr(chat, 'chat_archive', archive)
+    return archive
+
+def add_turns(count, timestamp):
+    """count turns all sent at the same second; returns their ids"""
+    return [ChatHistory(session_id=1, user_id=USER_ID, message=f'message {i}', response='ok',
+                        timestamp=timestamp).save()
+            for i in range(count)]
+
+def page_through(limit):
+    """Every turn's id, fetched a page at a time the way a client follows the cursor"""
+    ids, before, before_id = [], None, None
+    while True:
+        page = ChatHistory.get_user_history(USER_ID, limit, serialized=True,
+                                            before=before, before_id=before_id)
+        ids.extend(row['id'] for row in page)
+        if len(page) < limit:
+            return ids
+        before, before_id = page[-1]['timestamp'], page[-1]['id']
+
+def test_pages_split_turns_sharing_a_timestamp(database):
+    ids = add_turns(5, RECENT)
+    assert page_through(2) == sorted(ids, reverse=True)
+
+def test_pages_continue_into_the_archive(database, archive):
+    old_ids = add_turns(5, OLD)
+    recent_ids = add_turns(3, RECENT)
+    assert archive.archive() == (2, 5)
+    assert page_through(2) == sorted(recent_ids + old_ids, reverse=True)
+
+def test_version_changes_with_new_and_archived_turns(database, archive):
+    assert ChatHistory.get_version(USER_ID)[:2] == (None, None)
+    add_turns(3, OLD)
+    added = ChatHistory.get_version(USER_ID)
+    assert added[0] is not None
+    
+    archive.archive()
+    archived = ChatHistory.get_version(USER_ID)
+    assert archived != added and archived[2] == 1
+    assert ChatHistory.get_version(USER_ID) == archived
+    assert ChatHistory.get_version(USER_ID, session_id=1)[2] == 1
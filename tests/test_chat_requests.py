@@ -0,0 +1,92 @@
+"""
+Tests for creating reminders and study sessions from chat messages
+"""
+
+import pytest
+
+from app.models.chat import ChatHistory, Reminder, StudySchedule
+from app.services.chat_service import chat_service
+from app.utils.db import DatabaseUnavailableError
+from app.utils.schedule_index import schedule_index
+
+USER_ID = 1
+
+def reminders():
+    return Reminder.get_user_reminders(USER_ID)
+
+def sessions():
+    return StudySchedule.get_user_schedules(USER_ID)
+
+def send(handler, message):
+    return handler({'original_message': message, 'subject': None}, USER_ID)
+
+@pytest.mark.parametrize('message, title', [
+    ("Remind me to review algebra notes tomorrow at 3 PM", "review algebra notes"),
+    ("Can you remind me to email my tutor tomorrow at 9am?", "email my tutor"),
+    ("Tomorrow at 4pm remind me to pack my calculator", "pack my calculator"),
+    ("Remind me how to factor quadratics tomorrow at 5pm", "how to factor quadratics"),
+])
+def test_reminder_requests_create_reminders(database, message, title):
+    response = send(chat_service.handle_reminder_request, message)
+    assert response.startswith("✅ Reminder set")
+    assert [reminder.title for reminder in reminders()] == [title]
+
+@pytest.mark.parametrize('message', [
+    "do I have any reminders tomorrow?",
+    "when is my exam on Friday?",
+    "what reminders do I have at 3pm?",
+    "cancel my reminder tomorrow at 4pm",
+])
+def test_other_reminder_messages_create_nothing(database, message):
+    send(chat_service.handle_reminder_request, message)
+    assert reminders() == []
+
+def test_reminder_questions_list_reminders(database):
+    send(chat_service.handle_reminder_request, "Remind me to study tomorrow at 3 PM")
+    response = send(chat_service.handle_reminder_request, "do I have any reminders tomorrow?")
+    assert "upcoming reminders" in response and "study" in response
+    assert len(reminders()) == 1
+
+@pytest.mark.parametrize('message, topic', [
+    ("Schedule physics on Saturday at 10am for 90 minutes", "physics"),
+    ("Please book a study session for chemistry tomorrow at 4pm", "chemistry"),
+])
+def test_schedule_requests_book_sessions(database, message, topic):
+    response = send(chat_service.handle_schedule_request, message)
+    assert response.startswith("✅ Study session scheduled")
+    assert [session.topic for session in sessions()] == [topic]
+
+@pytest.mark.parametrize('message', [
+    "what do I have scheduled tomorrow?",
+    "cancel my session tomorrow at 4pm",
+    "is my study session on Saturday at 10am?",
+])
+def test_other_schedule_messages_book_nothing(database, message):
+    send(chat_service.handle_schedule_request, message)
+    assert sessions() == []
+
+def test_overlapping_session_is_refused(database):
+    send(chat_service.handle_schedule_request, "Schedule physics tomorrow at 10am for 90 minutes")
+    response = send(chat_service.handle_schedule_request, "Schedule chemistry tomorrow at 11am")
+    assert response.startswith("That overlaps another study session")
+    assert len(sessions()) == 1
+
+def test_batch_keeps_answers_given_before_the_database_went_down(database, monkeypatch):
+    answer = chat_service.generate_response
+    calls = []
+    
+    def fails_second(analysis, user_id, knowledge_entries=None):
+        calls.append(analysis)
+        if len(calls) == 2:
+            raise DatabaseUnavailableError("Database unavailable for query", 1.0)
+        return answer(analysis, user_id, knowledge_entries)
+    
+    monkeypatch.setattr(chat_service, 'generate_response', fails_second)
+    first = "Remind me to review algebra notes tomorrow at 3 PM"
+    results = chat_service.process_messages(USER_ID, [first, "what is photosynthesis?", "hello"])
+    
+    assert results[0]['response'].startswith("✅ Reminder set") and 'degraded' not in results[0]
+    assert [result.get('degraded') for result in results[1:]] == [True, True]
+    # The answered message was saved, so resending only the degraded ones repeats nothing
+    assert len(reminders()) == 1
+    assert [row['message'] for row in ChatHistory.get_user_history(USER_ID, serialized=True)] == [first]
@@ -0,0 +1,50 @@
+"""
+Tests for the date/time/duration grammar used by chat reminders and scheduling
+"""
+
+from datetime import date, datetime, time
+
+import pytest
+
+from app.utils.date_grammar import parse_datetime
+
+# A Wednesday morning
+NOW = datetime(2024, 3, 13, 10, 0)
+
+@pytest.mark.parametrize('text, day, clock', [
+    ("tomorrow at 3 PM", date(2024, 3, 14), time(15)),
+    ("next Monday morning", date(2024, 3, 18), time(9)),
+    ("in 2 hours", date(2024, 3, 13), time(12)),
+    ("12/25 at 14:30", date(2024, 12, 25), time(14, 30)),
+    ("the day after tomorrow at noon", date(2024, 3, 15), time(12)),
+    ("tonight at 8", date(2024, 3, 13), time(20)),
+    ("March 20th", date(2024, 3, 20), None),
+    ("this Wednesday", date(2024, 3, 13), None),
+])
+def test_resolves_dates_and_times(text, day, clock):
+    expression = parse_datetime(text, NOW)
+    assert expression.date == day
+    assert expression.time == clock
+
+def test_past_day_of_month_means_next_month():
+    assert parse_datetime("on the 12th", NOW).date == date(2024, 4, 12)
+
+def test_bare_hour_picks_the_likelier_half_of_the_day():
+    assert parse_datetime("meet at 5", NOW).time == time(17)
+    assert parse_datetime("meet at 9", NOW).time == time(9)
+
+def test_time_without_date_is_the_next_occurrence():
+    assert parse_datetime("at 8:30", NOW).at(NOW) == datetime(2024, 3, 14, 8, 30)
+    assert parse_datetime("at 14:00", NOW).at(NOW) == datetime(2024, 3, 13, 14, 0)
+
+def test_duration_and_strip():
+    message = "Schedule physics on Saturday at 10am for 90 minutes"
+    expression = parse_datetime(message, NOW)
+    assert expression.duration_minutes == 90
+    assert expression.at(NOW) == datetime(2024, 3, 16, 10, 0)
+    assert expression.strip(message) == "Schedule physics"
+
+def test_no_expression():
+    expression = parse_datetime("what is photosynthesis", NOW)
+    assert not expression
+    assert expression.at(NOW) is None
@@ -0,0 +1,59 @@
+"""
+Tests for exports leaving the circuit breaker usable and for imports rejecting oversized or corrupt uploads
+"""
+
+import gzip
+import io
+import json
+import time
+import zlib
+
+import pytest
+
+from app.services.export_service import ExportService, ImportTooLargeError
+from app.utils.db import db_manager, CircuitBreaker
+
+USER_ID = 1
+
+def note(i):
+    return json.dumps({'type': 'notes', 'subject': 'Math', 'topic': f'Topic {i}',
+                       'note_content': 'x' * 100}) + '\n'
+
+@pytest.fixture
+def half_open(monkeypatch):
+    """A breaker that has failed and whose reset time has passed, so its next call is the trial"""
+    breaker = CircuitBreaker(1, 0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    monkeypatch.setattr(db_manager, 'breaker', breaker)
+    return breaker
+
+def test_is_open_leaves_the_trial_call(half_open):
+    assert not half_open.is_open()
+    assert not half_open.trial
+    half_open.allow()
+    assert half_open.is_open()
+
+def test_abandoned_stream_closes_the_breaker(database, half_open):
+    rows = db_manager.stream_query("SELECT id FROM users")
+    next(rows)
+    assert half_open.trial
+    # A client disconnecting mid-download closes the generator
+    rows.close()
+    assert half_open.opened_at is None and not half_open.trial
+    half_open.allow()
+
+def test_import_stops_at_the_decompressed_limit(database):
+    service = ExportService(batch_size=10, max_import_bytes=50 * len(note(0)))
+    upload = gzip.compress(''.join(note(i) for i in range(1000)).encode())
+    with pytest.raises(ImportTooLargeError) as error:
+        service.import_data(USER_ID, io.BytesIO(upload))
+    assert 0 < error.value.counts['notes'] <= 50
+
+@pytest.mark.parametrize('upload', [
+    gzip.compress(note(0).encode() * 100)[:-20],
+    gzip.compress(note(0).encode())[:10] + b'\xff' * 40,
+], ids=['truncated', 'corrupt'])
+def test_truncated_or_corrupt_gzip_raises_a_read_error(database, upload):
+    with pytest.raises((OSError, EOFError, zlib.error)):
+        ExportService().import_data(USER_ID, io.BytesIO(upload))
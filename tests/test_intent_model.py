@@ -0,0 +1,12 @@
+"""
+Tests for the intent model a deployment gets without INTENT_MODEL_PATH
+"""
+
+from app.utils.intent_model import INTENTS, load_intent_model
+
+def test_missing_model_falls_back_to_the_shipped_seed_model(tmp_path):
+    model = load_intent_model(str(tmp_path / 'missing.npz'))
+    assert list(model.labels) == list(INTENTS)
+    # Calibrated on held-out seeds rather than left at 1.0
+    assert model.temperature != 1.0
+    assert model.predict("remind me to study tomorrow at 5pm")[0] == 'reminder'
@@ -0,0 +1,18 @@
+"""
+Tests for histogram sampling
+"""
+
+import pytest
+
+from app.utils.metrics import Histogram
+
+def test_zero_sample_rate_records_nothing():
+    histogram = Histogram('test_seconds', 'Test', sample_rate=0.0)
+    for _ in range(100):
+        histogram.observe(0.1)
+    assert histogram.series == {}
+
+@pytest.mark.parametrize('rate', [-0.5, 1.5])
+def test_sample_rate_outside_zero_to_one_is_rejected(rate):
+    with pytest.raises(ValueError):
+        Histogram('test_seconds', 'Test', sample_rate=rate)
@@ -0,0 +1,39 @@
+"""
+Tests for profile updates from several workers not overwriting each other
+"""
+
+from app.models.user import UserProfile
+from app.services.profile_service import ProfileService
+
+USER_ID = 1
+
+def test_first_save_creates_the_row(database):
+    service = ProfileService()
+    profile = service.record(USER_ID, {'subject': 'Math', 'keywords': ['algebra']})
+    assert profile.version == 1
+    stored = UserProfile.find_by_user(USER_ID, primary=True)
+    assert stored.version == 1
+    assert stored.subject_scores == {'Math': 1.0}
+
+def test_stale_profile_is_not_saved(database):
+    profile = UserProfile(user_id=USER_ID)
+    assert profile.save()
+    stale = profile.copy()
+    assert profile.save()
+    assert not stale.save()
+    assert UserProfile.find_by_user(USER_ID, primary=True).version == 2
+
+def test_updates_from_another_worker_are_kept(database):
+    here, elsewhere = ProfileService(), ProfileService()
+    here.record(USER_ID, {'subject': 'Math', 'keywords': ['algebra']})
+    elsewhere.record(USER_ID, {'subject': 'Physics', 'keywords': ['force']})
+    
+    # This worker's cached profile predates the other worker's save
+    profile = here.record(USER_ID, {'subject': 'Math', 'keywords': ['calculus']})
+    assert profile.version == 3
+    assert profile.message_count == 3
+    assert set(profile.subject_scores) == {'Math', 'Physics'}
+    
+    stored = UserProfile.find_by_user(USER_ID, primary=True)
+    assert stored.message_count == 3
+    assert stored.recent_keywords[:3] == ['calculus', 'force', 'algebra']
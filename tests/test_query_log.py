@@ -0,0 +1,35 @@
+"""
+Tests for slow statement plans being captured off the request path
+"""
+
+import threading
+
+from app.utils.db import db_manager, CircuitBreaker
+from app.utils.query_log import QueryLog
+
+QUERY = "SELECT * FROM chat_history WHERE user_id = %s"
+
+def test_slow_statement_is_explained_in_the_background():
+    log = QueryLog(threshold_ms=10, explain_seconds=300, max_fingerprints=10)
+    release, explained = threading.Event(), threading.Event()
+    
+    def explain(query, params):
+        release.wait(5)
+        explained.set()
+        return [{'detail': 'SCAN chat_history'}]
+    
+    # Returns while the plan is still being captured
+    log.record(QUERY, (1,), 0.5, 3, explain=explain)
+    assert not explained.is_set()
+    assert log.top()[0]['plan'] is None
+    
+    release.set()
+    log.pending.join()
+    assert explained.is_set()
+    assert log.top()[0]['plan'] == [{'detail': 'SCAN chat_history'}]
+
+def test_open_breaker_skips_explain(monkeypatch):
+    breaker = CircuitBreaker(1, 60)
+    breaker.record_failure()
+    monkeypatch.setattr(db_manager, 'breaker', breaker)
+    assert db_manager.explain(QUERY, (1,)) is None
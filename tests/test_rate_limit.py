@@ -0,0 +1,73 @@
+"""
+Tests for which buckets a request spends and for buckets shared through the database
+"""
+
+import time
+
+import pytest
+from flask import Blueprint, Flask, session
+
+from app.utils.db import db_manager, primary_until
+from app.utils.rate_limit import RateLimiter, DatabaseBucketStore, client_keys
+
+LOGIN = {'auth.login': (5 / 60, 5)}
+
+@pytest.fixture
+def app():
+    """An app with just the auth.login endpoint, so requests resolve to it"""
+    auth = Blueprint('auth', __name__)
+    auth.add_url_rule('/login', 'login', lambda: '', methods=['POST'])
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(auth, url_prefix='/api/auth')
+    return app
+
+def login_keys(app, address, username, user_id=None):
+    with app.test_request_context('/api/auth/login', method='POST', json={'username': username},
+                                  environ_base={'REMOTE_ADDR': address}):
+        if user_id:
+            session['user_id'] = user_id
+        return client_keys()
+
+def test_keys_cover_address_user_and_username(app):
+    assert login_keys(app, '10.0.0.1', 'Student') == ['ip:10.0.0.1', 'username:student']
+    assert login_keys(app, '10.0.0.1', 'student', user_id=7) == [
+        'ip:10.0.0.1', 'user:7', 'username:student'
+    ]
+
+def test_login_guesses_from_many_addresses_are_limited(app):
+    limiter = RateLimiter(LOGIN, 'memory')
+    waits = [limiter.check('auth.login', login_keys(app, f'10.0.0.{i}', 'student'))
+             for i in range(6)]
+    assert waits[:5] == [0.0] * 5
+    assert waits[5] > 0
+    assert limiter.check('auth.login', login_keys(app, '10.0.0.9', 'teacher')) == 0.0
+
+def test_database_buckets_are_created_once(database):
+    store = DatabaseBucketStore()
+    now = time.time()
+    assert store.take('auth.login:ip:10.0.0.1', 1 / 60, 2, now) == 0.0
+    # A worker that found no row and lost the race to insert it reads the winner's row
+    assert db_manager.execute_update(
+        "INSERT IGNORE INTO rate_limit_buckets (bucket_key, tokens, updated_at) VALUES (%s, %s, %s)",
+        ('auth.login:ip:10.0.0.1', 1, int(now * 1000000))
+    ) == 0
+    assert store.take('auth.login:ip:10.0.0.1', 1 / 60, 2, now) == 0.0
+    assert store.take('auth.login:ip:10.0.0.1', 1 / 60, 2, now) > 0
+
+def test_contended_database_bucket_asks_client_to_wait(database, monkeypatch):
+    store = DatabaseBucketStore()
+    now = time.time()
+    store.take('chat.send_message:user:1', 1, 10, now)
+    # Every compare-and-set loses to another worker
+    monkeypatch.setattr(db_manager, 'execute_update', lambda query, params=None, track=True: 0)
+    assert store.take('chat.send_message:user:1', 1, 10, now + 1) == DatabaseBucketStore.CONTENDED_WAIT
+
+def test_bucket_writes_leave_reads_on_replicas(database, monkeypatch):
+    monkeypatch.setattr(db_manager.replicas, 'backends', [database])
+    token = primary_until.set(0.0)
+    try:
+        DatabaseBucketStore().take('chat.send_message:user:1', 1, 10, time.time())
+        assert primary_until.get() == 0.0
+    finally:
+        primary_until.reset(token)
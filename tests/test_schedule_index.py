@@ -0,0 +1,69 @@
+"""
+Tests for the per-user schedule index staying in step with saves and invalidation
+"""
+
+from datetime import date, datetime, time
+
+import pytest
+
+from app.models.chat import StudySchedule
+from app.utils.schedule_index import ScheduleIndex
+
+USER_ID = 1
+DAY = date(2030, 1, 7)
+
+def book_elsewhere(database, hour, status='pending'):
+    """Insert a session the way another worker would, without touching this worker's index"""
+    with database.connect().cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO study_schedules (user_id, subject, topic, scheduled_date, scheduled_time,
+                                         duration_minutes, status)
+            VALUES (%s, 'Math', 'Algebra', %s, %s, 60, %s)
+        """, (USER_ID, DAY, time(hour).strftime('%H:%M:%S'), status))
+        return cursor.lastrowid
+
+def test_loaded_trees_are_read_without_the_database(database, monkeypatch):
+    index = ScheduleIndex()
+    ten = (datetime.combine(DAY, time(10)), datetime.combine(DAY, time(11)))
+    schedule_id = book_elsewhere(database, 10)
+    assert index.find_conflicts(USER_ID, *ten) == [schedule_id]
+    
+    monkeypatch.setattr(index, 'load_rows', lambda user_id: pytest.fail("tree reloaded"))
+    assert index.find_conflicts(USER_ID, *ten) == [schedule_id]
+    assert index.has_conflict(USER_ID, *ten)
+
+def test_saves_and_invalidation_keep_the_tree_current(database):
+    index = ScheduleIndex()
+    nine = (datetime.combine(DAY, time(9)), datetime.combine(DAY, time(10)))
+    assert index.find_conflicts(USER_ID, *nine) == []
+    
+    schedule = StudySchedule(user_id=USER_ID, subject='Math', topic='Algebra',
+                             scheduled_date=DAY, scheduled_time=time(9))
+    schedule.id = book_elsewhere(database, 9)
+    index.update(schedule)
+    assert index.find_conflicts(USER_ID, *nine) == [schedule.id]
+    
+    # Writers that bypass StudySchedule.save, like imports, invalidate instead
+    with database.connect().cursor() as cursor:
+        cursor.execute("UPDATE study_schedules SET status = 'completed' WHERE id = %s", (schedule.id,))
+    index.invalidate(USER_ID)
+    assert index.find_conflicts(USER_ID, *nine) == []
+
+def test_load_that_raced_a_write_is_not_cached(database, monkeypatch):
+    index = ScheduleIndex()
+    load_rows = index.load_rows
+    
+    def load_then_invalidate(user_id):
+        rows = load_rows(user_id)
+        index.invalidate(user_id)
+        return rows
+    
+    monkeypatch.setattr(index, 'load_rows', load_then_invalidate)
+    index.get_tree(USER_ID)
+    assert USER_ID not in index.trees
+
+def test_least_recently_used_trees_are_evicted(database):
+    index = ScheduleIndex(max_users=2)
+    for user_id in (1, 2, 1, 3):
+        index.get_tree(user_id)
+    assert list(index.trees) == [1, 3]
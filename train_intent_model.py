@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Train the intent classifier
+Fits the hashed n-gram model on the seed set plus confidently labelled chat history and writes INTENT_MODEL_PATH
+"""
+
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.db import db_manager, DatabaseUnavailableError
+from app.utils.intent_model import DEFAULT_DIMENSIONS, INTENTS, train
+from app.utils.intent_seed import seed_examples
+from config import Config
+
+def history_examples(limit, min_confidence):
+    """Recent (message, intent) pairs from chat history that were classified with min_confidence"""
+    rows = db_manager.execute_query("""
+        SELECT message, message_type FROM chat_history
+        WHERE confidence_score >= %s
+        ORDER BY id DESC LIMIT %s
+    """, (min_confidence, limit))
+    return [(row['message'], row['message_type']) for row in rows or []
+            if row['message'] and row['message_type'] in INTENTS]
+
+def main():
+    """Train, report held-out accuracy and calibration, and save the model"""
+    parser = argparse.ArgumentParser(description="Train the intent classifier")
+    parser.add_argument('--output', default=Config.INTENT_MODEL_PATH)
+    parser.add_argument('--no-history', action='store_true',
+                        help="Train on the seed set only")
+    parser.add_argument('--history-limit', type=int, default=50000)
+    parser.add_argument('--min-confidence', type=float, default=0.9,
+                        help="Only learn from history turns classified at least this confidently")
+    parser.add_argument('--dimensions', type=int, default=DEFAULT_DIMENSIONS)
+    parser.add_argument('--epochs', type=int, default=30)
+    args = parser.parse_args()
+    
+    print("🧠 Training intent classifier...")
+    examples = seed_examples()
+    if not args.no_history:
+        try:
+            history = history_examples(args.history_limit, args.min_confidence)
+        except DatabaseUnavailableError as e:
+            print(f"❌ Database unavailable: {e} (use --no-history to train on the seed set)")
+            return 1
+        # The seed label wins when a message appears in both
+        seen = {text.lower().strip() for text, _ in examples}
+        for text, intent in history:
+            if text.lower().strip() not in seen:
+                seen.add(text.lower().strip())
+                examples.append((text, intent))
+        print(f"   {len(examples) - len(seed_examples())} examples from chat history")
+    
+    started = time.perf_counter()
+    model, stats = train(examples, args.dimensions, epochs=args.epochs)
+    print(f"✅ Trained on {stats['examples']} examples in {time.perf_counter() - started:.1f}s")
+    if stats['held_out']:
+        print(f"   Held-out accuracy: {stats['accuracy']:.1%} on {stats['held_out']} examples")
+        print(f"   Calibration error: {stats['calibration_error']:.3f} (temperature {stats['temperature']:.2f})")
+    else:
+        print("⚠️  Too few examples to hold any out; confidences are not calibrated")
+    
+    model.save(args.output)
+    print(f"💾 Saved to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Export or import a user's data
+Streams chat history, notes, schedules and reminders to or from a JSONL or CSV file (optionally gzipped)
+"""
+
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.export_service import export_service, FORMATS, SECTIONS
+from app.utils.db import db_manager, DatabaseUnavailableError
+
+def export_user(args):
+    sections = args.sections.split(',') if args.sections else list(SECTIONS)
+    unknown = [name for name in sections if name not in SECTIONS]
+    if unknown:
+        print(f"❌ Unknown sections: {', '.join(unknown)} (choose from {', '.join(SECTIONS)})")
+        return 1
+    
+    output = args.output or export_service.filename(args.user_id, args.format, args.gzip)
+    print(f"📤 Exporting user {args.user_id} to {output}...")
+    started = time.perf_counter()
+    written = 0
+    # Written alongside and renamed at the end, so a failed export never looks complete
+    try:
+        with open(output + '.tmp', 'wb') as f:
+            for chunk in export_service.export(args.user_id, args.format, sections, args.gzip):
+                f.write(chunk)
+                written += len(chunk)
+    except BaseException:
+        os.unlink(output + '.tmp')
+        raise
+    os.replace(output + '.tmp', output)
+    print(f"✅ Wrote {written / 1024:,.0f} KB in {time.perf_counter() - started:.1f}s")
+    return 0
+
+def import_user(args):
+    print(f"📥 Importing {args.input} into user {args.user_id}...")
+    started = time.perf_counter()
+    with open(args.input, 'rb') as f:
+        counts = export_service.import_data(args.user_id, f)
+    imported = ', '.join(f"{counts[section]} {section}" for section in SECTIONS)
+    print(f"✅ Imported {imported} in {time.perf_counter() - started:.1f}s")
+    if counts['skipped']:
+        print(f"⚠️  Skipped {counts['skipped']} records that were malformed or missing required fields")
+    return 0
+
+def main():
+    """Run the export or import subcommand"""
+    parser = argparse.ArgumentParser(description="Export or import a user's data")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    export_parser = commands.add_parser('export', help="Write a user's data to a file")
+    export_parser.add_argument('--user-id', type=int, required=True)
+    export_parser.add_argument('--format', choices=list(FORMATS), default='jsonl')
+    export_parser.add_argument('--gzip', action='store_true')
+    export_parser.add_argument('--sections', help=f"Comma-separated subset of: {', '.join(SECTIONS)}")
+    export_parser.add_argument('--output', help="File to write (default: user-<id>-export-<date>.<format>)")
+    
+    import_parser = commands.add_parser('import', help="Add the records of an export to a user")
+    import_parser.add_argument('--user-id', type=int, required=True)
+    import_parser.add_argument('input', help="JSONL or CSV export, gzipped or not")
+    args = parser.parse_args()
+    
+    if not db_manager.test_connection():
+        print("❌ Database connection failed!")
+        return 1
+    
+    try:
+        return export_user(args) if args.command == 'export' else import_user(args)
+    except DatabaseUnavailableError as e:
+        print(f"❌ Database became unavailable: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())